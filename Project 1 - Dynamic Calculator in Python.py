@@ -1,22 +1,316 @@
+import os
 import sys
-from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QLineEdit,
-                             QPushButton, QGridLayout, QHBoxLayout, QStackedWidget)
-from PyQt5.QtCore import Qt
-import math # Needed for scientific functions
+import time
+from decimal import Context
+from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QLineEdit, QLabel,
+                             QPushButton, QGridLayout, QHBoxLayout, QStackedWidget, QStyle,
+                             QStyleFactory, QStyleOptionButton)
+from PyQt5.QtGui import QColor, QFont, QPainter, QPalette, QPen, QPixmap, QPolygonF, QRegion
+from PyQt5.QtCore import Qt, QEvent, QObject, QPointF, QRunnable, QThreadPool, QTimer, pyqtSignal
+from calculator_core import codecache, evaluate, format_result, guards, keypad, metrics, symbolic
+from calculator_core.history import History
+from calculator_core.preview import IncrementalEvaluator
+from calculator_core.units import evaluate_with_units
+
+HISTORY_PATH = os.path.join(os.path.expanduser("~"), ".calculator_history.db")
+CODE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".calculator_code_cache.db")
+
+# Scientific keys that append a unit to the expression (calculator_core.units knows many more)
+UNIT_KEYS = ('m', 'km', 'kg', 's', 'h', 'N', 'J')
+
+# Keypad buttons with a distinct colour; everything else uses the default button style
+BUTTON_ROLES = {
+    '=': 'equals',
+    'C': 'clear', 'CE': 'clear',
+    '/': 'operator', '*': 'operator', '-': 'operator', '+': 'operator',
+}
+
+# (background, text) colour per role. Buttons are painted by the Fusion style from prebuilt
+# palettes: stylesheet rendering (rounded borders especially) made every page switch repaint
+# several times slower.
+ROLE_COLOURS = {
+    None: ("#6c757d", "white"), # Gray for general buttons
+    'equals': ("#28a745", "white"), # Green for equals
+    'clear': ("#dc3545", "white"), # Red for clear
+    'operator': ("#ffc107", "#333"), # Yellow for operators
+    'mode': ("#6c757d", "white"), # Gray for the inactive mode
+    'mode-active': ("#007bff", "white"), # Blue for the active mode
+}
+
+
+def build_palettes():
+    palettes = {}
+    for role, (background, text) in ROLE_COLOURS.items():
+        palette = QPalette()
+        palette.setColor(QPalette.Button, QColor(background))
+        palette.setColor(QPalette.ButtonText, QColor(text))
+        palettes[role] = palette
+    return palettes
+
+
+class KeypadButton(QPushButton):
+    # At rest a key is drawn by its KeypadPage's snapshot and takes no paint events at all;
+    # it paints itself only while pressed, hovered or focused. Opening a painter per key,
+    # not the drawing, dominated the repaint of a 55-key page on every mode switch.
+    def __init__(self, text):
+        super().__init__(text)
+        self.setUpdatesEnabled(False)
+        self.pressed.connect(self.restyle)
+        self.released.connect(self.restyle)
+
+    def restyle(self):
+        live = self.isDown() or self.underMouse() or self.hasFocus()
+        if live != self.updatesEnabled():
+            self.setUpdatesEnabled(live)  # enabling repaints the key
+            self.parentWidget().update(self.geometry())  # in or out of the snapshot
+
+    def enterEvent(self, event):
+        super().enterEvent(event)
+        self.restyle()
+
+    def leaveEvent(self, event):
+        super().leaveEvent(event)
+        self.restyle()
+
+    def focusInEvent(self, event):
+        super().focusInEvent(event)
+        self.restyle()
+
+    def focusOutEvent(self, event):
+        super().focusOutEvent(event)
+        self.restyle()
+
+    def changeEvent(self, event):
+        # Palette, font or style changes alter the resting face
+        page = self.parentWidget()
+        if isinstance(page, KeypadPage):
+            page.snapshot = None
+            page.update()
+        super().changeEvent(event)
+
+
+class KeypadPage(QWidget):
+    # One grid of KeypadButtons, painted as a single cached picture of their resting faces
+    RESTING = ~(QStyle.State_MouseOver | QStyle.State_HasFocus | QStyle.State_Sunken)
+
+    def __init__(self):
+        super().__init__()
+        self.snapshot = None
+
+    def resizeEvent(self, event):
+        self.snapshot = None  # the layout moved the keys
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        if self.snapshot is None:
+            self.snapshot = self.render_keys()
+        painter = QPainter(self)
+        region = event.region()
+        for key in self.findChildren(KeypadButton):
+            if key.updatesEnabled():
+                region -= QRegion(key.geometry())  # a live key paints its own face
+        painter.setClipRegion(region)
+        painter.drawPixmap(0, 0, self.snapshot)
+        painter.end()
+
+    def render_keys(self):
+        ratio = self.devicePixelRatioF()
+        snapshot = QPixmap(self.size() * ratio)
+        snapshot.setDevicePixelRatio(ratio)
+        snapshot.fill(Qt.transparent)
+        painter = QPainter(snapshot)
+        for key in self.findChildren(KeypadButton):
+            option = QStyleOptionButton()
+            key.initStyleOption(option)
+            option.state = (option.state & self.RESTING) | QStyle.State_Raised
+            painter.save()
+            painter.translate(key.pos())
+            painter.setFont(key.font())  # what QPainter(key) would start with
+            key.style().drawControl(QStyle.CE_PushButton, option, painter, key)
+            painter.restore()
+        painter.end()
+        return snapshot
+
+
+class ModeButton(QPushButton):
+    # Shows whether its mode is active by the palette it paints with; unlike setPalette,
+    # switching that does not send a palette change through the widget on every mode switch
+    def __init__(self, text, palettes):
+        super().__init__(text)
+        self.palettes = palettes
+        self.active = False
+
+    def set_active(self, active):
+        if active != self.active:
+            self.active = active
+            self.update()
+
+    def paintEvent(self, event):
+        option = QStyleOptionButton()
+        self.initStyleOption(option)
+        option.palette = self.palettes['mode-active' if self.active else 'mode']
+        painter = QPainter(self)
+        self.style().drawControl(QStyle.CE_PushButton, option, painter, self)
+        painter.end()
+
+
+class EvaluationSignals(QObject):
+    finished = pyqtSignal(int, str) # job id, formatted result
+    failed = pyqtSignal(int)
+
+
+class EvaluationJob(QRunnable):
+    # Evaluates one expression on a QThreadPool worker so slow input never blocks the window.
+    # Results come back through queued signals, tagged with the job id so stale ones can be dropped.
+    def __init__(self, job_id, expression, angle_unit="rad"):
+        super().__init__()
+        self.job_id = job_id
+        self.expression = expression
+        self.angle_unit = angle_unit
+        self.started = time.perf_counter() # For the round_trip span when metrics are on
+        self.signals = EvaluationSignals()
+
+    def run(self):
+        try:
+            result = format_result(evaluate_with_units(self.expression, angle_unit=self.angle_unit))
+        except Exception:
+            self.signals.failed.emit(self.job_id)
+            return
+        self.signals.finished.emit(self.job_id, result)
+
+
+class PlotWidget(QWidget):
+    # Plots an expression in x and its derivative next to the keypad. Drag to pan, wheel to zoom;
+    # every view change resamples adaptively (calculator_core.plot), so detail follows the zoom.
+    # NumPy is imported on first use: set_expression raises ImportError without it.
+    CURVE_COLOURS = ("#28a745", "#ffc107") # f, f'
+
+    def __init__(self):
+        super().__init__()
+        self.setMinimumSize(320, 320)
+        self.curves = [] # (label, vectorized expression)
+        self.samples = [] # (xs, ys) per curve for the current view
+        self.view = (-10.0, 10.0, -10.0, 10.0) # x_min, x_max, y_min, y_max
+        self.drag_start = None
+
+    def set_expression(self, expression, angle_unit="rad"):
+        from calculator_core import plot
+        from calculator_core.vectorized import compile_vectorized
+        function = compile_vectorized(expression, angle_unit)
+        unknown = function.variables - {"x"}
+        if unknown:
+            raise ValueError(f"Cannot plot over {', '.join(sorted(unknown))}; use x")
+        self.curves = [(f"f(x) = {function.text}", function)]
+        try:
+            slope = symbolic.derivative(expression, "x", angle_unit)
+            self.curves.append((f"f'(x) = {slope}", compile_vectorized(slope, angle_unit)))
+        except ValueError: # '%' and '!' have no derivative; plot f alone
+            pass
+        xs, ys = plot.sample(function, -10.0, 10.0)
+        self.view = (-10.0, 10.0, *plot.auto_range(xs, ys))
+        self.resample()
+
+    def resample(self):
+        from calculator_core import plot
+        x_min, x_max = self.view[:2]
+        # Start at about one sample per two pixels; refinement adds more where the curve bends
+        points = max(64, self.width() // 2)
+        self.samples = [plot.sample(function, x_min, x_max, points=points) for _, function in self.curves]
+        self.update()
+
+    def _to_data(self, pos):
+        x_min, x_max, y_min, y_max = self.view
+        return (x_min + pos.x() / self.width() * (x_max - x_min),
+                y_max - pos.y() / self.height() * (y_max - y_min))
+
+    def paintEvent(self, event):
+        from calculator_core import plot
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), QColor("#333"))
+        x_min, x_max, y_min, y_max = self.view
+        width, height = self.width(), self.height()
+        x_scale = width / (x_max - x_min)
+        y_scale = height / (y_max - y_min)
+        painter.setPen(QPen(QColor("#777"), 1))
+        if x_min <= 0 <= x_max:
+            painter.drawLine(QPointF(-x_min * x_scale, 0), QPointF(-x_min * x_scale, height))
+        if y_min <= 0 <= y_max:
+            painter.drawLine(QPointF(0, y_max * y_scale), QPointF(width, y_max * y_scale))
+        view_height = y_max - y_min
+        for (xs, ys), colour in zip(self.samples, self.CURVE_COLOURS):
+            painter.setPen(QPen(QColor(colour), 2))
+            for run_x, run_y in plot.segments(xs, ys, view_height):
+                # Keep far off-screen points near the view; huge coordinates upset the rasterizer
+                px = (run_x - x_min) * x_scale
+                py = (y_max - run_y.clip(y_min - view_height, y_max + view_height)) * y_scale
+                painter.drawPolyline(QPolygonF([QPointF(x, y) for x, y in zip(px.tolist(), py.tolist())]))
+        for row, ((label, _), colour) in enumerate(zip(self.curves, self.CURVE_COLOURS)):
+            painter.setPen(QColor(colour))
+            painter.drawText(8, 18 + 18 * row, label)
+        painter.setPen(QColor("#aaa"))
+        painter.drawText(8, height - 8, f"x: {x_min:.4g} .. {x_max:.4g}   y: {y_min:.4g} .. {y_max:.4g}")
+
+    def mousePressEvent(self, event):
+        self.drag_start = (event.pos(), self.view)
+
+    def mouseMoveEvent(self, event):
+        if self.drag_start is None:
+            return
+        start, (x_min, x_max, y_min, y_max) = self.drag_start
+        dx = (event.pos().x() - start.x()) / self.width() * (x_max - x_min)
+        dy = (event.pos().y() - start.y()) / self.height() * (y_max - y_min)
+        self.view = (x_min - dx, x_max - dx, y_min + dy, y_max + dy)
+        self.resample()
+
+    def mouseReleaseEvent(self, event):
+        self.drag_start = None
+
+    def wheelEvent(self, event):
+        # Zoom about the point under the cursor, 20% per wheel notch
+        factor = 0.8 ** (event.angleDelta().y() / 120)
+        x, y = self._to_data(event.pos())
+        x_min, x_max, y_min, y_max = self.view
+        self.view = (x + (x_min - x) * factor, x + (x_max - x) * factor,
+                     y + (y_min - y) * factor, y + (y_max - y) * factor)
+        self.resample()
+
+    def resizeEvent(self, event):
+        if self.curves:
+            self.resample()
+
 
 class Calculator(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("My Calculator")
         self.setGeometry(100, 100, 400, 600) # Set initial window size
-        self.initUI()
-        self.current_expression = "" # Stores the full expression for scientific mode
+        self.thread_pool = QThreadPool.globalInstance()
+        self.job_id = 0 # Bumped on every '=' and on cancel; results from older jobs are ignored
+        self.pending_job = None
+        self.angle_unit = "rad" # "rad" or "deg", set by the rad/deg buttons
+        self.previewer = IncrementalEvaluator() # Live preview reuses work between keystrokes
+        # Every '=' is logged; CALCULATOR_HISTORY=":memory:" keeps the log out of the home directory
+        self.history = History(os.environ.get("CALCULATOR_HISTORY", HISTORY_PATH))
+        # Compiled expressions persist too, so a new session skips parsing formulas seen before
+        self.code_cache = codecache.enable(os.environ.get("CALCULATOR_CODE_CACHE", CODE_CACHE_PATH))
+        # Normal-mode chaining: the exact value of the last result (first_num), the operator
+        # typed right after it, and whether we are now reading the operand that follows
         self.first_num = None
         self.operator = None
         self.waiting_for_second_operand = False
+        self.initUI()
+        self.current_expression = "" # Stores the full expression for scientific mode
         self.mode = "normal" # Default mode
 
     def initUI(self):
+        # Shared by every button: one style object, one font and a palette per role
+        self.button_style = QStyleFactory.create("Fusion")
+        self.button_style.setParent(self)
+        self.button_font = QFont()
+        self.button_font.setPixelSize(20)
+        self.palettes = build_palettes()
+
         main_layout = QVBoxLayout()
         main_layout.setContentsMargins(10, 10, 10, 10)
         main_layout.setSpacing(10)
@@ -36,18 +330,30 @@ class Calculator(QWidget):
         self.display.setAlignment(Qt.AlignRight)
         main_layout.addWidget(self.display)
 
+        # --- Live preview of the partial result ---
+        self.preview = QLabel("")
+        self.preview.setAlignment(Qt.AlignRight)
+        self.preview.setStyleSheet("font-size: 18px; color: #888;")
+        main_layout.addWidget(self.preview)
+        self.preview_timer = QTimer(self) # Debounce: only preview once typing pauses briefly
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(50)
+        self.preview_timer.timeout.connect(self.update_preview)
+
         # --- Mode Switcher ---
         mode_layout = QHBoxLayout()
-        self.normal_btn = QPushButton("Normal")
-        self.scientific_btn = QPushButton("Scientific")
+        self.normal_btn = ModeButton("Normal", self.palettes)
+        self.scientific_btn = ModeButton("Scientific", self.palettes)
         
         self.normal_btn.setFixedSize(120, 40)
         self.scientific_btn.setFixedSize(120, 40)
         
-        # Style the mode buttons
-        self.normal_btn.setStyleSheet("QPushButton { font-size: 16px; background-color: #007bff; color: white; border-radius: 5px; } QPushButton:hover { background-color: #0056b3; }")
-        self.scientific_btn.setStyleSheet("QPushButton { font-size: 16px; background-color: #6c757d; color: white; border-radius: 5px; } QPushButton:hover { background-color: #5a6268; }")
-
+        # Style the mode buttons; set_mode just tells each whether it is active
+        mode_font = QFont()
+        mode_font.setPixelSize(16)
+        for btn in (self.normal_btn, self.scientific_btn):
+            btn.setStyle(self.button_style)
+            btn.setFont(mode_font)
 
         self.normal_btn.clicked.connect(lambda: self.set_mode("normal"))
         self.scientific_btn.clicked.connect(lambda: self.set_mode("scientific"))
@@ -62,7 +368,7 @@ class Calculator(QWidget):
         self.stacked_widget = QStackedWidget() # A widget that allows stacking multiple widgets, showing only one at a time
 
         # Normal Buttons
-        normal_buttons_widget = QWidget()
+        normal_buttons_widget = KeypadPage()
         normal_grid_layout = QGridLayout()
         normal_buttons = [
             ('C', 0, 0), ('CE', 0, 1), ('%', 0, 2), ('/', 0, 3),
@@ -76,326 +382,40 @@ class Calculator(QWidget):
         self.stacked_widget.addWidget(normal_buttons_widget)
 
 
-        # Scientific Buttons
-        scientific_buttons_widget = QWidget()
-        scientific_grid_layout = QGridLayout()
-        scientific_buttons = [
-            ('(', 0, 0), (')', 0, 1), ('pi', 0, 2), ('e', 0, 3), ('C', 0, 4), ('CE', 0, 5),
-            ('sin', 1, 0), ('cos', 1, 1), ('tan', 1, 2), ('^', 1, 3), ('/', 1, 4), ('%', 1, 5),
-            ('asin', 2, 0), ('acos', 2, 1), ('atan', 2, 2), ('sqrt', 2, 3), ('*', 2, 4), ('1/x', 2, 5),
-            ('log', 3, 0), ('ln', 3, 1), ('e^x', 3, 2), ('10^x', 3, 3), ('-', 3, 4), ('!', 3, 5),
-            ('7', 4, 0), ('8', 4, 1), ('9', 4, 2), ('+', 4, 3), ('4', 4, 4), ('5', 4, 5),
-            ('4', 5, 0), ('5', 5, 1), ('6', 5, 2), ('0', 5, 3), ('.', 5, 4), ('=', 5, 5) # Example layout, you'd integrate 0-9 and basic ops here better
-        ]
-        # For simplicity, let's create a more complete scientific layout that includes numbers and basic ops
-        # This will be larger, so let's adjust the window size if it's too small for your screen.
-        scientific_full_buttons = [
-            ('(', 0, 0), (')', 0, 1), ('%', 0, 2), ('C', 0, 3), ('CE', 0, 4), ('/', 0, 5),
-            ('sin', 1, 0), ('cos', 1, 1), ('tan', 1, 2), ('7', 1, 3), ('8', 1, 4), ('9', 1, 5),
-            ('asin', 2, 0), ('acos', 2, 1), ('atan', 2, 2), ('4', 2, 3), ('5', 2, 4), ('6', 2, 5),
-            ('log', 3, 0), ('ln', 3, 1), ('sqrt', 3, 2), ('1', 3, 3), ('2', 3, 4), ('3', 3, 5),
-            ('pi', 4, 0), ('e', 4, 1), ('^', 4, 2), ('0', 4, 3), ('.', 4, 4), ('=', 4, 5),
-            ('*', 1, 6), ('-', 2, 6), ('+', 3, 6), ('1/x', 4, 6), ('!', 5, 6), # Add some more ops for column 6
-            ('exp', 5, 0), ('mod', 5, 1), ('x^2', 5, 2), ('x^3', 5, 3), ('rad', 5, 4), ('deg', 5, 5)
-        ]
-        self._add_buttons_to_layout(scientific_grid_layout, scientific_full_buttons, self.on_button_click)
-        scientific_buttons_widget.setLayout(scientific_grid_layout)
-        self.stacked_widget.addWidget(scientific_buttons_widget)
+        # Scientific Buttons are built on first use (see _build_scientific_grid) to keep startup fast
+        self.scientific_buttons_widget = None
 
-        main_layout.addWidget(self.stacked_widget)
+        # The plot panel sits beside the keypads; it is created by the first 'plot' press
+        self.keypad_layout = QHBoxLayout()
+        self.keypad_layout.addWidget(self.stacked_widget)
+        self.plot_widget = None
+        main_layout.addLayout(self.keypad_layout)
         self.setLayout(main_layout)
 
         self.set_mode("normal") # Set initial mode
 
-        # Global stylesheet for all buttons
-        self.setStyleSheet("""
-            QPushButton {
-                font-size: 20px;
-                padding: 15px;
-                border: 1px solid #555;
-                border-radius: 5px;
-                background-color: #6c757d; /* Gray for general buttons */
-                color: white;
-            }
-            QPushButton:hover {
-                background-color: #5a6268;
-            }
-            QPushButton[text="="] { background-color: #28a745; } /* Green for equals */
-            QPushButton[text="="]:hover { background-color: #218838; }
-            QPushButton[text="C"], QPushButton[text="CE"] { background-color: #dc3545; } /* Red for clear */
-            QPushButton[text="C"]:hover, QPushButton[text="CE"]:hover { background-color: #c82333; }
-            QPushButton[text="/"], QPushButton[text="*"], QPushButton[text="-"], QPushButton[text="+"] { background-color: #ffc107; color: #333; } /* Yellow for operators */
-            QPushButton[text="/"]:hover, QPushButton[text="*"]:hover, QPushButton[text="-"]:hover, QPushButton[text="+"]:hover { background-color: #e0a800; }
-            QPushButton[text="Normal"] { background-color: #007bff; } /* Blue for active normal mode */
-            QPushButton[text="Normal"]:hover { background-color: #0056b3; }
-            QPushButton[text="Scientific"] { background-color: #6c757d; } /* Gray for inactive scientific mode */
-            QPushButton[text="Scientific"]:hover { background-color: #5a6268; }
-        """)
+    def _make_button(self, btn_text, click_handler):
+        # Shared by both grids: one place that sizes, styles and wires a keypad button
+        button = KeypadButton(btn_text)
+        button.setFixedSize(60, 60)
+        button.setStyle(self.button_style)
+        button.setFont(self.button_font)
+        button.setPalette(self.palettes[BUTTON_ROLES.get(btn_text)])
+        button.clicked.connect(click_handler)
+        return button
 
     def _add_buttons_to_layout(self, layout, buttons_data, click_handler):
         for btn_text, row, col, *span in buttons_data:
-            button = QPushButton(btn_text)
-            button.setFixedSize(60, 60)
-            button.clicked.connect(click_handler)
+            button = self._make_button(btn_text, click_handler)
             if span:
                 layout.addWidget(button, row, col, *span)
             else:
                 layout.addWidget(button, row, col)
 
-    def set_mode(self, mode):
-        self.mode = mode
-        if self.mode == "normal":
-            self.stacked_widget.setCurrentIndex(0) # Show normal buttons
-            self.normal_btn.setStyleSheet("QPushButton { font-size: 16px; background-color: #007bff; color: white; border-radius: 5px; } QPushButton:hover { background-color: #0056b3; }")
-            self.scientific_btn.setStyleSheet("QPushButton { font-size: 16px; background-color: #6c757d; color: white; border-radius: 5px; } QPushButton:hover { background-color: #5a6268; }")
-        else: # scientific mode
-            self.stacked_widget.setCurrentIndex(1) # Show scientific buttons
-            self.scientific_btn.setStyleSheet("QPushButton { font-size: 16px; background-color: #007bff; color: white; border-radius: 5px; } QPushButton:hover { background-color: #0056b3; }")
-            self.normal_btn.setStyleSheet("QPushButton { font-size: 16px; background-color: #6c757d; color: white; border-radius: 5px; } QPushButton:hover { background-color: #5a6268; }")
-        self.current_expression = "" # Clear expression on mode switch
-        self.display.setText("")
-
-
-    def on_button_click(self):
-        sender = self.sender().text()
-
-        if sender == 'C': # Clear all
-            self.current_expression = ""
-            self.display.setText("")
-        elif sender == 'CE': # Clear entry
-            if self.current_expression and self.current_expression[-1].isdigit():
-                self.current_expression = self.current_expression[:-1]
-            self.display.setText(self.current_expression)
-        elif sender == '=':
-            try:
-                # Use Python's eval for simplicity, but for production, a safer parser is recommended.
-                # Replace math functions for eval
-                expression_to_evaluate = self.current_expression.replace('^', '**') \
-                                                           .replace('log', 'math.log10') \
-                                                           .replace('ln', 'math.log') \
-                                                           .replace('sqrt', 'math.sqrt') \
-                                                           .replace('pi', str(math.pi)) \
-                                                           .replace('e', str(math.e)) \
-                                                           .replace('sin', 'math.sin') \
-                                                           .replace('cos', 'math.cos') \
-                                                           .replace('tan', 'math.tan') \
-                                                           .replace('asin', 'math.asin') \
-                                                           .replace('acos', 'math.acos') \
-                                                           .replace('atan', 'math.atan') \
-                                                           .replace('x^2', '**2') \
-                                                           .replace('x^3', '**3') \
-                                                           .replace('1/x', '1/') \
-                                                           .replace('exp', 'math.exp') \
-                                                           .replace('mod', '%')
-
-                # Handle factorial: find 'x!' and replace with math.factorial(x)
-                import re
-                def factorial_replacer(match):
-                    num = int(match.group(1))
-                    return str(math.factorial(num))
-                expression_to_evaluate = re.sub(r'(\d+)!', factorial_replacer, expression_to_evaluate)
-                
-                # Check for radians/degrees
-                if 'rad' in expression_to_evaluate:
-                    expression_to_evaluate = expression_to_evaluate.replace('rad', '')
-                    # Assume angles are input in degrees and convert to radians if 'rad' is used as a modifier
-                    # This requires more complex parsing for functions like sin(45rad)
-                    # For simplicity, let's assume 'rad' button just changes a global setting or is not a direct part of the expression
-                    # For now, we'll just remove it and assume standard math.sin expects radians.
-                    # A proper implementation would convert the arguments to sin/cos/tan before calling the math function.
-                if 'deg' in expression_to_evaluate:
-                    expression_to_evaluate = expression_to_evaluate.replace('deg', '')
-                    # Similar to 'rad', this needs careful handling of argument conversion.
-
-                result = str(eval(expression_to_evaluate, {"__builtins__": None}, {'math': math}))
-                self.display.setText(result)
-                self.current_expression = result # Allow chaining operations
-            except Exception as e:
-                self.display.setText("Error")
-                self.current_expression = ""
-        elif sender in ['pi', 'e']:
-            self.current_expression += str(math.pi if sender == 'pi' else math.e)
-            self.display.setText(self.current_expression)
-        elif sender == 'x^2': # Specific scientific operations
-            try:
-                val = float(eval(self.current_expression, {"__builtins__": None}, {}))
-                self.current_expression = str(val**2)
-                self.display.setText(self.current_expression)
-            except Exception:
-                self.display.setText("Error")
-                self.current_expression = ""
-        elif sender == 'x^3':
-            try:
-                val = float(eval(self.current_expression, {"__builtins__": None}, {}))
-                self.current_expression = str(val**3)
-                self.display.setText(self.current_expression)
-            except Exception:
-                self.display.setText("Error")
-                self.current_expression = ""
-        elif sender == 'sqrt':
-            self.current_expression += "math.sqrt("
-            self.display.setText(self.current_expression)
-        elif sender == 'log':
-            self.current_expression += "math.log10("
-            self.display.setText(self.current_expression)
-        elif sender == 'ln':
-            self.current_expression += "math.log("
-            self.display.setText(self.current_expression)
-        elif sender == 'e^x':
-            self.current_expression += "math.exp("
-            self.display.setText(self.current_expression)
-        elif sender == '10^x':
-            self.current_expression += "10**" # Or a function that takes an arg
-            self.display.setText(self.current_expression)
-        elif sender == '!':
-            # This is a bit tricky with eval. It's better to parse before eval.
-            # For simplicity, assume it's applied to the last number entered.
-            # A more robust solution would be to use a proper expression parser.
-            try:
-                num = int(self.current_expression)
-                self.current_expression = str(math.factorial(num))
-                self.display.setText(self.current_expression)
-            except ValueError:
-                self.display.setText("Error")
-                self.current_expression = ""
-            except Exception: # if not a valid number for factorial
-                self.display.setText("Error")
-                self.current_expression = ""
-        elif sender == '1/x':
-            try:
-                val = float(eval(self.current_expression, {"__builtins__": None}, {}))
-                if val == 0:
-                    self.display.setText("Error")
-                    self.current_expression = ""
-                else:
-                    self.current_expression = str(1/val)
-                    self.display.setText(self.current_expression)
-            except Exception:
-                self.display.setText("Error")
-                self.current_expression = ""
-        elif sender in ['sin', 'cos', 'tan', 'asin', 'acos', 'atan']:
-            # Assume input is in radians for math module functions
-            # A future improvement would be to add a Rad/Deg toggle
-            self.current_expression += f"math.{sender}("
-            self.display.setText(self.current_expression)
-        elif sender in ['rad', 'deg']:
-            # For now, these buttons don't directly modify the expression string
-            # In a real scientific calculator, they would toggle a global setting
-            # for angle units (radians vs. degrees)
-            self.display.setText(f"Mode set to {sender.upper()}")
-            # You would store this mode in a self.angle_unit variable (e.g., "radians", "degrees")
-            # and use it to convert values before calling math.sin, math.cos, etc.
-        else:
-            self.current_expression += sender
-            self.display.setText(self.current_expression)
-
-    # Helper function for factorial evaluation if needed
-    def factorial(self, n):
-        if n < 0:
-            raise ValueError("Factorial is not defined for negative numbers")
-        if n == 0:
-            return 1
-        res = 1
-        for i in range(1, n + 1):
-            res *= i
-        return res
-
-if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    calc = Calculator()
-    calc.show()
-    sys.exit(app.exec_())
-import sys
-from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QLineEdit,
-                             QPushButton, QGridLayout, QHBoxLayout, QStackedWidget)
-from PyQt5.QtCore import Qt
-import math # Needed for scientific functions
-
-class Calculator(QWidget):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("My Calculator")
-        self.setGeometry(100, 100, 400, 600) # Set initial window size
-        self.initUI()
-        self.current_expression = "" # Stores the full expression for scientific mode
-        self.first_num = None
-        self.operator = None
-        self.waiting_for_second_operand = False
-        self.mode = "normal" # Default mode
-
-    def initUI(self):
-        main_layout = QVBoxLayout()
-        main_layout.setContentsMargins(10, 10, 10, 10)
-        main_layout.setSpacing(10)
-
-        # --- Display ---
-        self.display = QLineEdit()
-        self.display.setReadOnly(True)
-        self.display.setFixedHeight(70)
-        self.display.setStyleSheet("""
-            font-size: 35px;
-            padding: 5px;
-            background-color: #333;
-            color: white;
-            border: 1px solid #555;
-            border-radius: 5px;
-        """)
-        self.display.setAlignment(Qt.AlignRight)
-        main_layout.addWidget(self.display)
-
-        # --- Mode Switcher ---
-        mode_layout = QHBoxLayout()
-        self.normal_btn = QPushButton("Normal")
-        self.scientific_btn = QPushButton("Scientific")
-        
-        self.normal_btn.setFixedSize(120, 40)
-        self.scientific_btn.setFixedSize(120, 40)
-        
-        # Style the mode buttons
-        self.normal_btn.setStyleSheet("QPushButton { font-size: 16px; background-color: #007bff; color: white; border-radius: 5px; } QPushButton:hover { background-color: #0056b3; }")
-        self.scientific_btn.setStyleSheet("QPushButton { font-size: 16px; background-color: #6c757d; color: white; border-radius: 5px; } QPushButton:hover { background-color: #5a6268; }")
-
-
-        self.normal_btn.clicked.connect(lambda: self.set_mode("normal"))
-        self.scientific_btn.clicked.connect(lambda: self.set_mode("scientific"))
-        
-        mode_layout.addWidget(self.normal_btn)
-        mode_layout.addWidget(self.scientific_btn)
-        mode_layout.addStretch() # Pushes buttons to the left
-
-        main_layout.addLayout(mode_layout)
-
-        # --- Button Layouts (Normal and Scientific) ---
-        self.stacked_widget = QStackedWidget() # A widget that allows stacking multiple widgets, showing only one at a time
-
-        # Normal Buttons
-        normal_buttons_widget = QWidget()
-        normal_grid_layout = QGridLayout()
-        normal_buttons = [
-            ('C', 0, 0), ('CE', 0, 1), ('%', 0, 2), ('/', 0, 3),
-            ('7', 1, 0), ('8', 1, 1), ('9', 1, 2), ('*', 1, 3),
-            ('4', 2, 0), ('5', 2, 1), ('6', 2, 2), ('-', 2, 3),
-            ('1', 3, 0), ('2', 3, 1), ('3', 3, 2), ('+', 3, 3),
-            ('0', 4, 0, 1, 2), ('.', 4, 2), ('=', 4, 3)
-        ]
-        self._add_buttons_to_layout(normal_grid_layout, normal_buttons, self.on_button_click)
-        normal_buttons_widget.setLayout(normal_grid_layout)
-        self.stacked_widget.addWidget(normal_buttons_widget)
-
-
-        # Scientific Buttons
-        scientific_buttons_widget = QWidget()
+    def _build_scientific_grid(self):
+        scientific_buttons_widget = KeypadPage()
         scientific_grid_layout = QGridLayout()
-        scientific_buttons = [
-            ('(', 0, 0), (')', 0, 1), ('pi', 0, 2), ('e', 0, 3), ('C', 0, 4), ('CE', 0, 5),
-            ('sin', 1, 0), ('cos', 1, 1), ('tan', 1, 2), ('^', 1, 3), ('/', 1, 4), ('%', 1, 5),
-            ('asin', 2, 0), ('acos', 2, 1), ('atan', 2, 2), ('sqrt', 2, 3), ('*', 2, 4), ('1/x', 2, 5),
-            ('log', 3, 0), ('ln', 3, 1), ('e^x', 3, 2), ('10^x', 3, 3), ('-', 3, 4), ('!', 3, 5),
-            ('7', 4, 0), ('8', 4, 1), ('9', 4, 2), ('+', 4, 3), ('4', 4, 4), ('5', 4, 5),
-            ('4', 5, 0), ('5', 5, 1), ('6', 5, 2), ('0', 5, 3), ('.', 5, 4), ('=', 5, 5) # Example layout, you'd integrate 0-9 and basic ops here better
-        ]
-        # For simplicity, let's create a more complete scientific layout that includes numbers and basic ops
-        # This will be larger, so let's adjust the window size if it's too small for your screen.
+        # This layout is larger, so adjust the window size if it's too small for your screen.
         scientific_full_buttons = [
             ('(', 0, 0), (')', 0, 1), ('%', 0, 2), ('C', 0, 3), ('CE', 0, 4), ('/', 0, 5),
             ('sin', 1, 0), ('cos', 1, 1), ('tan', 1, 2), ('7', 1, 3), ('8', 1, 4), ('9', 1, 5),
@@ -403,138 +423,241 @@ class Calculator(QWidget):
             ('log', 3, 0), ('ln', 3, 1), ('sqrt', 3, 2), ('1', 3, 3), ('2', 3, 4), ('3', 3, 5),
             ('pi', 4, 0), ('e', 4, 1), ('^', 4, 2), ('0', 4, 3), ('.', 4, 4), ('=', 4, 5),
             ('*', 1, 6), ('-', 2, 6), ('+', 3, 6), ('1/x', 4, 6), ('!', 5, 6), # Add some more ops for column 6
-            ('exp', 5, 0), ('mod', 5, 1), ('x^2', 5, 2), ('x^3', 5, 3), ('rad', 5, 4), ('deg', 5, 5)
+            ('exp', 5, 0), ('mod', 5, 1), ('x^2', 5, 2), ('x^3', 5, 3), ('rad', 5, 4), ('deg', 5, 5),
+            ('x', 6, 0), ('d/dx', 6, 1), ('plot', 6, 2), ('solve', 6, 3), # Expressions in x
+            ('±', 6, 4), # Result with guaranteed error bounds
+            ('to', 6, 5), ('base', 6, 6), # Convert to a unit; cycle the result through hex, bin, oct
+            ('m', 7, 0), ('km', 7, 1), ('kg', 7, 2), ('s', 7, 3), ('h', 7, 4), ('N', 7, 5), ('J', 7, 6)
         ]
         self._add_buttons_to_layout(scientific_grid_layout, scientific_full_buttons, self.on_button_click)
         scientific_buttons_widget.setLayout(scientific_grid_layout)
         self.stacked_widget.addWidget(scientific_buttons_widget)
-
-        main_layout.addWidget(self.stacked_widget)
-        self.setLayout(main_layout)
-
-        self.set_mode("normal") # Set initial mode
-
-        # Global stylesheet for all buttons
-        self.setStyleSheet("""
-            QPushButton {
-                font-size: 20px;
-                padding: 15px;
-                border: 1px solid #555;
-                border-radius: 5px;
-                background-color: #6c757d; /* Gray for general buttons */
-                color: white;
-            }
-            QPushButton:hover {
-                background-color: #5a6268;
-            }
-            QPushButton[text="="] { background-color: #28a745; } /* Green for equals */
-            QPushButton[text="="]:hover { background-color: #218838; }
-            QPushButton[text="C"], QPushButton[text="CE"] { background-color: #dc3545; } /* Red for clear */
-            QPushButton[text="C"]:hover, QPushButton[text="CE"]:hover { background-color: #c82333; }
-            QPushButton[text="/"], QPushButton[text="*"], QPushButton[text="-"], QPushButton[text="+"] { background-color: #ffc107; color: #333; } /* Yellow for operators */
-            QPushButton[text="/"]:hover, QPushButton[text="*"]:hover, QPushButton[text="-"]:hover, QPushButton[text="+"]:hover { background-color: #e0a800; }
-            QPushButton[text="Normal"] { background-color: #007bff; } /* Blue for active normal mode */
-            QPushButton[text="Normal"]:hover { background-color: #0056b3; }
-            QPushButton[text="Scientific"] { background-color: #6c757d; } /* Gray for inactive scientific mode */
-            QPushButton[text="Scientific"]:hover { background-color: #5a6268; }
-        """)
-
-    def _add_buttons_to_layout(self, layout, buttons_data, click_handler):
-        for btn_text, row, col, *span in buttons_data:
-            button = QPushButton(btn_text)
-            button.setFixedSize(60, 60)
-            button.clicked.connect(click_handler)
-            if span:
-                layout.addWidget(button, row, col, *span)
-            else:
-                layout.addWidget(button, row, col)
+        self.scientific_buttons_widget = scientific_buttons_widget
 
     def set_mode(self, mode):
         self.mode = mode
         if self.mode == "normal":
             self.stacked_widget.setCurrentIndex(0) # Show normal buttons
-            self.normal_btn.setStyleSheet("QPushButton { font-size: 16px; background-color: #007bff; color: white; border-radius: 5px; } QPushButton:hover { background-color: #0056b3; }")
-            self.scientific_btn.setStyleSheet("QPushButton { font-size: 16px; background-color: #6c757d; color: white; border-radius: 5px; } QPushButton:hover { background-color: #5a6268; }")
         else: # scientific mode
+            if self.scientific_buttons_widget is None:
+                self._build_scientific_grid()
             self.stacked_widget.setCurrentIndex(1) # Show scientific buttons
-            self.scientific_btn.setStyleSheet("QPushButton { font-size: 16px; background-color: #007bff; color: white; border-radius: 5px; } QPushButton:hover { background-color: #0056b3; }")
-            self.normal_btn.setStyleSheet("QPushButton { font-size: 16px; background-color: #6c757d; color: white; border-radius: 5px; } QPushButton:hover { background-color: #5a6268; }")
+        # Highlight the active mode button (a prebuilt palette; no stylesheet re-matching)
+        normal = self.mode == "normal"
+        self.normal_btn.set_active(normal)
+        self.scientific_btn.set_active(not normal)
+        self.cancel_evaluation()
+        self.reset_chain()
         self.current_expression = "" # Clear expression on mode switch
         self.display.setText("")
 
+    def show_plot(self):
+        if self.plot_widget is None:
+            self.plot_widget = PlotWidget()
+            self.keypad_layout.addWidget(self.plot_widget, 1)
+            self.resize(max(self.width(), 900), self.height())
+        try:
+            self.plot_widget.set_expression(self.current_expression, self.angle_unit)
+        except ImportError:
+            self.plot_widget.hide()
+            self.display.setText("Plotting needs NumPy")
+            return
+        except Exception:
+            self.display.setText("Error")
+            return
+        self.plot_widget.show()
+
+    def solve_expression(self):
+        # Roots of the expression in x: over the plotted x range if the plot is open, else [-10, 10]
+        lo, hi = -10.0, 10.0
+        if self.plot_widget is not None and self.plot_widget.isVisible():
+            lo, hi = self.plot_widget.view[:2]
+        try:
+            from calculator_core.solve import find_roots
+            solution = find_roots(self.current_expression, lo, hi, angle_unit=self.angle_unit)
+        except ImportError:
+            self.display.setText("Solving needs NumPy")
+            return
+        except Exception:
+            self.display.setText("Error")
+            return
+        roots = [format_result(float(root)) for root in solution.roots]
+        if not roots:
+            self.display.setText(f"No roots in [{lo:.4g}, {hi:.4g}]")
+        else:
+            self.display.setText("x = " + ", ".join(roots[:5]) + (", ..." if len(roots) > 5 else ""))
+        # The expression stays editable; the preview line reports the work done instead of a preview
+        self.preview_timer.stop()
+        self.preview.setText(f"{len(roots)} root(s), {int(solution.iterations.sum())} iterations, "
+                             f"{solution.seconds * 1000:.1f} ms")
+
+    def bound_expression(self):
+        # Evaluate with interval arithmetic: the result, and in the preview line how far it can be off
+        try:
+            from calculator_core.interval import evaluate_bounded
+            enclosure = evaluate_bounded(self.current_expression, angle_unit=self.angle_unit)
+        except Exception:
+            self.display.setText("Error")
+            self.current_expression = ""
+            return
+        value = enclosure.value
+        if enclosure.digits is None:
+            result = format_result(value)
+        else:
+            result = str(value.normalize(Context(prec=enclosure.digits)))
+        self.reset_chain()
+        self.display.setText(result)
+        self.current_expression = result
+        self.preview_timer.stop()
+        if float('inf') in (-enclosure.lower, enclosure.upper):
+            # Past the float range (100000!) or around a pole (tan(pi/2)): no finite bound
+            bound = "unbounded"
+        elif enclosure.lower == enclosure.upper:
+            bound = "exact"
+        else:
+            error = max(value - enclosure.lower, enclosure.upper - value)
+            bound = f"± {float(error):.2g}"
+        if enclosure.digits is not None:
+            bound += f" ({enclosure.digits} digits)"
+        self.preview.setText(bound)
+
+    def cycle_base(self):
+        # Show the current result in the next base: decimal -> hex -> bin -> oct -> decimal
+        prefix = self.current_expression.lstrip("-")[:2].lower()
+        target = {"0x": "bin", "0b": "oct", "0o": "dec"}.get(prefix, "hex")
+        try:
+            result = format_result(evaluate_with_units(f"{self.current_expression} to {target}",
+                                                       angle_unit=self.angle_unit))
+        except Exception:
+            self.display.setText("Error")
+            self.current_expression = ""
+            return
+        self.reset_chain()
+        self.display.setText(result)
+        self.current_expression = result
+
+    def reset_chain(self):
+        self.first_num = None
+        self.operator = None
+        self.waiting_for_second_operand = False
+
+    def evaluate_normal(self):
+        # Normal mode: exact keypad arithmetic on the GUI thread, no engine, no worker.
+        # Returns False when the text needs the general engine (e.g. a chained scientific result).
+        try:
+            if self.waiting_for_second_operand:
+                typed = self.current_expression[len(keypad.format_exact(self.first_num)):]
+                value = keypad.evaluate(typed, first=self.first_num)
+            else:
+                value = keypad.evaluate(self.current_expression)
+        except keypad.UnsupportedInput:
+            return False
+        except Exception:
+            self.history.record(self.current_expression, "Error", ok=False, angle_unit=self.angle_unit,
+                                mode="normal")
+            self.reset_chain()
+            self.display.setText("Error")
+            self.current_expression = ""
+            return True
+        result = keypad.format_exact(value)
+        self.history.record(self.current_expression, result, angle_unit=self.angle_unit, mode="normal")
+        self.reset_chain()
+        self.first_num = value
+        with metrics.span("display"):
+            self.display.setText(result)
+        self.current_expression = result
+        return True
+
+    def cancel_evaluation(self):
+        # A running evaluation cannot be interrupted, but its result will be discarded
+        self.job_id += 1
+        self.pending_job = None
+
+    def on_evaluation_finished(self, job_id, result):
+        if job_id != self.job_id:
+            return
+        self.history.record(self.pending_job.expression, result, angle_unit=self.pending_job.angle_unit)
+        with metrics.span("display"):
+            self.display.setText(result)
+        if metrics.enabled:
+            metrics.observe("round_trip", time.perf_counter() - self.pending_job.started)
+        self.pending_job = None
+        self.current_expression = result # Allow chaining operations
+
+    def on_evaluation_failed(self, job_id):
+        if job_id != self.job_id:
+            return
+        self.history.record(self.pending_job.expression, "Error", ok=False, angle_unit=self.pending_job.angle_unit)
+        self.pending_job = None
+        self.display.setText("Error")
+        self.current_expression = ""
+
+
+    def closeEvent(self, event):
+        self.history.close() # Writes out any buffered history entries
+        self.code_cache.flush()
+        super().closeEvent(event)
+
+    def update_preview(self):
+        result = None
+        if self.pending_job is None:
+            result = self.previewer.update(self.current_expression)
+        # No point previewing a bare number such as a just-computed result
+        self.preview.setText("" if result is None or result == self.current_expression else result)
 
     def on_button_click(self):
         sender = self.sender().text()
+        self.preview_timer.start() # (Re)start the debounce for the live preview
 
         if sender == 'C': # Clear all
+            self.cancel_evaluation()
+            self.reset_chain()
             self.current_expression = ""
             self.display.setText("")
         elif sender == 'CE': # Clear entry
-            if self.current_expression and self.current_expression[-1].isdigit():
+            if self.pending_job is not None: # CE while computing just cancels
+                self.cancel_evaluation()
+            elif self.current_expression and self.current_expression[-1].isdigit():
                 self.current_expression = self.current_expression[:-1]
+                if not self.waiting_for_second_operand:
+                    self.reset_chain() # The result itself was edited; it is plain text again
             self.display.setText(self.current_expression)
+        elif self.pending_job is not None:
+            return # Ignore input until the running evaluation finishes or is cancelled
         elif sender == '=':
-            try:
-                # Use Python's eval for simplicity, but for production, a safer parser is recommended.
-                # Replace math functions for eval
-                expression_to_evaluate = self.current_expression.replace('^', '**') \
-                                                           .replace('log', 'math.log10') \
-                                                           .replace('ln', 'math.log') \
-                                                           .replace('sqrt', 'math.sqrt') \
-                                                           .replace('pi', str(math.pi)) \
-                                                           .replace('e', str(math.e)) \
-                                                           .replace('sin', 'math.sin') \
-                                                           .replace('cos', 'math.cos') \
-                                                           .replace('tan', 'math.tan') \
-                                                           .replace('asin', 'math.asin') \
-                                                           .replace('acos', 'math.acos') \
-                                                           .replace('atan', 'math.atan') \
-                                                           .replace('x^2', '**2') \
-                                                           .replace('x^3', '**3') \
-                                                           .replace('1/x', '1/') \
-                                                           .replace('exp', 'math.exp') \
-                                                           .replace('mod', '%')
-
-                # Handle factorial: find 'x!' and replace with math.factorial(x)
-                import re
-                def factorial_replacer(match):
-                    num = int(match.group(1))
-                    return str(math.factorial(num))
-                expression_to_evaluate = re.sub(r'(\d+)!', factorial_replacer, expression_to_evaluate)
-                
-                # Check for radians/degrees
-                if 'rad' in expression_to_evaluate:
-                    expression_to_evaluate = expression_to_evaluate.replace('rad', '')
-                    # Assume angles are input in degrees and convert to radians if 'rad' is used as a modifier
-                    # This requires more complex parsing for functions like sin(45rad)
-                    # For simplicity, let's assume 'rad' button just changes a global setting or is not a direct part of the expression
-                    # For now, we'll just remove it and assume standard math.sin expects radians.
-                    # A proper implementation would convert the arguments to sin/cos/tan before calling the math function.
-                if 'deg' in expression_to_evaluate:
-                    expression_to_evaluate = expression_to_evaluate.replace('deg', '')
-                    # Similar to 'rad', this needs careful handling of argument conversion.
-
-                result = str(eval(expression_to_evaluate, {"__builtins__": None}, {'math': math}))
-                self.display.setText(result)
-                self.current_expression = result # Allow chaining operations
-            except Exception as e:
-                self.display.setText("Error")
-                self.current_expression = ""
+            if self.mode == "normal" and self.evaluate_normal():
+                return
+            # Identical expressions are answered straight from the history
+            with metrics.span("history_lookup"):
+                cached = self.history.lookup(self.current_expression, self.angle_unit)
+            if cached is not None:
+                self.history.record(self.current_expression, cached, angle_unit=self.angle_unit)
+                self.display.setText(cached)
+                self.current_expression = cached
+                return
+            # Evaluate on a worker thread; on_evaluation_finished/failed pick up the result
+            self.job_id += 1
+            job = EvaluationJob(self.job_id, self.current_expression, self.angle_unit)
+            job.signals.finished.connect(self.on_evaluation_finished)
+            job.signals.failed.connect(self.on_evaluation_failed)
+            self.pending_job = job
+            self.display.setText("Computing...")
+            self.thread_pool.start(job)
         elif sender in ['pi', 'e']:
-            self.current_expression += str(math.pi if sender == 'pi' else math.e)
+            self.current_expression += sender # Kept symbolic; the engine supplies the constant
             self.display.setText(self.current_expression)
         elif sender == 'x^2': # Specific scientific operations
             try:
-                val = float(eval(self.current_expression, {"__builtins__": None}, {}))
-                self.current_expression = str(val**2)
+                val = evaluate(self.current_expression, angle_unit=self.angle_unit) # Not forced to float, so integers stay exact
+                self.current_expression = format_result(guards.power(val, 2))
                 self.display.setText(self.current_expression)
             except Exception:
                 self.display.setText("Error")
                 self.current_expression = ""
         elif sender == 'x^3':
             try:
-                val = float(eval(self.current_expression, {"__builtins__": None}, {}))
-                self.current_expression = str(val**3)
+                val = evaluate(self.current_expression, angle_unit=self.angle_unit) # Not forced to float, so integers stay exact
+                self.current_expression = format_result(guards.power(val, 3))
                 self.display.setText(self.current_expression)
             except Exception:
                 self.display.setText("Error")
@@ -560,7 +683,7 @@ class Calculator(QWidget):
             # A more robust solution would be to use a proper expression parser.
             try:
                 num = int(self.current_expression)
-                self.current_expression = str(math.factorial(num))
+                self.current_expression = format_result(guards.factorial(num))
                 self.display.setText(self.current_expression)
             except ValueError:
                 self.display.setText("Error")
@@ -570,29 +693,58 @@ class Calculator(QWidget):
                 self.current_expression = ""
         elif sender == '1/x':
             try:
-                val = float(eval(self.current_expression, {"__builtins__": None}, {}))
+                val = evaluate(self.current_expression, angle_unit=self.angle_unit)
                 if val == 0:
                     self.display.setText("Error")
                     self.current_expression = ""
                 else:
-                    self.current_expression = str(1/val)
+                    self.current_expression = format_result(1/val)
                     self.display.setText(self.current_expression)
             except Exception:
                 self.display.setText("Error")
                 self.current_expression = ""
         elif sender in ['sin', 'cos', 'tan', 'asin', 'acos', 'atan']:
-            # Assume input is in radians for math module functions
-            # A future improvement would be to add a Rad/Deg toggle
+            # Angles are read in self.angle_unit, toggled by the rad/deg buttons
             self.current_expression += f"math.{sender}("
             self.display.setText(self.current_expression)
+        elif sender == 'd/dx':
+            # Replace the expression by its derivative in x, worked out symbolically
+            try:
+                self.current_expression = symbolic.derivative(self.current_expression, "x", self.angle_unit)
+                self.display.setText(self.current_expression)
+            except Exception:
+                self.display.setText("Error")
+                self.current_expression = ""
+        elif sender == 'plot':
+            self.show_plot()
+        elif sender == 'solve':
+            self.solve_expression()
+        elif sender == '±':
+            self.bound_expression()
+        elif sender in UNIT_KEYS:
+            # Units follow their number as a separate word: '3 km', '9.8 m/s^2' (typed as m / s ^ 2)
+            self.current_expression += f" {sender}"
+            self.display.setText(self.current_expression)
+        elif sender == 'to':
+            self.current_expression += " to"
+            self.display.setText(self.current_expression)
+        elif sender == 'base':
+            self.cycle_base()
         elif sender in ['rad', 'deg']:
-            # For now, these buttons don't directly modify the expression string
-            # In a real scientific calculator, they would toggle a global setting
-            # for angle units (radians vs. degrees)
+            # Toggle the angle unit used by sin/cos/tan and their inverses; the expression is unchanged
+            self.angle_unit = sender
+            self.previewer.set_angle_unit(sender)
             self.display.setText(f"Mode set to {sender.upper()}")
-            # You would store this mode in a self.angle_unit variable (e.g., "radians", "degrees")
-            # and use it to convert values before calling math.sin, math.cos, etc.
         else:
+            if self.first_num is not None and not self.waiting_for_second_operand:
+                if sender in ['+', '-', '*', '/', '%']:
+                    # Continue from the exact previous result
+                    self.operator = sender
+                    self.waiting_for_second_operand = True
+                else:
+                    # A digit after a result starts a new calculation
+                    self.reset_chain()
+                    self.current_expression = ""
             self.current_expression += sender
             self.display.setText(self.current_expression)
 
@@ -607,8 +759,29 @@ class Calculator(QWidget):
             res *= i
         return res
 
+class FirstFrameProbe(QObject):
+    # Prints a marker on the first paint and quits; benchmarks/bench_startup.py times process start to this line
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            print("first-frame", flush=True)
+            QTimer.singleShot(0, QApplication.quit)
+        return False
+
+
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     calc = Calculator()
+    if os.environ.get("CALCULATOR_STARTUP_PROBE"):
+        probe = FirstFrameProbe()
+        calc.installEventFilter(probe)
+    # CALCULATOR_PROFILE=out.folded samples stacks for a flame graph (metrics.Sampler)
+    sampler = None
+    if os.environ.get("CALCULATOR_PROFILE"):
+        sampler = metrics.Sampler().start()
     calc.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    status = app.exec_()
+    if sampler is not None:
+        sampler.stop()
+        sampler.write(os.environ["CALCULATOR_PROFILE"])
+    sys.exit(status)
@@ -0,0 +1,229 @@
+"""Benchmarks for the '=' evaluation hot path.
+
+Compares the legacy string-rewrite + re.sub + eval path with the expression
+engine (and, on the normal corpus, the exact keypad evaluator) on several corpora and reports throughput, p50/p99 latency and peak
+traced memory. With --gui the full Calculator round trip (button click,
+worker thread, signal, display update) is timed too, on Qt's offscreen
+platform so no display server is needed.
+
+    python benchmarks/bench_eval.py                  # print a report
+    python benchmarks/bench_eval.py --gui            # include GUI timings
+    python benchmarks/bench_eval.py --check          # exit 1 on regression
+    python benchmarks/bench_eval.py --save-baseline  # record current speedups
+
+Regressions are judged on the engine's speedup over the legacy path measured
+in the same run, which keeps the committed baseline meaningful across
+machines. The speedup is the median over alternating legacy/engine passes,
+so both paths see the same machine state (clock scaling, other load): the
+ratio of two separately timed bests drifts by a third from run to run.
+"""
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from calculator_core import codecache, engine, keypad  # noqa: E402
+from corpus import CORPORA  # noqa: E402
+from legacy import legacy_evaluate  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+GUI_SCRIPT = os.path.join(ROOT, 'Project 1 - Dynamic Calculator in Python.py')
+
+
+def engine_evaluate(expression):
+    return engine.format_result(engine.evaluate(expression))
+
+
+def engine_reset():
+    # Cold compile cache, and no code cache even if the GUI enabled one
+    engine.cache_clear()
+    codecache.disable()
+
+
+def keypad_evaluate(expression):
+    return keypad.format_exact(keypad.evaluate(expression))
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def _timed_pass(fn, expressions, reset):
+    if reset:
+        reset()
+    gc.collect()
+    latencies = []
+    results = []
+    clock = time.perf_counter_ns
+    start = clock()
+    for expression in expressions:
+        t0 = clock()
+        try:
+            results.append(fn(expression))
+        except Exception:
+            results.append('Error')
+        latencies.append(clock() - t0)
+    return (clock() - start) / 1e9, sorted(latencies), results
+
+
+def measure(fn, expressions, reset=None, repeat=5):
+    """Time fn over the corpus: throughput, latency percentiles, peak memory.
+
+    The fastest of `repeat` passes is reported, which filters out noise from
+    other processes; each pass starts from cold caches.
+    """
+    total, latencies, results = min((_timed_pass(fn, expressions, reset) for _ in range(repeat)),
+                                    key=lambda run: run[0])
+
+    # Memory is traced in a separate pass; tracemalloc distorts timings
+    if reset:
+        reset()
+    tracemalloc.start()
+    for expression in expressions:
+        try:
+            fn(expression)
+        except Exception:
+            pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'throughput': len(expressions) / total,
+        'p50_us': percentile(latencies, 0.50) / 1000,
+        'p99_us': percentile(latencies, 0.99) / 1000,
+        'peak_kib': peak / 1024,
+    }, results
+
+
+def paired_speedup(expressions, repeat=5):
+    """Median of legacy/engine time ratios over 2*repeat+1 alternating cold passes."""
+    ratios = []
+    for _ in range(2 * repeat + 1):
+        legacy_seconds = _timed_pass(legacy_evaluate, expressions, None)[0]
+        engine_seconds = _timed_pass(engine_evaluate, expressions, engine_reset)[0]
+        ratios.append(legacy_seconds / engine_seconds)
+    return statistics.median(ratios)
+
+
+class GuiDriver:
+    """Drives a real Calculator offscreen, one '=' press per expression."""
+
+    def __init__(self):
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        os.environ['CALCULATOR_HISTORY'] = ':memory:'
+        os.environ['CALCULATOR_CODE_CACHE'] = ':memory:'  # never read or fill the user's cache
+        from PyQt5.QtWidgets import QApplication, QPushButton
+        spec = importlib.util.spec_from_file_location('calculator_gui', GUI_SCRIPT)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        self.history_class = module.History
+        self.app = QApplication.instance() or QApplication([])
+        self.calc = module.Calculator()
+        self.calc.set_mode('scientific')
+        self.equals = next(b for b in self.calc.findChildren(QPushButton)
+                           if b.text() == '=' and b.isVisibleTo(self.calc.stacked_widget.currentWidget()))
+
+    def reset(self):
+        # Each pass starts cold: no compiled expressions, cached code or history to answer from
+        engine.cache_clear()
+        self.calc.code_cache = codecache.enable(':memory:')  # closes the previous one
+        self.calc.history.close()
+        self.calc.history = self.history_class(':memory:')
+
+    def __call__(self, expression):
+        calc = self.calc
+        calc.current_expression = expression
+        self.equals.click()
+        while calc.pending_job is not None:
+            calc.thread_pool.waitForDone(5)
+            self.app.processEvents()
+        return calc.display.text()
+
+
+def run(include_gui=False, repeat=5):
+    paths = [('legacy', legacy_evaluate, None), ('engine', engine_evaluate, engine_reset)]
+    if include_gui:
+        driver = GuiDriver()
+        paths.append(('gui', driver, driver.reset))
+    report = {}
+    for name, factory in CORPORA.items():
+        expressions = factory()
+        report[name] = {}
+        reference = None
+        # The exact normal-mode evaluator only takes keypad input; its 'diff'
+        # counts results where the float paths drift (0.1+0.2) or round
+        extra = [('keypad', keypad_evaluate, None)] if name == 'normal' else []
+        for path, fn, reset in paths + extra:
+            stats, results = measure(fn, expressions, reset, repeat)
+            if reference is None:
+                reference = results
+            else:
+                stats['mismatches'] = sum(a != b for a, b in zip(reference, results))
+            report[name][path] = stats
+        report[name]['speedup'] = paired_speedup(expressions, repeat)
+    return report
+
+
+def print_report(report):
+    print(f"{'corpus':<12}{'path':<8}{'expr/s':>12}{'p50 us':>10}{'p99 us':>10}{'peak KiB':>10}{'diff':>6}")
+    for corpus, paths in report.items():
+        for path, stats in paths.items():
+            if path == 'speedup':
+                continue
+            print(f"{corpus:<12}{path:<8}{stats['throughput']:>12,.0f}{stats['p50_us']:>10.1f}"
+                  f"{stats['p99_us']:>10.1f}{stats['peak_kib']:>10.1f}{stats.get('mismatches', ''):>6}")
+        print(f"{'':<12}engine speedup over legacy: {paths['speedup']:.2f}x")
+
+
+def check(report, threshold):
+    with open(BASELINE, encoding='utf-8') as f:
+        baseline = json.load(f)['speedup']
+    failures = []
+    for corpus, expected in baseline.items():
+        actual = report[corpus]['speedup']
+        if actual < expected * (1 - threshold):
+            failures.append(f"{corpus}: speedup {actual:.2f}x < baseline {expected:.2f}x "
+                            f"(-{threshold:.0%} allowed)")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--gui', action='store_true', help="also time the Qt GUI round trip (offscreen)")
+    parser.add_argument('--check', action='store_true', help="fail on regressions against the baseline")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="allowed relative drop in speedup before --check fails (default 0.15)")
+    parser.add_argument('--save-baseline', action='store_true', help="write the speedups to baseline.json")
+    parser.add_argument('--repeat', type=int, default=5, help="timed passes per measurement (best is kept)")
+    parser.add_argument('--json', help="also write the full report to this file")
+    args = parser.parse_args(argv)
+
+    report = run(args.gui, args.repeat)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(BASELINE, 'w', encoding='utf-8') as f:
+            json.dump({'speedup': {c: round(p['speedup'], 2) for c, p in report.items()}}, f, indent=2)
+            f.write('\n')
+    if args.check:
+        failures = check(report, args.threshold)
+        for failure in failures:
+            print("REGRESSION", failure)
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Mode switch latency: time Calculator.set_mode between normal and scientific.
+
+Runs offscreen. Each sample is one set_mode call followed by processing the
+events it queued (restyle, relayout and repaint requests), so the number
+reflects what the user waits for, not just the Python call.
+
+    python benchmarks/bench_mode_switch.py            # fail if p99 is over 1 ms
+    python benchmarks/bench_mode_switch.py --budget-ms 0.5
+"""
+import argparse
+import importlib.util
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI_SCRIPT = os.path.join(ROOT, 'Project 1 - Dynamic Calculator in Python.py')
+
+
+def load_calculator():
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    os.environ['CALCULATOR_HISTORY'] = ':memory:'
+    os.environ['CALCULATOR_CODE_CACHE'] = ':memory:'
+    sys.path.insert(0, ROOT)
+    from PyQt5.QtWidgets import QApplication
+    spec = importlib.util.spec_from_file_location('calculator_gui', GUI_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    app = QApplication.instance() or QApplication([])
+    calc = module.Calculator()
+    calc.show()
+    app.processEvents()
+    return app, calc
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure mode switch latency.")
+    parser.add_argument('--switches', type=int, default=400)
+    parser.add_argument('--budget-ms', type=float, default=1.0, help="p99 latency allowed (default 1 ms)")
+    args = parser.parse_args(argv)
+
+    app, calc = load_calculator()
+    calc.set_mode('scientific')  # the first switch builds the grid; not what we measure
+    app.processEvents()
+    samples = []
+    for i in range(args.switches):
+        mode = 'normal' if i % 2 == 0 else 'scientific'
+        start = time.perf_counter()
+        calc.set_mode(mode)
+        app.processEvents()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p50 = statistics.median(samples)
+    p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+    p99 = samples[min(len(samples) - 1, int(0.99 * len(samples)))]
+    # The tail is what the user notices: a switch that stutters one time in a hundred
+    verdict = 'ok' if p99 <= args.budget_ms else 'OVER BUDGET'
+    print(f"mode switch  p50 {p50:.3f} ms   p95 {p95:.3f} ms   p99 {p99:.3f} ms   "
+          f"budget {args.budget_ms} ms   {verdict}")
+    return 0 if p99 <= args.budget_ms else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Throughput and latency of the HTTP evaluation service.
+
+Starts `python -m calculator_core.server` on a free port and drives it with
+keep-alive connections, each keeping a few pipelined requests in flight.
+Reports requests per second and client-side latency percentiles.
+
+    python benchmarks/bench_server.py
+    python benchmarks/bench_server.py --connections 64 --depth 8 --seconds 10
+    python benchmarks/bench_server.py --batch 100     # 100 expressions per request
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import CORPORA  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def request_bytes(expressions, batch):
+    if batch == 1:
+        body = json.dumps({'expression': expressions[0]})
+    else:
+        body = json.dumps({'expressions': expressions[:batch]})
+    return (f"POST /evaluate HTTP/1.1\r\nHost: localhost\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n{body}").encode()
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            return await reader.readexactly(int(line.split(b":")[1]))
+    return b""
+
+
+async def client(port, payloads, depth, deadline, latencies):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    sent = []
+    i = 0
+    while time.perf_counter() < deadline:
+        while len(sent) < depth:
+            writer.write(payloads[i % len(payloads)])
+            sent.append(time.perf_counter())
+            i += 1
+        await writer.drain()
+        await read_response(reader)
+        latencies.append(time.perf_counter() - sent.pop(0))
+    for _ in sent:
+        await read_response(reader)
+    writer.close()
+
+
+async def drive(port, payloads, connections, depth, seconds):
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, payloads, depth, deadline, latencies)
+                           for _ in range(connections)))
+    return latencies, time.perf_counter() - start
+
+
+def wait_for_port(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise SystemExit("server did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the HTTP evaluation service.")
+    parser.add_argument('--connections', type=int, default=32)
+    parser.add_argument('--depth', type=int, default=4, help="pipelined requests per connection")
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--batch', type=int, default=1, help="expressions per request")
+    parser.add_argument('--corpus', choices=sorted(CORPORA), default='normal')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    expressions = CORPORA[args.corpus]()[:500]
+    payloads = [request_bytes(expressions[i:] + expressions[:i], args.batch)
+                for i in range(len(expressions))]
+    port = free_port()
+    command = [sys.executable, '-m', 'calculator_core.server', '--port', str(port)]
+    if args.workers is not None:
+        command += ['--workers', str(args.workers)]
+    server = subprocess.Popen(command, cwd=ROOT, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        latencies, elapsed = asyncio.run(drive(port, payloads, args.connections, args.depth,
+                                               args.seconds))
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    ms = [x * 1000 for x in latencies]
+    print(f"{len(latencies)} requests in {elapsed:.2f}s: {len(latencies) / elapsed:,.0f} req/s, "
+          f"{len(latencies) * args.batch / elapsed:,.0f} expressions/s")
+    print(f"latency p50 {statistics.median(ms):.2f} ms, "
+          f"p99 {ms[int(len(ms) * 0.99)]:.2f} ms, max {ms[-1]:.2f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
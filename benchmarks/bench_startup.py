@@ -0,0 +1,84 @@
+"""Startup benchmark: time to first frame of the GUI and import time of the core.
+
+Launches the calculator on Qt's offscreen platform with
+CALCULATOR_STARTUP_PROBE set, which makes it print a marker on its first
+paint and quit; the time from process launch to that marker is the
+time-to-first-frame. It also checks that importing calculator_core (and
+running the batch CLI) never pulls in PyQt5.
+
+    python benchmarks/bench_startup.py                  # report, fail over budget
+    python benchmarks/bench_startup.py --frame-budget-ms 400
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI_SCRIPT = os.path.join(ROOT, 'Project 1 - Dynamic Calculator in Python.py')
+
+CORE_PROBE = ("import sys, calculator_core, calculator_core.cli; "
+              "sys.exit('PyQt5 imported by the core' if 'PyQt5' in sys.modules else 0)")
+
+
+def time_first_frame(timeout=30):
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen', CALCULATOR_STARTUP_PROBE='1',
+               CALCULATOR_HISTORY=':memory:', CALCULATOR_CODE_CACHE=':memory:')
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, GUI_SCRIPT], cwd=ROOT, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    # Never hang a CI job on a window that does not paint or quit
+    watchdog = threading.Timer(timeout, process.kill)
+    watchdog.start()
+    try:
+        for line in process.stdout:
+            if line.strip() == 'first-frame':
+                elapsed = time.perf_counter() - start
+                break
+        else:
+            raise RuntimeError("the calculator exited without painting a frame")
+        process.wait()
+    finally:
+        watchdog.cancel()
+    return elapsed
+
+
+def time_core_import():
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', CORE_PROBE], cwd=ROOT,
+                            capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip() or "core import failed")
+    return elapsed
+
+
+def summarize(name, samples, budget_ms):
+    median = statistics.median(samples) * 1000
+    worst = max(samples) * 1000
+    verdict = 'ok' if median <= budget_ms else 'OVER BUDGET'
+    print(f"{name:<16} median {median:7.1f} ms   max {worst:7.1f} ms   budget {budget_ms:.0f} ms   {verdict}")
+    return median <= budget_ms
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure calculator startup time.")
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--frame-budget-ms', type=float, default=300,
+                        help="median time-to-first-frame allowed (default 300)")
+    parser.add_argument('--core-budget-ms', type=float, default=150,
+                        help="median interpreter start + core import allowed (default 150)")
+    parser.add_argument('--skip-gui', action='store_true', help="only measure the Qt-free core")
+    args = parser.parse_args(argv)
+
+    ok = summarize('core import', [time_core_import() for _ in range(args.runs)], args.core_budget_ms)
+    if not args.skip_gui:
+        ok &= summarize('first frame', [time_first_frame() for _ in range(args.runs)], args.frame_budget_ms)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
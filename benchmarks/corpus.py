@@ -0,0 +1,62 @@
+"""Deterministic expression corpora for the benchmarks.
+
+Only forms the legacy path evaluates correctly are used (it mangles 'exp' and
+the inverse trig names), so both paths can be checked against each other.
+"""
+import random
+
+
+def normal_arithmetic(count, seed=1):
+    rng = random.Random(seed)
+    ops = '+-*/'
+    out = []
+    for _ in range(count):
+        terms = [str(rng.randint(1, 9999)) for _ in range(rng.randint(2, 5))]
+        expr = terms[0]
+        for term in terms[1:]:
+            expr += rng.choice(ops) + term
+        out.append(expr)
+    return out
+
+
+def nested_scientific(count, seed=2):
+    rng = random.Random(seed)
+    templates = [
+        "sqrt(sin({a})^2+cos({b})^2)+log({c})*ln({d})",
+        "sin(cos(tan({a}/{c})))+sqrt({b})^3",
+        "log(sqrt({a}^2+{b}^2))-ln({c}+pi)",
+        "(sin({a})+cos({b}))*(sin({c})-cos({d}))/sqrt({d})",
+    ]
+    return [rng.choice(templates).format(a=rng.randint(1, 99), b=rng.randint(1, 99),
+                                         c=rng.randint(1, 99), d=rng.randint(1, 99))
+            for _ in range(count)]
+
+
+def large_factorials(count, seed=3):
+    rng = random.Random(seed)
+    return [f"{rng.randint(300, 1500)}!/{rng.randint(100, 299)}!" for _ in range(count)]
+
+
+def long_chains(count, seed=4, length=200):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(count):
+        parts = [str(rng.randint(1, 99))]
+        for _ in range(length):
+            parts.append(rng.choice('+-*'))
+            parts.append(str(rng.randint(1, 99)))
+        out.append(''.join(parts))
+    return out
+
+
+def repeated(corpus, times):
+    """The same expressions pressed again, as in real sessions."""
+    return corpus * times
+
+
+CORPORA = {
+    'normal': lambda: repeated(normal_arithmetic(500), 4),
+    'scientific': lambda: repeated(nested_scientific(500), 4),
+    'factorial': lambda: repeated(large_factorials(100), 4),
+    'chains': lambda: repeated(long_chains(50), 4),
+}
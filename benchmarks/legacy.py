@@ -0,0 +1,36 @@
+"""The original '=' evaluation path of Calculator.on_button_click, kept verbatim
+as the reference the benchmarks compare against."""
+import math
+import re
+
+
+def legacy_evaluate(current_expression):
+    expression_to_evaluate = current_expression.replace('^', '**') \
+                                               .replace('log', 'math.log10') \
+                                               .replace('ln', 'math.log') \
+                                               .replace('sqrt', 'math.sqrt') \
+                                               .replace('pi', str(math.pi)) \
+                                               .replace('e', str(math.e)) \
+                                               .replace('sin', 'math.sin') \
+                                               .replace('cos', 'math.cos') \
+                                               .replace('tan', 'math.tan') \
+                                               .replace('asin', 'math.asin') \
+                                               .replace('acos', 'math.acos') \
+                                               .replace('atan', 'math.atan') \
+                                               .replace('x^2', '**2') \
+                                               .replace('x^3', '**3') \
+                                               .replace('1/x', '1/') \
+                                               .replace('exp', 'math.exp') \
+                                               .replace('mod', '%')
+
+    def factorial_replacer(match):
+        num = int(match.group(1))
+        return str(math.factorial(num))
+    expression_to_evaluate = re.sub(r'(\d+)!', factorial_replacer, expression_to_evaluate)
+
+    if 'rad' in expression_to_evaluate:
+        expression_to_evaluate = expression_to_evaluate.replace('rad', '')
+    if 'deg' in expression_to_evaluate:
+        expression_to_evaluate = expression_to_evaluate.replace('deg', '')
+
+    return str(eval(expression_to_evaluate, {"__builtins__": None}, {'math': math}))
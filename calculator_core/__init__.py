@@ -0,0 +1,5 @@
+"""Headless calculation core shared by the PyQt5 calculator and batch tools."""
+from .engine import (ExpressionError, CompiledExpression, compile_expression,
+                     evaluate, format_result, parse, tokenize)
+from .batch import Result, evaluate_many
+from .workspace import Workspace
@@ -0,0 +1,34 @@
+"""Headless batch evaluation on top of the expression engine.
+
+Rows are evaluated with units.evaluate_with_units, so plain arithmetic takes
+the engine's path and rows with units or a 'to hex' conversion still work.
+"""
+from collections import namedtuple
+
+from .engine import format_result
+from .units import evaluate_with_units
+
+# value is None and error holds the message when an expression fails
+Result = namedtuple('Result', ['expression', 'value', 'error'])
+
+
+def evaluate_one(expression, angle_unit='rad'):
+    """Evaluate a single expression, capturing any failure in the Result."""
+    try:
+        value = evaluate_with_units(expression, None, angle_unit)
+    except Exception as exc:  # mirror the GUI: any failure is an error result
+        return Result(expression, None, str(exc) or type(exc).__name__)
+    return Result(expression, value, None)
+
+
+def evaluate_many(expressions, angle_unit='rad'):
+    """Lazily evaluate an iterable of expressions, yielding Results in order."""
+    for expression in expressions:
+        yield evaluate_one(expression, angle_unit)
+
+
+def render(result):
+    """One output line for a Result: the value, or 'Error: <message>'."""
+    if result.error is not None:
+        return f"Error: {result.error}"
+    return format_result(result.value)
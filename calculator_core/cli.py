@@ -0,0 +1,94 @@
+"""Command line batch evaluator.
+
+    python -m calculator_core [FILE] [-o OUTPUT] [-f text|csv|jsonl] [-j JOBS] [--timeout SECONDS]
+                              [--code-cache FILE]
+
+Reads one expression per line from FILE (or stdin) and writes one result per
+line as soon as it is computed. In text output, blank input lines produce
+blank output lines so results stay aligned with their inputs; csv and jsonl
+records carry the input line number instead. Input is streamed in chunks, so
+memory use does not grow with file size. With -j the work is spread over a
+process pool (results keep input order). This module never imports Qt.
+"""
+import argparse
+import os
+import sys
+
+from . import codecache, metrics
+from .batch import evaluate_many
+from .stream import CHUNK_SIZE, FORMATS, read_lines, writer_for
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='calculator_core',
+                                     description="Evaluate calculator expressions, one per line.")
+    parser.add_argument('input', nargs='?', default='-',
+                        help="file with one expression per line (default: stdin)")
+    parser.add_argument('-o', '--output', default='-',
+                        help="where to write results (default: stdout)")
+    parser.add_argument('-f', '--format', choices=FORMATS, default='text',
+                        help="output format (default: text)")
+    parser.add_argument('--line-buffered', action='store_true',
+                        help="flush after every result (default when stdin is a terminal)")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="worker processes to use (0 = one per core, default: 1)")
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="per-expression time limit in seconds (runs on a worker pool)")
+    parser.add_argument('--degrees', dest='angle_unit', action='store_const', const='deg',
+                        default='rad', help="trigonometric functions use degrees")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="record stage timings and counters, written to FILE in Prometheus format")
+    parser.add_argument('--profile', metavar='FILE', help="run under cProfile and save pstats to FILE")
+    parser.add_argument('--code-cache', metavar='FILE',
+                        help="keep compiled expressions in FILE across runs (also CALCULATOR_CODE_CACHE)")
+    return parser
+
+
+def run(lines, out, flush=False, jobs=1, timeout=None, angle_unit='rad', fmt='text'):
+    expressions = (line.strip() for line in lines)
+    if jobs == 1 and timeout is None:
+        results = evaluate_many(expressions, angle_unit)
+    else:
+        from .parallel import evaluate_parallel
+        results = evaluate_parallel(expressions, workers=jobs or None, timeout=timeout,
+                                    angle_unit=angle_unit)
+    writer = writer_for(fmt, out)
+    for line_number, result in enumerate(results, 1):
+        writer.write(line_number, result)
+        if flush:
+            out.flush()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    source = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    out = (sys.stdout if args.output == '-'
+           else open(args.output, 'w', encoding='utf-8', newline='', buffering=CHUNK_SIZE))
+    flush = args.line_buffered or (args.input == '-' and sys.stdin.isatty())
+    if args.metrics:
+        metrics.enable()
+    if args.code_cache:
+        # Through the environment too, so -j worker processes open the same cache
+        os.environ['CALCULATOR_CODE_CACHE'] = args.code_cache
+        codecache.enable(args.code_cache)
+    try:
+        if args.profile:
+            with metrics.profile(args.profile):
+                run(read_lines(source), out, flush, args.jobs, args.timeout, args.angle_unit, args.format)
+        else:
+            run(read_lines(source), out, flush, args.jobs, args.timeout, args.angle_unit, args.format)
+    except BrokenPipeError:
+        # Downstream closed early (e.g. piped into head); not an error for us
+        pass
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+        if args.metrics:
+            metrics.write(args.metrics)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
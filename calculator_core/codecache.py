@@ -0,0 +1,150 @@
+"""Persistent compile cache: parsed trees and bytecode Programs on disk.
+
+    from calculator_core import codecache
+    codecache.enable("~/.calculator_code_cache.db")
+
+Once enabled, compile_expression looks up expressions it has not seen in
+this process in an SQLite table before parsing them, and CompiledExpression
+links a stored Program instead of running the optimizer. A restarted batch
+job or GUI session therefore only links closures for the formulas it saw
+before. Newly compiled expressions are written in batches and at exit.
+
+Rows are keyed by the normalized expression text and tagged with the
+engine's CODE_VERSION and the interpreter's cache tag (marshal, which
+encodes the rows, is only stable within one Python version); rows with any
+other tag are dropped when the cache is opened. Setting
+CALCULATOR_CODE_CACHE=<path> in the environment enables the cache when the
+engine is imported, which is how -j worker processes inherit it.
+
+The cache is best effort: a row that cannot be encoded (constants folded to
+a LargeNumber) is simply not stored, and a locked or unreadable database
+counts as a miss.
+"""
+import atexit
+import marshal
+import os
+import sqlite3
+import sys
+import threading
+
+from . import engine
+from .engine import CODE_VERSION, CacheInfo
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS code (
+    key TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+"""
+
+VERSION = f"{CODE_VERSION}-{sys.implementation.cache_tag}"
+
+# Pending rows are written in one transaction once this many accumulate
+BATCH_SIZE = 256
+
+
+class CodeCache:
+    """Expression text -> (tree, {backend name: Program tuple}) in SQLite."""
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+        self.hits = self.misses = 0
+        self._db = None
+        self._pid = None
+        self._pending = {}
+        self._lock = threading.Lock()  # the GUI compiles on pool threads
+
+    def _connect(self):
+        # Opened on first use, and again in a forked worker: connections must not cross fork
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._pid = os.getpid()
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.executescript(SCHEMA)
+            with self._db:
+                self._db.execute('DELETE FROM code WHERE version != ?', (VERSION,))
+        return self._db
+
+    def load(self, key):
+        """The stored (tree, programs) for a normalized expression, or None."""
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                try:
+                    row = self._connect().execute(
+                        'SELECT data FROM code WHERE key = ? AND version = ?', (key, VERSION)).fetchone()
+                    entry = marshal.loads(row[0]) if row is not None else None
+                except (sqlite3.Error, EOFError, ValueError, TypeError):
+                    entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def store(self, key, tree, programs):
+        """Queue the tree and every Program (as to_tuple data) compiled so far for one expression."""
+        with self._lock:
+            self._pending[key] = (tree, programs)
+            if len(self._pending) >= BATCH_SIZE:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        rows = []
+        for key, entry in self._pending.items():
+            try:
+                rows.append((key, VERSION, marshal.dumps(entry)))
+            except ValueError:  # a constant marshal cannot encode
+                pass
+        self._pending = {}
+        try:
+            with self._connect() as db:
+                db.executemany('INSERT OR REPLACE INTO code (key, version, data) VALUES (?, ?, ?)', rows)
+        except sqlite3.Error:  # locked by another process; these rows are just not cached
+            pass
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, None, len(self._pending))
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            if self._db is not None and self._pid == os.getpid():
+                self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def enable(path):
+    """Use a persistent cache at path for compile_expression; returns the CodeCache."""
+    disable()
+    cache = CodeCache(path)
+    engine.set_code_cache(cache)
+    atexit.register(cache.close)
+    return cache
+
+
+def disable():
+    cache = engine.set_code_cache(None)
+    if cache is not None:
+        atexit.unregister(cache.close)
+        cache.close()
+
+
+def flush():
+    """Write out pending rows of the enabled cache, if any."""
+    if engine._code_cache is not None:
+        engine._code_cache.flush()
@@ -0,0 +1,1030 @@
+"""Expression engine for the calculator.
+
+Expressions are tokenized once, parsed with a small precedence parser into a
+tuple-based AST and compiled to nested closures. Compiled expressions are kept
+in an LRU cache keyed by their normalized text, so pressing '=' on an
+expression that was already seen skips tokenizing and parsing entirely.
+
+AST nodes are plain tuples, which keeps them hashable and cheap to compare:
+
+    ('num', text)              numeric literal, kept as source text
+    ('name', ident)            constant (pi, e) or free variable
+    ('neg', operand)           unary minus
+    ('bin', op, left, right)   op is one of + - * / % ^
+    ('fact', operand)          postfix factorial
+    ('call', func, (args...))  function call
+
+compile_ast runs a small optimization pass first: constant subtrees are
+folded, identical subtrees are hash-consed and evaluated once per call, and
+x^2 / x^3 become multiplications. The optimized tree is lowered to a compact
+stack-machine Program (array-backed opcode and operand buffers), which link
+turns into the closures; Programs are plain data, so codecache can keep them
+on disk across sessions.
+"""
+import math
+import operator
+import os
+import re
+import time
+from array import array
+from collections import Counter, OrderedDict, namedtuple
+
+from . import guards, metrics, trig
+
+
+class ExpressionError(ValueError):
+    """Raised when an expression cannot be tokenized, parsed or bound."""
+
+
+# --- Tokenizer ---
+
+# Operators first: they are half of every token, and the alternation is tried in order
+_TOKEN_PATTERNS = (
+    ('op', r"\*\*|[-+*/%^!(),]"),
+    ('based', r"0(?:[xX][0-9a-fA-F]+|[bB][01]+|[oO][0-7]+)"),
+    ('num', r"(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?"),
+    ('name', r"(?:math\.)?[A-Za-z_]\w*"),
+    ('space', r"\s+"),
+    ('bad', r"."),
+)
+_TOKEN_RE = re.compile('|'.join(f"(?P<{kind}>{pattern})" for kind, pattern in _TOKEN_PATTERNS))
+# The same alternation without groups: capturing costs more than matching, so
+# tokenize takes the bare lexemes and tells the kinds apart by their first character
+_LEXEME_RE = re.compile('|'.join(f"(?:{pattern})" for kind, pattern in _TOKEN_PATTERNS))
+_NAME_START = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_')
+
+# The GUI buttons insert Python-flavoured names such as 'math.log10(' into the
+# expression, so map those (and a few spellings users type) onto engine names.
+NAME_ALIASES = {
+    'math.log10': 'log', 'log10': 'log',
+    'math.log': 'ln',
+    'math.pi': 'pi', 'math.e': 'e',
+}
+
+# Operator tokens are shared tuples, which keeps tokenizing allocation-light
+_OP_TOKENS = {op: ('op', op) for op in ('+', '-', '*', '/', '%', '^', '!', '(', ')', ',')}
+_OP_TOKENS['**'] = _OP_TOKENS['^']
+
+
+def tokenize(text):
+    """Split an expression into a list of (kind, value) tuples."""
+    tokens = []
+    append = tokens.append
+    for value in _LEXEME_RE.findall(text):
+        token = _OP_TOKENS.get(value)
+        if token is not None:
+            append(token)
+        elif value[0].isdecimal() or (value[0] == '.' and value != '.'):
+            if value[1:2] in ('x', 'X', 'b', 'B', 'o', 'O'):
+                # 0xff, 0b1010, 0o17: every backend sees (and caches) the decimal integer
+                append(('num', str(int(value, 0))))
+            else:
+                append(('num', value))
+        elif value[0] in _NAME_START:
+            append(_name_token(value))
+        elif not value.isspace():
+            raise ExpressionError(f"Unexpected character {value!r}")
+    return tokens
+
+
+def _name_token(value):
+    value = NAME_ALIASES.get(value, value)
+    if value.startswith('math.'):
+        value = value[5:]
+    return _OP_TOKENS['%'] if value == 'mod' else ('name', value)
+
+
+def _normalize_tokens(tokens):
+    # Calculators traditionally let users leave trailing parentheses open
+    missing = tokens.count(_OP_TOKENS['(']) - tokens.count(_OP_TOKENS[')'])
+    if missing > 0:
+        tokens = tokens + [_OP_TOKENS[')']] * missing
+    parts = []
+    previous = 'op'
+    for kind, value in tokens:
+        # Keep a separator between adjacent words/numbers so '2 e' != '2e'
+        if kind != 'op' and previous != 'op':
+            parts.append(' ')
+        parts.append(value)
+        previous = kind
+    return ''.join(parts), tokens
+
+
+def normalize(text):
+    """Canonical form of an expression, used as the compile cache key."""
+    return _normalize_tokens(tokenize(text))[0]
+
+
+# --- Parser ---
+
+# Past the last token; the parser appends it so peeking never needs a bounds check
+_END = (None, None)
+# Operators that bind to a number more tightly than any product or sum
+_POSTFIX = (_OP_TOKENS['^'], _OP_TOKENS['!'])
+_ADDITIVE = (_OP_TOKENS['+'], _OP_TOKENS['-'])
+_MULTIPLICATIVE = (_OP_TOKENS['*'], _OP_TOKENS['/'], _OP_TOKENS['%'])
+
+
+class _Parser:
+    def __init__(self, tokens, typed=None):
+        self.tokens = tokens + [_END]
+        self.end = len(tokens)
+        # Tokens past the first `typed` are the ')' that _normalize_tokens closed for the user
+        self.typed = self.end if typed is None else typed
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def advance(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, value):
+        kind, got = self.advance()
+        if got != value:
+            raise ExpressionError(f"Expected {value!r} but found {got!r}")
+
+    def parse(self):
+        if not self.end:
+            raise ExpressionError("Empty expression")
+        node = self.expression()
+        if self.pos < self.end:
+            raise ExpressionError(f"Unexpected {self.peek()[1]!r}")
+        return node
+
+    def expression(self):
+        node = self.term()
+        tokens = self.tokens
+        while tokens[self.pos] in _ADDITIVE:
+            op = self.advance()[1]
+            node = ('bin', op, node, self.term())
+        return node
+
+    def term(self):
+        node = self.unary()
+        tokens = self.tokens
+        while True:
+            token = tokens[self.pos]
+            if token in _MULTIPLICATIVE:
+                self.pos += 1
+                node = ('bin', token[1], node, self.unary())
+            elif token[0] in ('num', 'name') or token == ('op', '('):
+                # Implicit multiplication only after a number (2pi, 3(4+1), 2sin(x)) or
+                # a closing parenthesis ((1+2)(3+4), (1+2)3); '1 2' is a typo, not 2
+                previous = tokens[self.pos - 1]
+                if not ((previous[0] == 'num' and token[0] != 'num')
+                        or (previous == ('op', ')') and token[0] != 'name')):
+                    raise ExpressionError(f"Missing operator before {token[1]!r}")
+                node = ('bin', '*', node, self.power())
+            else:
+                return node
+
+    def unary(self):
+        kind, value = self.tokens[self.pos]
+        if kind == 'num' and self.tokens[self.pos + 1] not in _POSTFIX:
+            # A bare number, the bulk of long keypad chains: skip the power/postfix/atom calls
+            self.pos += 1
+            return ('num', value)
+        if kind == 'op' and value in ('-', '+'):
+            self.advance()
+            operand = self.unary()
+            return ('neg', operand) if value == '-' else operand
+        return self.power()
+
+    def power(self):
+        node = self.postfix()
+        if self.peek() == ('op', '^'):
+            self.advance()
+            # Right associative, and the exponent may carry its own sign: 2^-1
+            node = ('bin', '^', node, self.unary())
+        return node
+
+    def postfix(self):
+        node = self.atom()
+        while self.peek() == ('op', '!'):
+            self.advance()
+            node = ('fact', node)
+        return node
+
+    def atom(self):
+        kind, value = self.advance()
+        if kind == 'num':
+            return ('num', value)
+        if kind == 'name':
+            if self.peek() == ('op', '('):
+                self.advance()
+                if self.peek() == ('op', ')'):
+                    if self.pos >= self.typed:
+                        raise ExpressionError(f"Unclosed '(' after {value!r}")
+                    raise ExpressionError(f"Missing argument to {value!r}")
+                args = [self.expression()]
+                while self.peek() == ('op', ','):
+                    self.advance()
+                    args.append(self.expression())
+                self.expect(')')
+                return ('call', value, tuple(args))
+            return ('name', value)
+        if (kind, value) == ('op', '('):
+            node = self.expression()
+            self.expect(')')
+            return node
+        if kind is None:
+            raise ExpressionError("Unexpected end of expression")
+        if value == ')' and self.pos > self.typed:
+            raise ExpressionError("Unclosed '('")
+        raise ExpressionError(f"Unexpected {value!r}")
+
+
+def parse(text):
+    """Parse an expression (raw or normalized) into an AST tuple."""
+    tokens = tokenize(text)
+    return _Parser(_normalize_tokens(tokens)[1], len(tokens)).parse()
+
+
+_PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2, '%': 2, 'neg': 3, '^': 4, 'fact': 5}
+
+
+def _precedence(node):
+    kind = node[0]
+    if kind == 'bin':
+        return _PRECEDENCE[node[1]]
+    return _PRECEDENCE.get(kind, 6)  # literals, names and calls bind tightest
+
+
+def unparse(node):
+    """Expression text for an AST, with only the parentheses it needs."""
+    kind = node[0]
+    if kind in ('num', 'name'):
+        return node[1]
+    if kind == 'call':
+        return f"{node[1]}({', '.join(unparse(arg) for arg in node[2])})"
+    if kind == 'fact':
+        operand = unparse(node[1])
+        return f"{operand}!" if _precedence(node[1]) >= 5 else f"({operand})!"
+    if kind == 'neg':
+        operand = unparse(node[1])
+        return f"-{operand}" if _precedence(node[1]) >= 3 else f"-({operand})"
+    op, left, right = node[1:]
+    level = _PRECEDENCE[op]
+    left_text, right_text = unparse(left), unparse(right)
+    if op == '^':
+        # Right associative; the exponent may be signed (2^-1)
+        if _precedence(left) <= level:
+            left_text = f"({left_text})"
+        if _precedence(right) < 3:
+            right_text = f"({right_text})"
+    else:
+        if _precedence(left) < level:
+            left_text = f"({left_text})"
+        right_level = _precedence(right)
+        if right_level < level or (right_level == level and right[0] == 'bin'):
+            right_text = f"({right_text})"
+    return f"{left_text}{op}{right_text}"
+
+
+# --- Backends ---
+
+def _number(text):
+    if text.isdigit():
+        return int(text)
+    if any(c in text for c in '.eE'):
+        value = float(text)
+        if value == math.inf:
+            # Chained results such as '2.8e+456573' come back from the display
+            return guards.parse_large(text)
+        return value
+    return int(text)
+
+
+class Backend:
+    """The set of primitives an expression is compiled against.
+
+    Swapping the backend changes the number type the compiled closures work
+    with without touching the parser.
+    """
+
+    def __init__(self, name, number, constants, functions, operators):
+        self.name = name
+        self.number = number          # literal text -> value
+        self.constants = constants    # name -> value
+        self.functions = functions    # name -> callable
+        self.operators = operators    # '+', '-', ..., 'neg', 'fact' -> callable
+
+
+FLOAT_BACKEND = Backend(
+    'float',
+    number=_number,
+    constants={'pi': math.pi, 'e': math.e},
+    functions=dict(
+        trig.RADIAN_FUNCTIONS,
+        log=math.log10, ln=math.log, sqrt=math.sqrt, exp=math.exp,
+    ),
+    operators={
+        '+': operator.add, '-': operator.sub, '*': operator.mul,
+        '/': operator.truediv, '%': operator.mod, '^': guards.power,
+        'neg': operator.neg, 'fact': guards.factorial,
+    },
+)
+
+DEGREE_BACKEND = Backend(
+    'float-deg',
+    number=_number,
+    constants=FLOAT_BACKEND.constants,
+    functions=dict(FLOAT_BACKEND.functions, **trig.DEGREE_FUNCTIONS),
+    operators=FLOAT_BACKEND.operators,
+)
+
+ANGLE_BACKENDS = {'rad': FLOAT_BACKEND, 'deg': DEGREE_BACKEND}
+
+
+def backend_for(angle_unit):
+    try:
+        return ANGLE_BACKENDS[angle_unit]
+    except KeyError:
+        raise ValueError(f"Unknown angle unit {angle_unit!r}; expected 'rad' or 'deg'") from None
+
+
+# --- Compiler ---
+
+def _unbound(name):
+    def lookup(env):
+        try:
+            return env[name]
+        except (KeyError, TypeError):
+            raise ExpressionError(f"Unknown variable {name!r}") from None
+    return lookup
+
+
+# Functions safe to evaluate at compile time: the built-in names, which every
+# backend maps to pure functions. Anything else (user functions) may change.
+_PURE_FUNCTIONS = frozenset(FLOAT_BACKEND.functions)
+
+# x^2 and x^3 become repeated multiplication of a single evaluation of x
+_SMALL_POWERS = (2, 3)
+
+
+# n! and a^b consult guards.BUDGET, which can change after an expression is
+# compiled and cached; a result that depends on it is not folded (see _fold)
+_GUARDED = frozenset({'^', 'fact'})
+_GUARD_FREE_LIMIT = 2 ** 53
+
+
+def _is_int_const(node, value):
+    return node[0] == 'const' and type(node[1]) is int and node[1] == value
+
+
+def _fold(node, backend):
+    """Evaluate a node whose children are all constants, or None if it fails."""
+    kind = node[0]
+    try:
+        if kind == 'bin':
+            value = backend.operators[node[1]](node[2][1], node[3][1])
+        elif kind == 'call':
+            value = backend.functions[node[1]](*[arg[1] for arg in node[2]])
+        else:
+            value = backend.operators[kind](node[1][1])
+    except Exception:  # leave it to fail (with the same message) at run time
+        return None
+    if (node[1] if kind == 'bin' else kind) in _GUARDED and (
+            isinstance(value, guards.LargeNumber)
+            or (type(value) is int and abs(value) > _GUARD_FREE_LIMIT)):
+        return None  # approximated or budget-checked: redo it against the budget of the day
+    return ('const', value)
+
+
+def _shallow_key(node):
+    """Identity of a node whose children are already canonical: O(1) to build and hash."""
+    kind = node[0]
+    if kind == 'const':
+        # Include the type so 1 and 1.0 (equal, same hash) stay distinct
+        return ('const', type(node[1]), node[1])
+    if kind == 'name':
+        return node
+    if kind == 'call':
+        return ('call', node[1], tuple(map(id, node[2])))
+    if kind in ('bin', 'pow'):
+        return node[:2] + tuple(map(id, node[2:]))
+    return (kind, id(node[1]))
+
+
+def _canonical(node, canon):
+    try:
+        key = _shallow_key(node)
+        return canon.setdefault(key, node)
+    except TypeError:  # an unhashable constant; just don't share it
+        return node
+
+
+def _simplify(node, backend, canon):
+    """Fold constants and apply algebraic identities, bottom up.
+
+    Results are hash-consed through canon: structurally identical subtrees
+    come back as the same tuple object, so later passes can find shared
+    subexpressions by identity instead of re-hashing whole subtrees. A folded
+    constant is usually folded again by its parent (a long chain of numbers
+    folds into one), so it is only hash-consed once it lands under a node
+    that stays.
+    """
+    kind = node[0]
+    if kind == 'num':
+        # Keyed by the literal itself, which no simplified node looks like, so a
+        # number repeated across a long chain is converted once
+        result = canon.get(node)
+        if result is None:
+            result = canon[node] = _canonical(('const', backend.number(node[1])), canon)
+        return result
+    if kind == 'name':
+        if node[1] in backend.constants:
+            return _canonical(('const', backend.constants[node[1]]), canon)
+        return _canonical(node, canon)
+    if kind == 'bin':
+        # Keypad chains (1+2*3-4...) are left-deep: walk the left spine in a loop
+        # rather than recursing once per operator
+        spine = []
+        while node[0] == 'bin':
+            spine.append(node)
+            node = node[2]
+        left = _simplify(node, backend, canon)
+        for node in reversed(spine):
+            right = _simplify(node[3], backend, canon)
+            left = _combine(('bin', node[1], left, right),
+                            left[0] == 'const' and right[0] == 'const', backend, canon)
+        return left
+    if kind == 'call':
+        children = tuple(_simplify(arg, backend, canon) for arg in node[2])
+        result = ('call', node[1], children)
+        constant = node[1] in _PURE_FUNCTIONS and all(child[0] == 'const' for child in children)
+    else:
+        operand = _simplify(node[1], backend, canon)
+        result = (kind, operand)
+        constant = operand[0] == 'const'
+    return _combine(result, constant, backend, canon)
+
+
+def _combine(node, constant, backend, canon):
+    # A node over simplified children: folded if they are all constants, else rewritten and shared
+    if constant:
+        folded = _fold(node, backend)
+        if folded is not None:
+            return folded
+    else:
+        node = _rewrite(node)
+    return _canonical(_shared_constants(node, canon), canon)
+
+
+def _shared_constants(node, canon):
+    # node with its folded-but-not-yet-shared constant children hash-consed
+    children = _children(node)
+    if not any(child[0] == 'const' for child in children):
+        return node
+    shared = tuple(_canonical(child, canon) if child[0] == 'const' else child
+                   for child in children)
+    if node[0] == 'call':
+        return ('call', node[1], shared)
+    return node[:len(node) - len(shared)] + shared
+
+
+def _rewrite(node):
+    kind = node[0]
+    if kind == 'neg' and node[1][0] == 'neg':
+        return node[1][1]                                   # --x -> x
+    if kind != 'bin':
+        return node
+    op, left, right = node[1:]
+    if op == '*' and _is_int_const(right, 1):
+        return left                                         # x*1 -> x
+    if op == '*' and _is_int_const(left, 1):
+        return right                                        # 1*x -> x
+    if op == '^' and _is_int_const(right, 1):
+        return left                                         # x^1 -> x
+    if op == '^' and right[0] == 'const' and type(right[1]) is int and right[1] in _SMALL_POWERS:
+        return ('pow', right[1], left)                      # x^2 -> x*x
+    return node
+
+
+def _children(node):
+    kind = node[0]
+    if kind == 'call':
+        return node[2]
+    if kind == 'bin':
+        return node[2:]
+    if kind in ('const', 'name'):
+        return ()
+    return node[-1:]
+
+
+def _shared_nodes(root):
+    """ids of non-leaf nodes reachable along more than one path."""
+    counts = {}
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node[0] in ('const', 'name'):
+            continue
+        key = id(node)
+        if key in counts:
+            counts[key] += 1
+            continue
+        counts[key] = 1
+        stack.extend(_children(node))
+    return {key for key, count in counts.items() if count > 1}
+
+
+class _Scope(dict):
+    """Per-evaluation values of shared subexpressions, falling back to the caller's env."""
+
+    __slots__ = ('env',)
+
+    def __init__(self, env):
+        self.env = env
+
+    def __missing__(self, key):
+        return self.env[key]
+
+
+# --- Bytecode ---
+#
+# A simplified tree is lowered to a flat post-order program for a stack
+# machine: one opcode byte and one operand word per instruction, held in two
+# array buffers, plus tables of constants and names. Programs contain only
+# ints, floats and strings, so they can be stored on disk (see codecache)
+# and turned back into closures without parsing or optimizing again.
+
+CODE_VERSION = 1  # bump when opcodes or the optimizer change
+
+(OP_CONST, OP_LOAD, OP_FETCH, OP_STORE, OP_NEG, OP_FACT,
+ OP_BINARY, OP_SQUARE, OP_CUBE, OP_CALL) = range(10)
+
+_BINARY_OPS = '+-*/%^'
+
+
+class Program:
+    """Stack-machine form of a compiled expression.
+
+    code is an array of opcodes and args the matching operands: an index
+    into constants (CONST), names (LOAD) or _BINARY_OPS (BINARY), a slot
+    number (STORE, FETCH) or, for CALL, name index << 8 | argument count.
+    STORE pops a shared subexpression into a slot that later FETCHes read.
+    """
+
+    __slots__ = ('code', 'args', 'constants', 'names')
+
+    def __init__(self, code, args, constants, names):
+        self.code = code
+        self.args = args
+        self.constants = constants
+        self.names = names
+
+    def to_tuple(self):
+        return (self.code.tobytes(), self.args.tobytes(), self.constants, self.names)
+
+    @classmethod
+    def from_tuple(cls, data):
+        code, args, constants, names = data
+        return cls(array('B', code), array('I', args), tuple(constants), tuple(names))
+
+    def __len__(self):
+        return len(self.code)
+
+
+class _Assembler:
+    def __init__(self):
+        self.code = array('B')
+        self.args = array('I')
+        self.constants = []
+        self.names = []
+        self._constant_index = {}
+        self._name_index = {}
+
+    def emit(self, op, arg=0):
+        self.code.append(op)
+        self.args.append(arg)
+
+    def constant(self, value):
+        key = (type(value), value)
+        try:
+            index = self._constant_index.get(key)
+        except TypeError:  # unhashable; store it unshared
+            index = key = None
+        if index is None:
+            index = len(self.constants)
+            self.constants.append(value)
+            if key is not None:
+                self._constant_index[key] = index
+        return index
+
+    def name(self, value):
+        index = self._name_index.get(value)
+        if index is None:
+            index = self._name_index[value] = len(self.names)
+            self.names.append(value)
+        return index
+
+    def node(self, node, backend, slots):
+        slot = slots.get(id(node))
+        if slot is not None:
+            self.emit(OP_FETCH, slot)
+            return
+        kind = node[0]
+        if kind == 'const':
+            self.emit(OP_CONST, self.constant(node[1]))
+        elif kind == 'num':
+            self.emit(OP_CONST, self.constant(backend.number(node[1])))
+        elif kind == 'name':
+            if node[1] in backend.constants:
+                self.emit(OP_CONST, self.constant(backend.constants[node[1]]))
+            else:
+                self.emit(OP_LOAD, self.name(node[1]))
+        elif kind == 'pow':
+            self.node(node[2], backend, slots)
+            self.emit(OP_SQUARE if node[1] == 2 else OP_CUBE)
+        elif kind in ('neg', 'fact'):
+            self.node(node[1], backend, slots)
+            self.emit(OP_NEG if kind == 'neg' else OP_FACT)
+        elif kind == 'bin':
+            self.node(node[2], backend, slots)
+            self.node(node[3], backend, slots)
+            self.emit(OP_BINARY, _BINARY_OPS.index(node[1]))
+        elif kind == 'call':
+            for arg in node[2]:
+                self.node(arg, backend, slots)
+            self.emit(OP_CALL, self.name(node[1]) << 8 | len(node[2]))
+        else:
+            raise ExpressionError(f"Unknown node {kind!r}")
+
+    def program(self):
+        return Program(self.code, self.args, tuple(self.constants), tuple(self.names))
+
+
+def assemble(node, backend=FLOAT_BACKEND):
+    """Simplify an AST for backend and lower it to a Program."""
+    canon = {}  # keeps the canonical nodes (and so their ids) alive
+    root = _simplify(node, backend, canon)
+    if root[0] == 'const':
+        # Fully folded, as most keypad input is
+        return Program(array('B', (OP_CONST,)), array('I', (0,)), (root[1],), ())
+    assembler = _Assembler()
+    shared = _shared_nodes(root)
+    slots = {}
+    if shared:
+        # Children come before parents, so each shared value is ready when read
+        order = []
+        _post_order(root, shared, set(), order)
+        for index, sub in enumerate(order):
+            assembler.node(sub, backend, slots)
+            assembler.emit(OP_STORE, index)
+            slots[id(sub)] = index
+    assembler.node(root, backend, slots)
+    return assembler.program()
+
+
+def _constant(value):
+    return lambda env: value
+
+
+def _fetch(slot):
+    return lambda env: env[slot]
+
+
+def _unary(fn, operand):
+    return lambda env: fn(operand(env))
+
+
+def _binary(fn, left, right):
+    return lambda env: fn(left(env), right(env))
+
+
+def _square(mul, operand):
+    def square(env):
+        x = operand(env)
+        return mul(x, x)
+    return square
+
+
+def _cube(mul, operand):
+    def cube(env):
+        x = operand(env)
+        return mul(mul(x, x), x)
+    return cube
+
+
+def _call(fn, args):
+    if len(args) == 1:
+        arg = args[0]
+        return lambda env: fn(arg(env))
+    return lambda env: fn(*[a(env) for a in args])
+
+
+def link(program, backend=FLOAT_BACKEND):
+    """Turn a Program into a closure taking a variables mapping.
+
+    The program is run once symbolically: each instruction pops the closures
+    of its operands and pushes the closure combining them, so evaluation
+    itself is the same nested closure calls as before, with no dispatch.
+    """
+    constants, names = program.constants, program.names
+    if len(program.code) == 1 and program.code[0] == OP_CONST:
+        return _constant(constants[0])
+    operators = backend.operators
+    stack = []
+    push, pop = stack.append, stack.pop
+    steps = []
+    for op, arg in zip(program.code, program.args):
+        if op == OP_CONST:
+            push(_constant(constants[arg]))
+        elif op == OP_LOAD:
+            push(_unbound(names[arg]))
+        elif op == OP_BINARY:
+            right = pop()
+            push(_binary(operators[_BINARY_OPS[arg]], pop(), right))
+        elif op == OP_CALL:
+            count = arg & 0xff
+            args = stack[-count:] if count else []
+            del stack[len(stack) - count:]
+            name = names[arg >> 8]
+            try:
+                fn = backend.functions[name]
+            except KeyError:
+                raise ExpressionError(f"Unknown function {name!r}") from None
+            push(_call(fn, args))
+        elif op == OP_FETCH:
+            push(_fetch(arg))
+        elif op == OP_NEG:
+            push(_unary(operators['neg'], pop()))
+        elif op == OP_FACT:
+            push(_unary(operators['fact'], pop()))
+        elif op == OP_SQUARE:
+            push(_square(operators['*'], pop()))
+        elif op == OP_CUBE:
+            push(_cube(operators['*'], pop()))
+        elif op == OP_STORE:
+            steps.append((arg, pop()))
+        else:
+            raise ExpressionError(f"Unknown opcode {op}")
+    main = pop()
+    if not steps:
+        return main
+
+    def run(env):
+        scope = _Scope(env)
+        for index, fn in steps:
+            scope[index] = fn(scope)
+        return main(scope)
+    return run
+
+
+def compile_ast(node, backend=FLOAT_BACKEND):
+    """Turn an AST into a closure taking a variables mapping.
+
+    Constant subtrees are folded, simple identities rewritten (x*1, x^1,
+    x^2 -> x*x) and repeated subexpressions computed once per evaluation.
+    """
+    return link(assemble(node, backend), backend)
+
+
+def _post_order(node, shared, seen, order):
+    key = id(node)
+    if node[0] in ('const', 'name') or key in seen:
+        return
+    seen.add(key)
+    for child in _children(node):
+        _post_order(child, shared, seen, order)
+    if key in shared:
+        order.append(node)
+
+
+def free_variables(node):
+    """Names in the AST that are not constants of the float backend."""
+    names = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        kind = node[0]
+        if kind == 'bin':
+            stack.append(node[2])
+            stack.append(node[3])
+        elif kind == 'name':
+            if node[1] not in FLOAT_BACKEND.constants:
+                names.add(node[1])
+        elif kind == 'call':
+            stack.extend(node[2])
+        elif kind != 'num':
+            stack.append(node[1])
+    return names
+
+
+class CompiledExpression:
+    """A parsed and compiled expression, ready to be evaluated many times."""
+
+    __slots__ = ('text', 'tree', '_variables', '_fn', '_variants', '_usage', '_programs')
+
+    def __init__(self, text, tree, programs=None):
+        self.text = text
+        self.tree = tree
+        self._variables = None  # walking a long tree is a cost plain evaluation never needs
+        # Compiling folds constants, i.e. does the work of a first evaluation,
+        # so it waits until the expression is evaluated rather than parsed
+        self._fn = None
+        self._variants = None  # other angle units -> closure, compiled on first use
+        self._usage = None
+        self._programs = programs  # backend name -> Program tuple, from the code cache
+
+    @property
+    def variables(self):
+        """The free variables of the expression, as a frozenset."""
+        if self._variables is None:
+            self._variables = frozenset(free_variables(self.tree))
+        return self._variables
+
+    def evaluate(self, env=None, angle_unit='rad', **variables):
+        if variables:
+            env = dict(env or {}, **variables)
+        if angle_unit == 'rad':
+            fn = self._fn
+            if fn is None:
+                fn = self._variant('rad')
+            return fn(env)
+        return self._variant(angle_unit)(env)
+
+    def _variant(self, angle_unit):
+        if angle_unit == 'rad' and self._fn is not None:
+            return self._fn
+        if self._variants is None:
+            self._variants = {}
+        fn = self._variants.get(angle_unit)
+        if fn is None:
+            start = time.perf_counter() if metrics.enabled else None
+            backend = backend_for(angle_unit)
+            fn = self._variants[angle_unit] = link(self._program(backend), backend)
+            if start is not None:
+                metrics.observe('compile', time.perf_counter() - start)
+            if angle_unit == 'rad':
+                self._fn = fn
+        return fn
+
+    def _program(self, backend):
+        # A Program from the persistent code cache skips the optimizer entirely
+        stored = self._programs.get(backend.name) if self._programs else None
+        if stored is not None:
+            return Program.from_tuple(stored)
+        program = assemble(self.tree, backend)
+        if _code_cache is not None:
+            self._programs = dict(self._programs or {})
+            self._programs[backend.name] = program.to_tuple()
+            _code_cache.store(self.text, self.tree, self._programs)
+        return program
+
+    def usage(self):
+        """How often each operator and function appears, as a Counter."""
+        if self._usage is None:
+            self._usage = Counter()
+            stack = [self.tree]
+            while stack:
+                node = stack.pop()
+                kind = node[0]
+                if kind == 'bin':
+                    self._usage[node[1]] += 1
+                    stack.extend(node[2:])
+                elif kind == 'call':
+                    self._usage[node[1]] += 1
+                    stack.extend(node[2])
+                elif kind in ('neg', 'fact'):
+                    self._usage[kind] += 1
+                    stack.append(node[1])
+        return self._usage
+
+    __call__ = evaluate
+
+    def __repr__(self):
+        return f"CompiledExpression({self.text!r})"
+
+
+class LRUCache:
+    """A small least-recently-used mapping with hit/miss counters."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+# Raw text -> compiled skips even the tokenizer for exact repeats; the
+# normalized cache catches spelling variants ('math.sin(' vs 'sin(', spaces).
+_raw_cache = LRUCache(4096)
+_compiled_cache = LRUCache(4096)
+
+
+def compile_expression(text):
+    """Compile an expression, reusing the cached result for repeated text."""
+    compiled = _raw_cache.get(text)
+    if compiled is None:
+        start = time.perf_counter() if metrics.enabled else None
+        typed = tokenize(text)
+        key, tokens = _normalize_tokens(typed)
+        if start is not None:
+            now = time.perf_counter()
+            metrics.observe('tokenize', now - start)
+            start = now
+        compiled = _compiled_cache.get(key)
+        if compiled is None:
+            stored = _code_cache.load(key) if _code_cache is not None else None
+            if stored is not None:
+                compiled = CompiledExpression(key, stored[0], stored[1])
+            else:
+                compiled = CompiledExpression(key, _Parser(tokens, len(typed)).parse())
+            _compiled_cache[key] = compiled
+            if start is not None:
+                metrics.observe('parse', time.perf_counter() - start)
+        _raw_cache[text] = compiled
+    return compiled
+
+
+# Persistent store of trees and Programs (codecache.CodeCache), or None
+_code_cache = None
+
+
+def set_code_cache(cache):
+    """Install a code cache for compile_expression (None removes it); returns the previous one."""
+    global _code_cache
+    previous, _code_cache = _code_cache, cache
+    return previous
+
+
+def evaluate(text, env=None, angle_unit='rad', **variables):
+    """Evaluate an expression string and return the numeric result.
+
+    angle_unit ('rad' or 'deg') selects how trigonometric functions read
+    and return angles.
+    """
+    if metrics.enabled:
+        return _evaluate_instrumented(text, env, angle_unit, variables)
+    return compile_expression(text).evaluate(env, angle_unit, **variables)
+
+
+def _evaluate_instrumented(text, env, angle_unit, variables):
+    compiled = compile_expression(text)
+    if variables:
+        env = dict(env or {}, **variables)
+    fn = compiled._variant(angle_unit)
+    start = time.perf_counter()
+    try:
+        value = fn(env)
+    except Exception as exc:
+        metrics.record_evaluation(compiled.usage(), exc)
+        raise
+    metrics.observe('evaluate', time.perf_counter() - start)
+    metrics.record_evaluation(compiled.usage())
+    return value
+
+
+def format_result(value):
+    """Render a result the way the calculator display shows it."""
+    if metrics.enabled:
+        with metrics.span('format'):
+            return guards.format_number(value)
+    return guards.format_number(value)
+
+
+def cache_info():
+    """Hit/miss statistics of the compiled expression cache."""
+    return _raw_cache.info()
+
+
+def cache_clear():
+    _raw_cache.clear()
+    _compiled_cache.clear()
+
+
+if os.environ.get('CALCULATOR_CODE_CACHE'):
+    from . import codecache  # late: codecache imports this module
+    codecache.enable(os.environ['CALCULATOR_CODE_CACHE'])
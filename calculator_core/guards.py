@@ -0,0 +1,244 @@
+"""Cost guards for the two operations whose cost is unbounded: n! and a^b.
+
+Before an exact factorial or integer power is computed, the size of the
+result (in decimal digits) and the time to compute it are estimated from the
+operands. Work within BUDGET runs exactly. Anything over it is either refused
+with CostLimitError or, by default, approximated: Stirling's formula via
+lgamma for factorials and a log-domain result for powers. Results beyond the
+float range come back as LargeNumber, which keeps sign and log10 magnitude.
+
+    from calculator_core import guards
+    guards.BUDGET.max_digits = 100_000    # allow bigger exact results
+    guards.BUDGET.approximate = False     # refuse instead of approximating
+"""
+import math
+import sys
+from collections import namedtuple
+from functools import lru_cache, total_ordering
+
+_LOG10_2 = math.log10(2)
+_FLOAT_MAX_LOG10 = math.log10(sys.float_info.max)
+
+# Rough big-int cost model, seconds ~ k * digits**1.585 (Karatsuba). The
+# constants were measured on CPython 3.11 and only need to be the right
+# order of magnitude to keep latency bounded.
+_FACTORIAL_COST = 3.5e-10
+_POWER_COST = 1.5e-10
+_KARATSUBA = 1.585
+
+Estimate = namedtuple('Estimate', ['digits', 'seconds'])
+
+
+class CostLimitError(ValueError):
+    """Raised when an exact result would exceed the budget and approximation is off."""
+
+
+class Budget:
+    """Limits for exact factorial/power results."""
+
+    def __init__(self, max_digits=None, max_seconds=0.1, approximate=True):
+        # By default allow exactly what the display can print
+        if max_digits is None:
+            max_digits = getattr(sys, 'get_int_max_str_digits', lambda: 4300)() or 4300
+        self.max_digits = max_digits
+        self.max_seconds = max_seconds
+        self.approximate = approximate
+
+    def allows(self, estimate):
+        return estimate.digits <= self.max_digits and estimate.seconds <= self.max_seconds
+
+
+BUDGET = Budget()
+
+
+def estimate_factorial(n):
+    digits = math.lgamma(n + 1) / math.log(10) + 1
+    return Estimate(digits, _FACTORIAL_COST * digits ** _KARATSUBA)
+
+
+def estimate_power(base, exponent):
+    digits = exponent * math.log10(abs(base)) + 1
+    return Estimate(digits, _POWER_COST * digits ** _KARATSUBA)
+
+
+def _from_log10(sign, log10):
+    """Build the value sign * 10**log10 as a float when it fits, else LargeNumber."""
+    if sign == 0 or log10 == -math.inf:
+        return 0.0
+    if log10 < _FLOAT_MAX_LOG10:
+        return sign * 10.0 ** log10
+    if log10 == math.inf or log10 != log10:
+        raise OverflowError("result too large")
+    return LargeNumber(sign, log10)
+
+
+def _sign_log10(value):
+    if isinstance(value, LargeNumber):
+        return value.sign, value.log10
+    if value == 0:
+        return 0, -math.inf
+    return (1 if value > 0 else -1), math.log10(abs(value))
+
+
+@total_ordering
+class LargeNumber:
+    """An approximate value too large for float: sign * 10**log10."""
+
+    __slots__ = ('sign', 'log10')
+
+    def __init__(self, sign, log10):
+        self.sign = sign
+        self.log10 = log10
+
+    def __str__(self):
+        exponent = math.floor(self.log10)
+        mantissa = 10 ** (self.log10 - exponent)
+        return f"{'-' if self.sign < 0 else ''}{mantissa:.10g}e+{exponent}"
+
+    def __repr__(self):
+        return f"LargeNumber({self})"
+
+    def __float__(self):
+        return self.sign * math.inf
+
+    def __neg__(self):
+        return LargeNumber(-self.sign, self.log10)
+
+    def __abs__(self):
+        return LargeNumber(1, self.log10)
+
+    def __mul__(self, other):
+        sign, log10 = _sign_log10(other)
+        return _from_log10(self.sign * sign, self.log10 + log10)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        sign, log10 = _sign_log10(other)
+        if sign == 0:
+            raise ZeroDivisionError("division by zero")
+        return _from_log10(self.sign * sign, self.log10 - log10)
+
+    def __rtruediv__(self, other):
+        sign, log10 = _sign_log10(other)
+        return _from_log10(self.sign * sign, log10 - self.log10)
+
+    def __add__(self, other):
+        sign, log10 = _sign_log10(other)
+        if sign == 0:
+            return self
+        big, small = (self, (sign, log10)) if self.log10 >= log10 else ((sign, log10), self)
+        big_sign, big_log = _sign_log10(big) if isinstance(big, LargeNumber) else big
+        small_sign, small_log = _sign_log10(small) if isinstance(small, LargeNumber) else small
+        ratio = 10 ** (small_log - big_log)
+        total = 1 + ratio if big_sign == small_sign else 1 - ratio
+        if total == 0:
+            return 0.0
+        return _from_log10(big_sign, big_log + math.log10(total))
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __pow__(self, exponent):
+        if isinstance(exponent, LargeNumber):
+            if exponent.sign < 0:
+                return 0.0
+            raise OverflowError("result too large")
+        if self.sign < 0:
+            if not float(exponent).is_integer():
+                raise ValueError("negative base with fractional exponent")
+            sign = -1 if int(exponent) % 2 else 1
+        else:
+            sign = 1
+        return _from_log10(sign, self.log10 * exponent)
+
+    def __rpow__(self, base):
+        magnitude = abs(base)
+        if magnitude == 1:
+            return 1.0 if base > 0 or self.sign < 0 else base
+        if (magnitude > 1) == (self.sign > 0):
+            raise OverflowError("result too large")
+        return 0.0
+
+    def __mod__(self, other):
+        raise OverflowError("modulo of an approximate result")
+
+    __rmod__ = __mod__
+
+    def __eq__(self, other):
+        return _sign_log10(other) == (self.sign, self.log10)
+
+    def __lt__(self, other):
+        sign, log10 = _sign_log10(other)
+        if self.sign != sign:
+            return self.sign < sign
+        return self.log10 < log10 if self.sign > 0 else self.log10 > log10
+
+    def __hash__(self):
+        return hash((self.sign, self.log10))
+
+
+# Exact n! by n. Only values the budget already let through are computed, so
+# this remembers arithmetic, not budget decisions; compiled expressions no
+# longer fold guarded results, and a repeated 1000! should not redo the work.
+_exact_factorial = lru_cache(maxsize=256)(math.factorial)
+
+
+def factorial(n, budget=None):
+    """n! computed exactly when within budget (default BUDGET), else approximated or refused."""
+    budget = budget or BUDGET
+    if isinstance(n, LargeNumber):
+        raise OverflowError("result too large")
+    if isinstance(n, float):
+        if not n.is_integer():
+            raise ValueError("factorial() only accepts integral values")
+        n = int(n)
+    if n < 0:
+        raise ValueError("factorial() not defined for negative values")
+    estimate = estimate_factorial(n)
+    if budget.allows(estimate):
+        return _exact_factorial(n)
+    if not budget.approximate:
+        raise CostLimitError(f"{n}! would have about {estimate.digits:,.0f} digits")
+    return _from_log10(1, math.lgamma(n + 1) / math.log(10))
+
+
+def power(base, exponent, budget=None):
+    """base ** exponent, with exact big-int powers checked against budget (default BUDGET)."""
+    budget = budget or BUDGET
+    if isinstance(base, LargeNumber) or isinstance(exponent, LargeNumber):
+        return base ** exponent
+    if (isinstance(base, int) and isinstance(exponent, int)
+            and exponent > 1 and abs(base) > 1):
+        estimate = estimate_power(base, exponent)
+        if budget.allows(estimate):
+            return base ** exponent
+        if not budget.approximate:
+            raise CostLimitError(f"{base}^{exponent} would have about {estimate.digits:,.0f} digits")
+        sign = -1 if base < 0 and exponent % 2 else 1
+        return _from_log10(sign, exponent * math.log10(abs(base)))
+    try:
+        return base ** exponent
+    except OverflowError:
+        # float ** float out of range; a log-domain result is still meaningful
+        if not budget.approximate or base <= 0:
+            raise
+        return _from_log10(1, exponent * math.log10(base))
+
+
+def parse_large(text):
+    """Read back a literal such as '2.8e+456573' that overflows float."""
+    mantissa, _, exponent = text.lower().partition('e')
+    return _from_log10(1, math.log10(float(mantissa)) + int(exponent or 0))
+
+
+def format_number(value):
+    """str() for results, falling back to scientific form for huge ints."""
+    if isinstance(value, int) and value.bit_length() * _LOG10_2 > BUDGET.max_digits:
+        return str(LargeNumber(1 if value > 0 else -1, math.log10(abs(value))))
+    return str(value)
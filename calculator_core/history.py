@@ -0,0 +1,171 @@
+"""Calculation history: a bounded in-memory ring backed by an SQLite log.
+
+Every evaluation is appended to an SQLite table (append-only, written in
+batches) with an index on the expression text for prefix search and one on
+the normalized expression for exact recall. Recent entries also live in a
+fixed-size ring of __slots__ records, so a long session never grows memory
+past ring_size entries, and an LRU of recent results answers repeated
+expressions without touching the database.
+
+    history = History("~/.calculator_history.db")
+    history.lookup("2+2")              # None, or the stored result text
+    history.record("2+2", "4")
+    history.search("sin(")             # newest entries starting with 'sin('
+
+Rows are tagged with the version key of the code cache (engine code version
+and Python implementation), and lookup() only answers from rows of the
+running version, so a fix to evaluation or formatting is never masked by a
+result stored before it. search() and recent() still list older rows.
+
+Rows are also keyed by the mode that produced them: 'normal' for the exact
+keypad arithmetic, 'scientific' for the float engine. The two disagree on
+purpose (0.1+0.2 is 0.3 on the keypad), so neither answers for the other.
+"""
+import os
+import sqlite3
+import time
+from collections import deque
+
+from .codecache import VERSION
+from .engine import ExpressionError, LRUCache, normalize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    expression TEXT NOT NULL,
+    key TEXT NOT NULL,
+    angle_unit TEXT NOT NULL,
+    result TEXT NOT NULL,
+    ok INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    version TEXT NOT NULL DEFAULT '',
+    mode TEXT NOT NULL DEFAULT ''
+);
+"""
+
+# Created after the columns are migrated; history_key gained mode with that column
+INDEXES = """
+CREATE INDEX IF NOT EXISTS history_expression ON history (expression);
+CREATE INDEX IF NOT EXISTS history_key ON history (key, angle_unit, mode);
+"""
+
+# Pending rows are written in one transaction once this many accumulate
+BATCH_SIZE = 64
+
+
+class HistoryEntry:
+    __slots__ = ('expression', 'result', 'timestamp', 'angle_unit', 'mode')
+
+    def __init__(self, expression, result, timestamp, angle_unit='rad', mode='scientific'):
+        self.expression = expression
+        self.result = result
+        self.timestamp = timestamp
+        self.angle_unit = angle_unit
+        self.mode = mode
+
+    def __repr__(self):
+        return f"HistoryEntry({self.expression!r}, {self.result!r})"
+
+
+def _key(expression):
+    try:
+        return normalize(expression)
+    except ExpressionError:
+        return expression.strip()
+
+
+def _prefix_upper_bound(prefix):
+    # Smallest string greater than every string starting with prefix
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class History:
+    """Persistent calculation history. path=None or ':memory:' keeps it in RAM."""
+
+    def __init__(self, path=None, ring_size=1000, cache_size=4096):
+        path = os.path.expanduser(path) if path else ':memory:'
+        self._db = sqlite3.connect(path)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        columns = {row[1] for row in self._db.execute('PRAGMA table_info(history)')}
+        if 'version' not in columns:  # a log from before rows were tagged; never served
+            with self._db:
+                self._db.execute("ALTER TABLE history ADD COLUMN version TEXT NOT NULL DEFAULT ''")
+        if 'mode' not in columns:  # a log from before rows were keyed by mode; never served
+            with self._db:
+                self._db.execute("ALTER TABLE history ADD COLUMN mode TEXT NOT NULL DEFAULT ''")
+                self._db.execute('DROP INDEX IF EXISTS history_key')
+        self._db.executescript(INDEXES)
+        self.ring = deque(maxlen=ring_size)
+        self._results = LRUCache(cache_size)
+        self._pending = []
+
+    def record(self, expression, result, ok=True, angle_unit='rad', mode='scientific'):
+        """Append one evaluation; failed ones are kept but never served by lookup()."""
+        now = time.time()
+        key = _key(expression)
+        self.ring.append(HistoryEntry(expression, result, now, angle_unit, mode))
+        if ok:
+            self._results[(key, angle_unit, mode)] = result
+        self._pending.append((expression, key, angle_unit, result, int(ok), now, VERSION, mode))
+        if len(self._pending) >= BATCH_SIZE:
+            self.flush()
+
+    def lookup(self, expression, angle_unit='rad', mode='scientific'):
+        """The stored result of an identical earlier expression, or None.
+
+        Only rows recorded by this code version in the same mode count (see the
+        module docstring).
+        """
+        key = (_key(expression), angle_unit, mode)
+        result = self._results.get(key)
+        if result is None:
+            self.flush()
+            row = self._db.execute(
+                'SELECT result FROM history WHERE key = ? AND angle_unit = ? AND mode = ? '
+                'AND ok = 1 AND version = ? ORDER BY id DESC LIMIT 1', key + (VERSION,)).fetchone()
+            if row is not None:
+                result = row[0]
+                self._results[key] = result
+        return result
+
+    def search(self, prefix, limit=50):
+        """Newest entries whose expression starts with prefix (index range scan)."""
+        self.flush()
+        if prefix:
+            rows = self._db.execute(
+                'SELECT expression, result, timestamp, angle_unit, mode FROM history '
+                'WHERE expression >= ? AND expression < ? ORDER BY id DESC LIMIT ?',
+                (prefix, _prefix_upper_bound(prefix), limit))
+        else:
+            rows = self._db.execute(
+                'SELECT expression, result, timestamp, angle_unit, mode FROM history '
+                'ORDER BY id DESC LIMIT ?', (limit,))
+        return [HistoryEntry(*row) for row in rows]
+
+    def recent(self, count=20):
+        """The last `count` entries of this session, newest first."""
+        return list(reversed(self.ring))[:count]
+
+    def __len__(self):
+        self.flush()
+        return self._db.execute('SELECT COUNT(*) FROM history').fetchone()[0]
+
+    def flush(self):
+        if self._pending:
+            with self._db:
+                self._db.executemany(
+                    'INSERT INTO history (expression, key, angle_unit, result, ok, timestamp, version, mode) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', self._pending)
+            self._pending = []
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
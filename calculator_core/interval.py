@@ -0,0 +1,496 @@
+"""Interval evaluation: guaranteed enclosures instead of bare floats.
+
+    evaluate_interval("sin(1)^2 + cos(1)^2")   # Interval(0.9999999999999997, 1.0000000000000004)
+    evaluate_bounded("1/3")                    # Enclosure(value=0.3333333333333333, ...)
+    evaluate_bounded("(1e16 + 1) - 1e16")      # too wide as floats: escalated, value=Decimal('1')
+
+Every value is an Interval [lo, hi] of floats that contains the exact real
+result. Literals become the tightest interval around their decimal value
+('0.1' is not a float), and every operation rounds outward:
+
+- + - * / use error-free transformations (TwoSum, Dekker's TwoProduct) to
+  find out whether the float result is exact and, if not, on which side the
+  exact value lies, so exact steps (small integers, halves) stay exact and
+  inexact ones widen by one ulp in the right direction only.
+- sqrt is correctly rounded; its residual gives the direction the same way.
+- exp, ln, log, trig functions and their inverses come from the platform
+  libm, which is within one ulp for these functions on every platform
+  CPython supports; their results are widened by two ulps each way.
+  Monotonic pieces are evaluated at the endpoints; sin and cos take their
+  extrema into account, and tan over a pole is unbounded.
+- x^n for integral n is computed by repeated outward-rounded multiplication
+  (x^2 of [-1, 2] is [0, 4], not [-2, 4]); other powers as exp(y*ln(x)).
+- n! of an integral n is exact, then rounded outward to floats.
+
+Domain errors follow the float engine: an argument entirely outside a
+function's domain raises ValueError, one that straddles the boundary is
+clipped to it.
+
+evaluate_bounded pairs the calculator's usual result (a float, int or
+LargeNumber; the midpoint should none fall inside) with the interval when
+the enclosure is tight enough (relative width at most tolerance). Otherwise
+it re-evaluates with precision.evaluate_exact, so the cost of arbitrary
+precision is only paid where floats actually lost the digits. The precise
+path is not interval arithmetic: it runs at digits and at twice that and
+takes the difference as its error estimate (sin(pi) comes out as about
+1e-110 +- 1e-60, not as a wrong 1e-60 to 50 digits). That estimate is not
+rigorous, so escalated bounds are only as good as that heuristic; results
+with digits=None carry guaranteed bounds. An enclosure that is unbounded
+other than by plain overflow (tan(pi/2) is [-inf, inf]) may hide a pole,
+where the estimate would be meaningless, so it is returned as it is.
+Escalation is radian-only, like the precision module; degree-mode results
+keep their (wide) interval.
+"""
+import math
+from collections import namedtuple
+from decimal import Decimal, localcontext
+from fractions import Fraction
+from functools import lru_cache
+
+from . import guards, precision, trig
+from .engine import Backend, ExpressionError, compile_ast, compile_expression, evaluate
+
+# Relative width up to which the float enclosure is accepted (about 12 digits)
+TOLERANCE = 1e-12
+
+# Ulps added on each side of a libm result
+LIBM_ULPS = 2
+
+_INF = math.inf
+_MAX = 1.7976931348623157e308
+
+
+def _down(x, steps=1):
+    for _ in range(steps):
+        x = math.nextafter(x, -_INF)
+    return x
+
+
+def _up(x, steps=1):
+    for _ in range(steps):
+        x = math.nextafter(x, _INF)
+    return x
+
+
+class Interval:
+    """A closed interval [lo, hi] of floats known to contain the exact value."""
+
+    __slots__ = ('lo', 'hi')
+
+    def __init__(self, lo, hi=None):
+        self.lo = lo
+        self.hi = lo if hi is None else hi
+
+    @property
+    def midpoint(self):
+        if self.lo == self.hi:
+            return self.lo
+        if math.isinf(self.lo) or math.isinf(self.hi):
+            return self.lo if math.isinf(self.hi) else self.hi
+        return self.lo / 2 + self.hi / 2
+
+    @property
+    def width(self):
+        return self.hi - self.lo
+
+    def relative_width(self):
+        """Width relative to the larger endpoint magnitude (0 for a point)."""
+        if self.lo == self.hi:
+            return 0.0
+        scale = max(abs(self.lo), abs(self.hi))
+        return self.width / scale if scale else 0.0
+
+    def __contains__(self, value):
+        return self.lo <= value <= self.hi
+
+    def __eq__(self, other):
+        return isinstance(other, Interval) and self.lo == other.lo and self.hi == other.hi
+
+    def __hash__(self):
+        return hash((Interval, self.lo, self.hi))
+
+    def __repr__(self):
+        return f"Interval({self.lo!r}, {self.hi!r})"
+
+
+# --- Conversions ---
+
+def _from_fraction(exact):
+    """Tightest float interval around a rational (int or Fraction)."""
+    try:
+        value = float(exact)
+    except OverflowError:
+        return Interval(_MAX, _INF) if exact > 0 else Interval(-_INF, -_MAX)
+    if math.isinf(value):
+        return Interval(_MAX, _INF) if value > 0 else Interval(-_INF, -_MAX)
+    if value == exact:
+        return Interval(value)
+    return Interval(_down(value), value) if value > exact else Interval(value, _up(value))
+
+
+def _literal(text):
+    if text.isdigit():
+        return _from_fraction(int(text))
+    return _from_fraction(Fraction(text))
+
+
+def interval(value):
+    """An Interval for a variable value: ints exactly, floats as points."""
+    if isinstance(value, Interval):
+        return value
+    if isinstance(value, int):
+        return _from_fraction(value)
+    value = float(value)
+    return Interval(value)
+
+
+# math.pi and math.e both lie just below the true constants
+PI = Interval(math.pi, _up(math.pi))
+E = Interval(math.e, _up(math.e))
+
+
+# --- Error-free transformations ---
+
+_SPLITTER = 134217729.0  # 2^27 + 1
+_SPLIT_LIMIT = 2.0 ** 996
+_TINY = 2.0 ** -960  # below this the product error term may underflow
+
+
+def _two_sum(a, b):
+    s = a + b
+    bb = s - a
+    return s, (a - (s - bb)) + (b - bb)
+
+
+def _split(a):
+    c = _SPLITTER * a
+    high = c - (c - a)
+    return high, a - high
+
+
+def _two_product(a, b):
+    p = a * b
+    if not (_TINY < abs(p) < _SPLIT_LIMIT and abs(a) < _SPLIT_LIMIT and abs(b) < _SPLIT_LIMIT):
+        return p, (0.0 if p == 0 or a == 0 or b == 0 else math.nan)
+    ah, al = _split(a)
+    bh, bl = _split(b)
+    return p, al * bl - (((p - ah * bh) - al * bh) - ah * bl)
+
+
+def _rounded(value, error):
+    """(down, up): the float bounds of value + error, error being exact or nan."""
+    if error == 0:
+        return value, value
+    if error > 0:
+        return value, _up(value)
+    if error < 0:
+        return _down(value), value
+    return _down(value), _up(value)  # error unknown (nan): both ways
+
+
+def _add_bounds(a, b):
+    return _rounded(*_two_sum(a, b))
+
+
+def _mul_bounds(a, b):
+    if a == 0 or b == 0:
+        return 0.0, 0.0  # also for an infinite other factor: the interval convention
+    return _rounded(*_two_product(a, b))
+
+
+def _div_bounds(a, b):
+    q = a / b
+    if not math.isfinite(q) or not math.isfinite(a):
+        return _rounded(q, math.nan)
+    p, error = _two_product(q, b)
+    residual = (a - p) - error  # a - q*b, exact
+    if residual != residual:  # nan
+        return _rounded(q, math.nan)
+    return _rounded(q, residual if b > 0 else -residual)
+
+
+# --- Operators ---
+
+def _add(x, y):
+    return Interval(_add_bounds(x.lo, y.lo)[0], _add_bounds(x.hi, y.hi)[1])
+
+
+def _sub(x, y):
+    return Interval(_add_bounds(x.lo, -y.hi)[0], _add_bounds(x.hi, -y.lo)[1])
+
+
+def _neg(x):
+    return Interval(-x.hi, -x.lo)
+
+
+def _mul(x, y):
+    corners = [_mul_bounds(a, b) for a in (x.lo, x.hi) for b in (y.lo, y.hi)]
+    return Interval(min(c[0] for c in corners), max(c[1] for c in corners))
+
+
+def _div(x, y):
+    if y.lo == y.hi == 0:
+        raise ZeroDivisionError("division by zero")
+    if y.lo <= 0 <= y.hi:
+        return Interval(-_INF, _INF)
+    corners = [_div_bounds(a, b) for a in (x.lo, x.hi) for b in (y.lo, y.hi)]
+    return Interval(min(c[0] for c in corners), max(c[1] for c in corners))
+
+
+def _mod(x, y):
+    if y.lo == y.hi == 0:
+        raise ZeroDivisionError("modulo by zero")
+    if y.lo == y.hi and x.hi - x.lo < abs(y.lo) and math.isfinite(x.hi - x.lo):
+        # Within one period x % y is x shifted by the same multiple of y at both ends
+        low, high = x.lo % y.lo, x.hi % y.lo
+        if low <= high:
+            if x.lo >= 0 and x.hi >= 0 and y.lo > 0:
+                return Interval(low, high)  # fmod of same-signed floats is exact
+            return Interval(_down(low), _up(high))
+    # The result lies between 0 and y, taking the sign of y
+    return Interval(min(0.0, y.lo), max(0.0, y.hi))
+
+
+def _pow_int_bounds(base, n, down):
+    # base >= 0; binary exponentiation with every product rounded the same way
+    index = 0 if down else 1
+    result = 1.0
+    while n:
+        if n & 1:
+            result = _mul_bounds(result, base)[index]
+        n >>= 1
+        if n:
+            base = _mul_bounds(base, base)[index]
+    return result
+
+
+def _int_power(x, n):
+    if n == 0:
+        return Interval(1.0)
+    if n < 0:
+        return _div(Interval(1.0), _int_power(x, -n))
+    if n % 2 == 0:
+        magnitude = max(abs(x.lo), abs(x.hi))
+        least = 0.0 if x.lo <= 0 <= x.hi else min(abs(x.lo), abs(x.hi))
+        return Interval(_pow_int_bounds(least, n, True), _pow_int_bounds(magnitude, n, False))
+    # Odd powers are increasing; negative bases by symmetry
+    def bound(a, down):
+        if a >= 0:
+            return _pow_int_bounds(a, n, down)
+        return -_pow_int_bounds(-a, n, not down)
+    return Interval(bound(x.lo, True), bound(x.hi, False))
+
+
+def _power(x, y):
+    if y.lo == y.hi and float(y.lo).is_integer() and abs(y.lo) < 2 ** 53:
+        n = int(y.lo)
+        if n < 0 and x.lo == x.hi == 0:
+            raise ZeroDivisionError("0.0 cannot be raised to a negative power")
+        return _int_power(x, n)
+    if x.hi < 0 or (x.lo < 0 and x.hi == 0):
+        raise ValueError("negative base with fractional exponent")
+    if x.hi == 0:
+        return Interval(0.0) if y.lo > 0 else Interval(1.0) if y.lo == y.hi == 0 else Interval(0.0, _INF)
+    # Clipped to the real domain x >= 0, then x^y = exp(y ln x)
+    result = _exp(_mul(y, _ln(Interval(max(x.lo, 0.0), x.hi))))
+    return Interval(max(result.lo, 0.0), result.hi)
+
+
+def _factorial(x):
+    if x.lo != x.hi:
+        raise ValueError("factorial() only accepts integral values")
+    value = guards.factorial(x.lo)
+    if isinstance(value, guards.LargeNumber):
+        return Interval(_MAX, _INF)
+    return _from_fraction(value)
+
+
+# --- Functions ---
+
+def _libm(fn, x):
+    try:
+        return fn(x)
+    except OverflowError:
+        return _INF
+
+
+def _increasing(fn, low=-_INF, high=_INF, closed=True):
+    """Interval version of an increasing libm function on the domain [low, high]."""
+    def apply(x):
+        lo, hi = max(x.lo, low), min(x.hi, high)
+        if lo > hi or (not closed and hi <= low):
+            raise ValueError("math domain error")
+        if not closed and lo <= low:
+            result_lo = -_INF  # ln and log reach -inf at the edge of their domain
+        else:
+            result_lo = _down(_libm(fn, lo), LIBM_ULPS)
+        return Interval(result_lo, _up(_libm(fn, hi), LIBM_ULPS))
+    return apply
+
+
+def _decreasing(fn, low, high):
+    def apply(x):
+        lo, hi = max(x.lo, low), min(x.hi, high)
+        if lo > hi:
+            raise ValueError("math domain error")
+        return Interval(_down(fn(hi), LIBM_ULPS), _up(fn(lo), LIBM_ULPS))
+    return apply
+
+
+def _sqrt(x):
+    if x.hi < 0:
+        raise ValueError("math domain error")
+
+    def bounds(a):
+        root = math.sqrt(a)
+        if math.isinf(root):
+            return root, root
+        p, error = _two_product(root, root)
+        return _rounded(root, (a - p) - error)  # sign of a - root^2
+    return Interval(bounds(max(x.lo, 0.0))[0], bounds(x.hi)[1])
+
+
+_exp = _increasing(math.exp)
+_ln = _increasing(math.log, 0.0, closed=False)
+_log10 = _increasing(math.log10, 0.0, closed=False)
+
+
+def _reaches(x, point, period):
+    """Whether [x.lo, x.hi] contains point + k*period for some integer k (conservatively)."""
+    slack = 1e-9
+    return math.floor((x.hi - point) / period + slack) >= math.ceil((x.lo - point) / period - slack)
+
+
+def _periodic(fn, top, bottom, period):
+    """sin or cos: endpoint values, plus +-1 wherever a peak or trough lies inside."""
+    def apply(x):
+        if math.isinf(x.lo) or math.isinf(x.hi):
+            if x.lo == x.hi:
+                raise ValueError("math domain error")
+            return Interval(-1.0, 1.0)
+        a, b = fn(x.lo), fn(x.hi)
+        lo, hi = _down(min(a, b), LIBM_ULPS), _up(max(a, b), LIBM_ULPS)
+        if x.lo != x.hi:
+            if x.hi - x.lo >= period or abs(x.lo) > 2.0 ** 40:
+                return Interval(-1.0, 1.0)
+            if _reaches(x, top, period):
+                hi = 1.0
+            if _reaches(x, bottom, period):
+                lo = -1.0
+        return Interval(max(lo, -1.0), min(hi, 1.0))
+    return apply
+
+
+def _tangent(fn, pole, period):
+    def apply(x):
+        if x.lo != x.hi and (x.hi - x.lo >= period or _reaches(x, pole, period)):
+            return Interval(-_INF, _INF)
+        return Interval(_down(fn(x.lo), LIBM_ULPS), _up(fn(x.hi), LIBM_ULPS))
+    return apply
+
+
+def _trig_functions(angle_unit):
+    if angle_unit == 'rad':
+        sin, cos, tan = math.sin, math.cos, math.tan
+        asin, acos, atan = math.asin, math.acos, math.atan
+        half_turn = math.pi
+    elif angle_unit == 'deg':
+        sin, cos, tan = trig.sin_deg, trig.cos_deg, trig.tan_deg
+        asin, acos, atan = (trig.DEGREE_FUNCTIONS[name] for name in ('asin', 'acos', 'atan'))
+        half_turn = 180.0
+    else:
+        raise ValueError(f"Unknown angle unit {angle_unit!r}; expected 'rad' or 'deg'")
+    period = 2 * half_turn
+    return {
+        'sin': _periodic(sin, half_turn / 2, -half_turn / 2, period),
+        'cos': _periodic(cos, 0.0, half_turn, period),
+        'tan': _tangent(tan, half_turn / 2, half_turn),
+        'asin': _increasing(asin, -1.0, 1.0),
+        'acos': _decreasing(acos, -1.0, 1.0),
+        'atan': _increasing(atan),
+    }
+
+
+@lru_cache(maxsize=2)
+def interval_backend(angle_unit='rad'):
+    """Backend whose values are Intervals, for the given angle unit."""
+    return Backend(
+        f'interval-{angle_unit}',
+        number=_literal,
+        constants={'pi': PI, 'e': E},
+        functions=dict(_trig_functions(angle_unit), log=_log10, ln=_ln, sqrt=_sqrt, exp=_exp),
+        operators={
+            '+': _add, '-': _sub, '*': _mul, '/': _div, '%': _mod, '^': _power,
+            'neg': _neg, 'fact': _factorial,
+        },
+    )
+
+
+@lru_cache(maxsize=1024)
+def _compile_interval(compiled, angle_unit):
+    return compile_ast(compiled.tree, interval_backend(angle_unit))
+
+
+def evaluate_interval(text, env=None, angle_unit='rad', **variables):
+    """Evaluate to an Interval guaranteed to contain the exact result."""
+    if variables:
+        env = dict(env or {}, **variables)
+    env = {name: interval(value) for name, value in (env or {}).items()}
+    try:
+        return _compile_interval(compile_expression(text), angle_unit)(env)
+    except TypeError as exc:
+        raise ExpressionError(str(exc)) from None
+
+
+# value: the engine's result (int, float or LargeNumber), or a Decimal when escalated;
+# lower/upper: the enclosure (guaranteed when digits is None, estimated otherwise);
+# digits: None, or the precision the result was escalated to
+Enclosure = namedtuple('Enclosure', ['value', 'lower', 'upper', 'digits'])
+
+
+def _float_value(text, env, angle_unit, enclosure):
+    try:
+        value = evaluate(text, env, angle_unit)
+    except (ArithmeticError, ValueError):
+        value = None
+    if isinstance(value, (int, float, guards.LargeNumber)) and value in enclosure:
+        return value
+    return enclosure.midpoint
+
+
+def _overflow_only(enclosure):
+    # Finite, or past the float range on one side only ([_MAX, inf], as for 2^5000,
+    # give or take the outward rounding); anything else ([0, inf] from tan(pi/2)^2)
+    # may contain a pole
+    return (math.isfinite(enclosure.lo) and math.isfinite(enclosure.hi)
+            or enclosure.lo > _MAX / 2 or enclosure.hi < -_MAX / 2)
+
+
+def evaluate_bounded(text, env=None, angle_unit='rad', tolerance=TOLERANCE,
+                     digits=precision.DEFAULT_DIGITS, **variables):
+    """A result with bounds; escalates to digits precision only if floats are too loose."""
+    if variables:
+        env = dict(env or {}, **variables)
+    enclosure = evaluate_interval(text, env, angle_unit)
+    if (enclosure.relative_width() <= tolerance or angle_unit != 'rad'
+            or not _overflow_only(enclosure)):
+        return Enclosure(_float_value(text, env, angle_unit, enclosure), enclosure.lo, enclosure.hi, None)
+    try:
+        coarse = precision.evaluate_exact(text, digits, env)
+        fine = precision.evaluate_exact(text, 2 * digits, env)
+    except (ArithmeticError, ValueError):  # includes CostLimitError and domain errors
+        return Enclosure(_float_value(text, env, angle_unit, enclosure), enclosure.lo, enclosure.hi, None)
+    value = precision.to_decimal(fine, digits)
+    unit = Decimal(1).scaleb(value.adjusted() - digits + 1)
+    error = max(unit, precision.to_decimal(abs(fine - coarse), digits))
+    with localcontext() as ctx:
+        ctx.prec = digits
+        lower, upper = value - error, value + error
+    if fine == coarse and value == fine:
+        lower = upper = value  # exact arithmetic all the way
+    # The float enclosure is rigorous; never report looser bounds than it
+    if math.isfinite(enclosure.lo):
+        lower = max(lower, Decimal(enclosure.lo))
+    if math.isfinite(enclosure.hi):
+        upper = min(upper, Decimal(enclosure.hi))
+    return Enclosure(value, lower, upper, digits)
@@ -0,0 +1,170 @@
+"""Exact evaluator for the normal-mode keypad: digits, '.', + - * / % and unary signs.
+
+Normal mode never needs functions, constants or powers, so it gets its own
+path: a single regex scan feeding the shunting-yard algorithm, without the
+general tokenizer, parser or compiler. Numbers stay exact throughout: every
+value is a ratio of Python ints (arbitrary size), so 0.1+0.2 is exactly 0.3
+and 1/3*3 is exactly 1. Results come back as an int when integral, else as a
+Fraction.
+
+    evaluate('12+7')        # 19
+    evaluate('0.1+0.2')     # Fraction(3, 10)
+    format_exact(Fraction(3, 10))  # '0.3'
+
+Input outside that alphabet raises UnsupportedInput, so callers can fall
+back to the general engine; malformed keypad input raises ExpressionError.
+"""
+import re
+from decimal import Decimal, localcontext
+from fractions import Fraction
+from math import gcd
+
+from . import guards
+from .engine import ExpressionError
+
+# Non-terminating quotients such as 1/3 are shown with this many significant digits
+DISPLAY_DIGITS = 16
+
+
+class UnsupportedInput(ExpressionError):
+    """The text uses something other than the normal-mode keypad."""
+
+
+# Values are (numerator, denominator) pairs of ints with denominator > 0.
+# Reducing by the gcd happens once at the end: keypad expressions are short,
+# and plain int arithmetic is several times faster than Fraction's.
+
+def _add(x, y):
+    a, b = x
+    c, d = y
+    if b == d:
+        return (a + c, b)
+    return (a * d + c * b, b * d)
+
+
+def _sub(x, y):
+    a, b = x
+    c, d = y
+    if b == d:
+        return (a - c, b)
+    return (a * d - c * b, b * d)
+
+
+def _mul(x, y):
+    return (x[0] * y[0], x[1] * y[1])
+
+
+def _div(x, y):
+    a, b = x
+    c, d = y
+    if c == 0:
+        raise ZeroDivisionError("division by zero")
+    if c < 0:
+        return (-a * d, -b * c)
+    return (a * d, b * c)
+
+
+def _mod(x, y):
+    # Python semantics, x - y*floor(x/y): the result takes the sign of y
+    a, b = x
+    c, d = y
+    if c == 0:
+        raise ZeroDivisionError("modulo by zero")
+    q = (a * d) // (b * c)
+    return (a * d - q * c * b, b * d)
+
+
+_OPERATORS = {
+    '+': (1, _add),
+    '-': (1, _sub),
+    '*': (2, _mul),
+    '/': (2, _div),
+    '%': (2, _mod),
+}
+
+# Numbers, operators, whitespace; anything else is not a keypad key
+_TOKEN_RE = re.compile(r"([0-9.]+)|([-+*/%])|\s+|(.)")
+
+
+def _number(text):
+    if text.isdigit():
+        return (int(text), 1)
+    whole, _, fraction = text.partition('.')
+    if '.' in fraction or not (whole or fraction):
+        raise ExpressionError(f"Malformed number {text!r}")
+    return (int(whole + fraction), 10 ** len(fraction))
+
+
+def evaluate(text, first=None):
+    """Evaluate keypad input exactly; returns an int or a Fraction.
+
+    If first is given it is the exact value of a previous result and text is
+    what was typed after it (starting with an operator), so chained results
+    keep full precision instead of being re-read from their display form.
+    """
+    values = [] if first is None else [(first.numerator, first.denominator)]
+    ops = []
+    expect_operand = first is None
+    negative = False
+    for number, op, bad in _TOKEN_RE.findall(text):
+        if number:
+            if not expect_operand:
+                raise ExpressionError(f"Unexpected number {number!r}")
+            value = _number(number)
+            values.append((-value[0], value[1]) if negative else value)
+            negative = False
+            expect_operand = False
+        elif op:
+            if expect_operand:
+                if op not in '+-':
+                    raise ExpressionError(f"Unexpected {op!r}")
+                if op == '-':
+                    negative = not negative
+                continue
+            precedence, _ = _OPERATORS[op]
+            while ops and ops[-1][0] >= precedence:
+                right = values.pop()
+                values[-1] = ops.pop()[1](values[-1], right)
+            ops.append(_OPERATORS[op])
+            expect_operand = True
+        elif bad:
+            raise UnsupportedInput(f"{bad!r} is not a normal-mode key")
+    if expect_operand:
+        raise ExpressionError("Unexpected end of expression")
+    while ops:
+        right = values.pop()
+        values[-1] = ops.pop()[1](values[-1], right)
+    numerator, denominator = values[0]
+    if denominator == 1:
+        return numerator
+    divisor = gcd(numerator, denominator)
+    if divisor == denominator:
+        return numerator // divisor
+    return Fraction(numerator // divisor, denominator // divisor)
+
+
+def format_exact(value):
+    """Display form: ints in full, terminating decimals exactly, others rounded."""
+    if type(value) is not Fraction:
+        return guards.format_number(value)
+    denominator = value.denominator
+    twos = fives = 0
+    while denominator % 2 == 0:
+        denominator //= 2
+        twos += 1
+    while denominator % 5 == 0:
+        denominator //= 5
+        fives += 1
+    # A terminating decimal needs at most this many digits to be shown exactly
+    exact_digits = len(str(abs(value.numerator))) + max(twos, fives) + 1
+    with localcontext() as context:
+        if denominator == 1 and exact_digits <= guards.BUDGET.max_digits:
+            context.prec = exact_digits
+        else:
+            context.prec = DISPLAY_DIGITS
+        text = str(Decimal(value.numerator) / Decimal(value.denominator))
+    if 'E' in text:
+        return text.lower()  # '1e-8', which the engine reads back
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return text
@@ -0,0 +1,247 @@
+"""Opt-in instrumentation of the evaluation path.
+
+    from calculator_core import metrics
+    metrics.enable()
+    ...
+    print(metrics.exposition())          # Prometheus text format
+    metrics.write('/tmp/calculator.prom')
+
+Setting CALCULATOR_METRICS=<path> in the environment enables collection at
+import time and writes the file when the process exits.
+
+What is recorded while enabled:
+
+    calculator_stage_seconds{stage=...}      tokenize, parse, compile, evaluate, format;
+                                             the GUI adds history_lookup, display and
+                                             round_trip, the server adds batch
+    calculator_usage_total{name=...}         operators and functions in evaluated expressions
+    calculator_evaluations_total, calculator_errors_total{type=...}
+    calculator_cache_*{cache=...}            hits, misses and hit ratio of the engine and trig
+                                             caches (and of the code cache when enabled)
+
+When disabled (the default) the hot path pays for one attribute check per
+evaluation; the per-stage timing sits on cache-miss branches only.
+
+Profiling is separate and also opt-in: profile(path) wraps a block in
+cProfile, and Sampler records collapsed stacks (flamegraph input) from a
+background thread at a fixed interval without tracing every call.
+"""
+import atexit
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+
+enabled = False
+
+# Upper bounds in seconds, roughly log-spaced from 1us to 10s
+LATENCY_BUCKETS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001,
+                   0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def exposition(self, name, labels=''):
+        """Sample lines; the caller writes '# TYPE <name> histogram' once per name."""
+        prefix = labels + ',' if labels else ''
+        lines = []
+        running = 0
+        for bound, count in zip(self.bounds, self.counts):
+            running += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {running}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {self.count}')
+        suffix = f'{{{labels}}}' if labels else ''
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+_stages = {}            # stage -> Histogram
+_usage = Counter()      # operator/function name -> uses
+_errors = Counter()     # exception type name -> count
+_evaluations = 0
+_lock = threading.Lock()
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    global _evaluations
+    with _lock:
+        _stages.clear()
+        _usage.clear()
+        _errors.clear()
+        _evaluations = 0
+
+
+def observe(stage, seconds):
+    """Record the duration of one pipeline stage."""
+    with _lock:
+        histogram = _stages.get(stage)
+        if histogram is None:
+            histogram = _stages[stage] = Histogram()
+        histogram.observe(seconds)
+
+
+@contextmanager
+def span(stage):
+    """Time a block as one stage; a no-op while disabled."""
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def record_evaluation(usage, error=None):
+    """Count one evaluated expression: its operator/function usage and outcome."""
+    global _evaluations
+    with _lock:
+        _evaluations += 1
+        _usage.update(usage)
+        if error is not None:
+            _errors[type(error).__name__] += 1
+
+
+def _cache_lines():
+    from . import engine, trig  # late: engine imports this module
+    caches = [('expressions', engine.cache_info())]
+    caches += [(f'trig_{name}', info) for name, info in sorted(trig.cache_info().items())]
+    if engine._code_cache is not None:
+        caches.append(('code', engine._code_cache.info()))
+    lines = []
+    for metric, kind in (('hits_total', 'counter'), ('misses_total', 'counter'),
+                         ('hit_ratio', 'gauge'), ('size', 'gauge')):
+        lines.append(f"# TYPE calculator_cache_{metric} {kind}")
+        for name, info in caches:
+            lookups = info.hits + info.misses
+            value = {'hits_total': info.hits, 'misses_total': info.misses,
+                     'hit_ratio': info.hits / lookups if lookups else 0.0,
+                     'size': info.currsize}[metric]
+            lines.append(f'calculator_cache_{metric}{{cache="{name}"}} {value}')
+    return lines
+
+
+def exposition():
+    """Everything recorded so far, in the Prometheus text format."""
+    with _lock:
+        lines = ["# TYPE calculator_stage_seconds histogram"]
+        for stage, histogram in sorted(_stages.items()):
+            lines += histogram.exposition('calculator_stage_seconds', f'stage="{stage}"')
+        lines += ["# TYPE calculator_evaluations_total counter",
+                  f"calculator_evaluations_total {_evaluations}",
+                  "# TYPE calculator_errors_total counter"]
+        lines += [f'calculator_errors_total{{type="{name}"}} {count}'
+                  for name, count in sorted(_errors.items())]
+        lines.append("# TYPE calculator_usage_total counter")
+        lines += [f'calculator_usage_total{{name="{name}"}} {count}'
+                  for name, count in sorted(_usage.items())]
+    return '\n'.join(lines + _cache_lines()) + '\n'
+
+
+def write(path):
+    """Write exposition() to path atomically (for node_exporter's textfile collector)."""
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as out:
+        out.write(exposition())
+    os.replace(temporary, path)
+
+
+# --- Profiling ---
+
+@contextmanager
+def profile(path):
+    """Run the block under cProfile and dump pstats data to path."""
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+class Sampler:
+    """Statistical profiler: samples thread stacks every interval seconds.
+
+    thread_id limits sampling to one thread; by default every thread is
+    sampled (the GUI evaluates on pool threads). Output is in collapsed-stack
+    form ('a;b;c 12' per line), which flamegraph.pl and speedscope read.
+    """
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='calculator-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (self.thread_id is not None and ident != self.thread_id):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as out:
+            for stack, count in self.stacks.most_common():
+                out.write(f"{stack} {count}\n")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+_export_path = os.environ.get('CALCULATOR_METRICS')
+if _export_path:
+    enable()
+    atexit.register(write, _export_path)
@@ -0,0 +1,212 @@
+"""Multi-core batch evaluation with a process pool.
+
+Expressions are shipped to worker processes in chunks whose size adapts to the
+measured per-item cost, so cheap arithmetic goes out in large chunks while
+expensive rows are spread thin. Results come back in input order; input is
+read only a bounded window (max_inflight_chunks chunks) ahead of the output.
+
+Each worker publishes the index and start time of the item it is working on
+in shared memory. When an item runs longer than the per-item timeout (a huge
+factorial or power never returns control to Python, so it cannot be
+interrupted from inside), the parent kills that worker, records a timeout for
+the item, requeues the rest of its chunk and starts a replacement worker.
+"""
+import multiprocessing
+import os
+import time
+from collections import deque
+from multiprocessing.connection import wait
+
+from . import codecache
+from .batch import Result, evaluate_one
+
+# Aim for chunks that keep a worker busy for roughly this long
+TARGET_CHUNK_SECONDS = 0.05
+MIN_CHUNK, MAX_CHUNK = 1, 4096
+INITIAL_CHUNK = 16
+
+
+def _worker_main(conn, progress, slot, angle_unit):
+    index_at, started_at = 2 * slot, 2 * slot + 1
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        start, expressions = task
+        began = time.perf_counter()
+        results = []
+        for offset, expression in enumerate(expressions):
+            progress[started_at] = 0.0
+            progress[index_at] = start + offset
+            progress[started_at] = time.monotonic()
+            results.append(evaluate_one(expression, angle_unit))
+        progress[started_at] = 0.0
+        # Workers are terminated rather than shut down, so persist new compiles as we go
+        codecache.flush()
+        conn.send((start, results, time.perf_counter() - began))
+
+
+class _Worker:
+    __slots__ = ('process', 'conn', 'task')
+
+    def __init__(self, ctx, progress, slot, angle_unit):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child, progress, slot, angle_unit),
+                                   daemon=True)
+        self.process.start()
+        child.close()
+        self.task = None  # (start, expressions) currently assigned
+
+
+class ProcessPoolEvaluator:
+    """Evaluate expression streams across worker processes.
+
+    Use as a context manager; leaving the block (or calling cancel()) stops
+    all workers, including ones stuck on a runaway item.
+    """
+
+    def __init__(self, workers=None, timeout=None, chunk_size=None, max_inflight_chunks=None,
+                 angle_unit='rad'):
+        self.workers = workers or os.cpu_count() or 1
+        self.angle_unit = angle_unit
+        self.timeout = timeout
+        self.fixed_chunk = chunk_size
+        self.max_inflight = max_inflight_chunks or 4 * self.workers
+        self._ctx = multiprocessing.get_context()
+        self._progress = self._ctx.Array('d', 2 * self.workers, lock=False)
+        self._pool = []
+        self._per_item = None  # EWMA of seconds per item
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cancel()
+
+    def start(self):
+        if not self._pool:
+            self._pool = [_Worker(self._ctx, self._progress, slot, self.angle_unit) for slot in range(self.workers)]
+
+    def cancel(self):
+        """Stop every worker immediately."""
+        for worker in self._pool:
+            if worker.process.is_alive():
+                worker.process.terminate()
+        for worker in self._pool:
+            worker.process.join()
+            worker.conn.close()
+        self._pool = []
+
+    def _chunk_size(self):
+        if self.fixed_chunk:
+            return self.fixed_chunk
+        if self._per_item is None:
+            return INITIAL_CHUNK
+        size = int(TARGET_CHUNK_SECONDS / max(self._per_item, 1e-9))
+        return max(MIN_CHUNK, min(MAX_CHUNK, size))
+
+    def _record_timing(self, count, elapsed):
+        per_item = elapsed / max(count, 1)
+        if self._per_item is None:
+            self._per_item = per_item
+        else:
+            self._per_item = 0.7 * self._per_item + 0.3 * per_item
+
+    def _replace(self, slot):
+        old = self._pool[slot]
+        if old.process.is_alive():
+            old.process.terminate()
+        old.process.join()
+        old.conn.close()
+        self._progress[2 * slot + 1] = 0.0
+        self._pool[slot] = _Worker(self._ctx, self._progress, slot, self.angle_unit)
+
+    def _abandon(self, slot, reason, queue, done):
+        """Handle a stuck or dead worker: fail its current item, requeue the rest."""
+        worker = self._pool[slot]
+        start, expressions = worker.task
+        stuck = int(self._progress[2 * slot])
+        if not start <= stuck < start + len(expressions):
+            stuck = start
+        offset = stuck - start
+        done[stuck] = Result(expressions[offset], None, reason)
+        if offset + 1 < len(expressions):
+            queue.appendleft((stuck + 1, expressions[offset + 1:]))
+        if offset:
+            queue.appendleft((start, expressions[:offset]))
+        self._replace(slot)
+
+    def imap(self, expressions):
+        """Yield a Result for every expression, in input order."""
+        self.start()
+        source = iter(expressions)
+        queue = deque()       # tasks waiting for a worker
+        done = {}             # index -> Result, waiting to be yielded in order
+        next_index = 0        # next index to read from the source
+        next_out = 0          # next index to yield
+        exhausted = False
+        poll = None if self.timeout is None else min(self.timeout / 4, 0.25)
+
+        def refill():
+            nonlocal next_index, exhausted
+            while not exhausted and len(queue) < self.max_inflight:
+                size = self._chunk_size()
+                # Read at most max_inflight chunks ahead of the output, so a slow
+                # item at next_out cannot make done hold the rest of the input
+                if next_index - next_out >= self.max_inflight * size:
+                    break
+                chunk = []
+                for expression in source:
+                    chunk.append(expression)
+                    if len(chunk) >= size:
+                        break
+                if len(chunk) < size:
+                    exhausted = True
+                if chunk:
+                    queue.append((next_index, chunk))
+                    next_index += len(chunk)
+
+        try:
+            while True:
+                refill()
+                for worker in self._pool:
+                    if worker.task is None and queue:
+                        worker.task = queue.popleft()
+                        worker.conn.send(worker.task)
+                busy = [w for w in self._pool if w.task is not None]
+                if not busy:
+                    break
+                for conn in wait([w.conn for w in busy], poll):
+                    slot = next(i for i, w in enumerate(self._pool) if w.conn is conn)
+                    worker = self._pool[slot]
+                    try:
+                        start, results, elapsed = conn.recv()
+                    except (EOFError, OSError):
+                        self._abandon(slot, "worker process died", queue, done)
+                        continue
+                    worker.task = None
+                    self._record_timing(len(results), elapsed)
+                    for offset, result in enumerate(results):
+                        done[start + offset] = result
+                if self.timeout is not None:
+                    now = time.monotonic()
+                    for slot, worker in enumerate(self._pool):
+                        began = self._progress[2 * slot + 1]
+                        if worker.task is not None and began and now - began > self.timeout:
+                            self._abandon(slot, f"timed out after {self.timeout:g}s", queue, done)
+                while next_out in done:
+                    yield done.pop(next_out)
+                    next_out += 1
+            while next_out in done:
+                yield done.pop(next_out)
+                next_out += 1
+        except BaseException:
+            self.cancel()
+            raise
+
+
+def evaluate_parallel(expressions, workers=None, timeout=None, chunk_size=None, angle_unit='rad'):
+    """Evaluate expressions on a process pool, yielding Results in order."""
+    with ProcessPoolEvaluator(workers, timeout, chunk_size, angle_unit=angle_unit) as pool:
+        yield from pool.imap(expressions)
@@ -0,0 +1,116 @@
+"""Adaptive sampling of one-variable expressions for plotting.
+
+    xs, ys = sample(compile_vectorized('sin(x)/x'), -20, 20)
+    low, high = auto_range(xs, ys)
+    for run_x, run_y in segments(xs, ys, view_height=high - low):
+        ...  # draw one polyline per run
+
+sample starts from a uniform grid and then refines only where the curve
+bends: every segment whose midpoint is further than tolerance (a fraction of
+the y span) from the chord gets its midpoint kept, and its two halves become
+candidates for the next round. All midpoints of a round are evaluated in a
+single vectorized call, so a redraw costs a handful of NumPy passes however
+many points end up on screen. Segments with a non-finite end are refined as
+well, which pins down the edges of a domain (sqrt(x) near 0) and of poles
+(tan(x)).
+
+NumPy is required; fn is any callable mapping an array of x values to an
+array of y values, such as a VectorizedExpression.
+"""
+from .vectorized import _require_numpy, np
+
+POINTS = 512
+TOLERANCE = 0.002
+MAX_ROUNDS = 8
+MAX_POINTS = 16384
+
+
+def _evaluate(fn, xs, var):
+    ys = np.asarray(fn(**{var: xs}), dtype=float)
+    # Constant expressions come back as scalars
+    return np.broadcast_to(ys, xs.shape) if ys.shape != xs.shape else ys
+
+
+def _span(ys):
+    finite = ys[np.isfinite(ys)]
+    if finite.size == 0:
+        return 0.0
+    low, high = np.percentile(finite, (2, 98))
+    return float(high - low)
+
+
+def sample(fn, lo, hi, points=POINTS, var='x', tolerance=TOLERANCE,
+           max_rounds=MAX_ROUNDS, max_points=MAX_POINTS):
+    """Sample fn over [lo, hi], densest where the curve bends; returns (xs, ys)."""
+    _require_numpy()
+    xs = np.linspace(lo, hi, points)
+    ys = _evaluate(fn, xs, var)
+    # Relative to the bulk of the curve, so a pole does not flatten everything else
+    threshold = tolerance * (_span(ys) or 1.0)
+    candidates = np.arange(points - 1)  # segment i runs from xs[i] to xs[i + 1]
+    for _ in range(max_rounds):
+        room = max_points - xs.size
+        if candidates.size == 0 or room <= 0:
+            break
+        candidates = candidates[:room]
+        x0, x1 = xs[candidates], xs[candidates + 1]
+        y0, y1 = ys[candidates], ys[candidates + 1]
+        mid_x = (x0 + x1) / 2
+        mid_y = _evaluate(fn, mid_x, var)
+        finite = np.isfinite(y0) & np.isfinite(y1) & np.isfinite(mid_y)
+        with np.errstate(invalid='ignore'):
+            bent = np.abs(mid_y - (y0 + y1) / 2) > threshold
+        # Where exactly one of the three is non-finite a domain edge or pole lies inside
+        edge = ~finite & (np.isfinite(y0) | np.isfinite(y1) | np.isfinite(mid_y))
+        keep = np.flatnonzero((finite & bent) | edge)
+        if keep.size == 0:
+            break
+        # Insert the kept midpoints; each one splits its segment into two candidates
+        positions = candidates[keep] + 1
+        xs = np.insert(xs, positions, mid_x[keep])
+        ys = np.insert(ys, positions, mid_y[keep])
+        left = positions + np.arange(keep.size) - 1  # index of the left end after insertion
+        candidates = np.column_stack((left, left + 1)).ravel()
+    return xs, ys
+
+
+def segments(xs, ys, view_height=None, jump=1.0):
+    """Split a sampled curve into finite runs, breaking at poles.
+
+    Consecutive points are also split when y jumps by more than jump times
+    view_height against the direction of the curve on either side, which is
+    how a pole sampled on both sides (tan at pi/2) shows up; without that the
+    runs would be joined by a vertical line across the view.
+    """
+    _require_numpy()
+    finite = np.isfinite(ys)
+    breaks = ~(finite[:-1] & finite[1:])
+    if view_height and ys.size > 2:
+        with np.errstate(invalid='ignore'):
+            steps = np.diff(ys)
+            direction = np.sign(steps)
+            # A steep step against the direction of both neighbours: the curve ran off
+            # one edge of the view and came back from the other
+            before = np.concatenate(([0.0], direction[:-1]))
+            after = np.concatenate((direction[1:], [0.0]))
+            reversal = (direction != before) & (direction != after)
+            breaks |= (np.abs(steps) > jump * view_height) & reversal
+    # Between breaks a run is either all finite or a single non-finite point
+    pieces = np.flatnonzero(breaks) + 1
+    return [(run_x, run_y) for run_x, run_y in zip(np.split(xs, pieces), np.split(ys, pieces))
+            if np.isfinite(run_y[0])]
+
+
+def auto_range(xs, ys, margin=0.1):
+    """A y range covering the bulk of the curve, ignoring poles and non-finite values."""
+    _require_numpy()
+    # Refinement crowds points around poles; judge the curve on an even spread of x
+    even = np.searchsorted(xs, np.linspace(xs[0], xs[-1], POINTS)).clip(0, xs.size - 1)
+    finite = ys[even][np.isfinite(ys[even])]
+    if finite.size == 0:
+        return -1.0, 1.0
+    low, high = np.percentile(finite, (2, 98))
+    if high - low < 1e-12:
+        low, high = low - 1.0, high + 1.0
+    pad = (high - low) * margin
+    return float(low - pad), float(high + pad)
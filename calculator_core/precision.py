@@ -0,0 +1,271 @@
+"""Arbitrary-precision evaluation backed by fractions and decimal.
+
+Arithmetic is exact: literals become Fractions ('0.1' is exactly 1/10), and
++ - * / % and integer powers never round, so '1/3*3' is exactly 1. Only
+transcendental steps (pi, e, sin, ln, sqrt, non-integer powers, ...) are
+computed with Decimal at the requested number of digits plus guard digits,
+then carried on as Fractions.
+
+Constants and function values are cached per precision level, so repeated
+high-precision work (the same pi at 500 digits, the same sin(1)) is done once.
+
+    evaluate_precise("pi", digits=100)    # Decimal with 100 significant digits
+    evaluate_exact("1/3 + 1/6")           # Fraction(1, 2)
+"""
+import math
+from decimal import Decimal, localcontext
+from fractions import Fraction
+from functools import lru_cache
+
+from . import guards
+from .engine import Backend, ExpressionError, compile_ast, compile_expression
+
+DEFAULT_DIGITS = 50
+GUARD_DIGITS = 10
+
+
+# --- Constants, cached per precision ---
+
+def _arccot_fixed(x, unity):
+    # arccot(x) * unity using integer arithmetic (Machin-style series)
+    total = term = unity // x
+    x_squared = x * x
+    n = 3
+    sign = -1
+    while term:
+        term //= x_squared
+        total += sign * (term // n)
+        sign = -sign
+        n += 2
+    return total
+
+
+@lru_cache(maxsize=None)
+def pi(prec):
+    """pi as a Decimal with prec significant digits."""
+    unity = 10 ** (prec + 10)
+    value = 4 * (4 * _arccot_fixed(5, unity) - _arccot_fixed(239, unity))
+    with localcontext() as ctx:
+        ctx.prec = prec
+        return +(Decimal(value) / unity)
+
+
+@lru_cache(maxsize=None)
+def e(prec):
+    """e as a Decimal with prec significant digits."""
+    with localcontext() as ctx:
+        ctx.prec = prec
+        return Decimal(1).exp()
+
+
+# --- Decimal kernels (called inside a localcontext with the working precision) ---
+
+def _to_decimal(x):
+    return Decimal(x.numerator) / Decimal(x.denominator)
+
+
+def _sin_cos(x, prec):
+    # Reduce into [-pi, pi] so the Taylor series converges quickly; the subtraction cancels
+    # as many digits as x has before the point, so it runs with that many more
+    with localcontext() as ctx:
+        ctx.prec += len(str(int(abs(x))))
+        two_pi = 2 * pi(ctx.prec + 5)
+        x = x - two_pi * (x / two_pi).to_integral_value()
+    x = +x
+    x_squared = x * x
+    sin_sum, cos_sum = x, Decimal(1)
+    sin_term, cos_term = x, Decimal(1)
+    n = 1
+    while True:
+        sin_term = -sin_term * x_squared / ((2 * n) * (2 * n + 1))
+        cos_term = -cos_term * x_squared / ((2 * n - 1) * (2 * n))
+        if sin_sum + sin_term == sin_sum and cos_sum + cos_term == cos_sum:
+            return sin_sum, cos_sum
+        sin_sum += sin_term
+        cos_sum += cos_term
+        n += 1
+
+
+def _atan(x, prec):
+    if x < 0:
+        return -_atan(-x, prec)
+    # Halve the argument until it is small: atan(x) = 2 atan(x / (1 + sqrt(1 + x^2)))
+    doublings = 0
+    while x > Decimal('0.1'):
+        x = x / (1 + (1 + x * x).sqrt())
+        doublings += 1
+    x_squared = x * x
+    total = term = x
+    n = 1
+    while True:
+        term = -term * x_squared
+        step = term / (2 * n + 1)
+        if total + step == total:
+            return total * (2 ** doublings)
+        total += step
+        n += 1
+
+
+def _sin(x, prec):
+    return _sin_cos(x, prec)[0]
+
+
+def _cos(x, prec):
+    return _sin_cos(x, prec)[1]
+
+
+def _tan(x, prec):
+    sin, cos = _sin_cos(x, prec)
+    if cos == 0:
+        raise ValueError("math domain error")
+    return sin / cos
+
+
+def _asin(x, prec):
+    if abs(x) > 1:
+        raise ValueError("math domain error")
+    if abs(x) == 1:
+        return pi(prec) / 2 * (1 if x > 0 else -1)
+    return _atan(x / (1 - x * x).sqrt(), prec)
+
+
+def _acos(x, prec):
+    return pi(prec) / 2 - _asin(x, prec)
+
+
+def _ln(x, prec):
+    if x <= 0:
+        raise ValueError("math domain error")
+    return x.ln()
+
+
+def _log10(x, prec):
+    if x <= 0:
+        raise ValueError("math domain error")
+    return x.log10()
+
+
+def _sqrt(x, prec):
+    if x < 0:
+        raise ValueError("math domain error")
+    return x.sqrt()
+
+
+def _exp(x, prec):
+    return x.exp()
+
+
+_KERNELS = {
+    'sin': _sin, 'cos': _cos, 'tan': _tan,
+    'asin': _asin, 'acos': _acos, 'atan': _atan,
+    'log': _log10, 'ln': _ln, 'sqrt': _sqrt, 'exp': _exp,
+}
+
+
+@lru_cache(maxsize=4096)
+def function_value(name, x, prec):
+    """A function of a Fraction at prec working digits, as a Fraction (cached)."""
+    with localcontext() as ctx:
+        ctx.prec = prec
+        return Fraction(_KERNELS[name](_to_decimal(x), prec))
+
+
+# --- Exact operators ---
+
+def _integral(x):
+    return x.denominator == 1
+
+
+def _factorial(n):
+    if not _integral(n):
+        raise ValueError("factorial() only accepts integral values")
+    result = guards.factorial(int(n))
+    if isinstance(result, guards.LargeNumber):
+        raise guards.CostLimitError(f"{n}! is too large to compute exactly")
+    return Fraction(result)
+
+
+def _power(prec):
+    def power(base, exponent):
+        if _integral(exponent):
+            n = int(exponent)
+            if abs(n) > 1 and (base.numerator not in (0, 1, -1) or base.denominator != 1):
+                size = abs(n) * max(math.log10(abs(base.numerator) or 1), math.log10(base.denominator))
+                if size > guards.BUDGET.max_digits:
+                    raise guards.CostLimitError(f"exact power would have about {size:,.0f} digits")
+            return base ** n
+        if base < 0:
+            raise ValueError("negative base with fractional exponent")
+        if base == 0:
+            return Fraction(0)
+        with localcontext() as ctx:
+            ctx.prec = prec
+            return Fraction((_to_decimal(exponent) * _to_decimal(base).ln()).exp())
+    return power
+
+
+def _mod(a, b):
+    if b == 0:
+        raise ZeroDivisionError("modulo by zero")
+    return a % b
+
+
+def _divide(a, b):
+    if b == 0:
+        raise ZeroDivisionError("division by zero")
+    return a / b
+
+
+@lru_cache(maxsize=64)
+def precise_backend(digits=DEFAULT_DIGITS):
+    """Backend working on Fractions, with transcendental steps at digits precision."""
+    prec = digits + GUARD_DIGITS
+    functions = {name: (lambda x, name=name: function_value(name, x, prec)) for name in _KERNELS}
+    return Backend(
+        f'precise-{digits}',
+        number=Fraction,
+        constants={'pi': Fraction(pi(prec)), 'e': Fraction(e(prec))},
+        functions=functions,
+        operators={
+            '+': lambda a, b: a + b, '-': lambda a, b: a - b, '*': lambda a, b: a * b,
+            '/': _divide, '%': _mod, '^': _power(prec),
+            'neg': lambda a: -a, 'fact': _factorial,
+        },
+    )
+
+
+@lru_cache(maxsize=1024)
+def _compile_precise(compiled, digits):
+    return compile_ast(compiled.tree, precise_backend(digits))
+
+
+def evaluate_exact(text, digits=DEFAULT_DIGITS, env=None, **variables):
+    """Evaluate to a Fraction; exact unless a transcendental step was needed."""
+    if variables:
+        env = dict(env or {}, **variables)
+    env = {name: Fraction(value) for name, value in (env or {}).items()}
+    try:
+        return _compile_precise(compile_expression(text), digits)(env)
+    except TypeError as exc:
+        raise ExpressionError(str(exc)) from None
+
+
+def to_decimal(value, digits=DEFAULT_DIGITS):
+    """Round a Fraction to a Decimal with the given significant digits."""
+    with localcontext() as ctx:
+        ctx.prec = digits
+        return _to_decimal(value)
+
+
+def evaluate_precise(text, digits=DEFAULT_DIGITS, env=None, **variables):
+    """Evaluate to a Decimal correct to about the requested significant digits."""
+    return to_decimal(evaluate_exact(text, digits, env, **variables), digits)
+
+
+def format_precise(value, digits=DEFAULT_DIGITS):
+    """Display form of a Fraction result: exact integers stay integers."""
+    if value.denominator == 1:
+        return guards.format_number(value.numerator)
+    with localcontext() as ctx:
+        ctx.prec = digits  # normalize() rounds to the context precision, 28 by default
+        return str(_to_decimal(value).normalize())
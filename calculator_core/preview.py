@@ -0,0 +1,125 @@
+"""Incremental evaluation for the live preview shown while typing.
+
+Each keystroke usually appends to the previous expression, so the evaluator
+keeps the previous token list (with source offsets) and only re-scans from
+the last token that could have changed. Values of subtrees are memoized by
+their AST tuple, so in 'sin(1)+cos(2)+3' the sin and cos calls are computed
+once, not on every keystroke that follows them.
+
+Incomplete input such as '2+' or 'sqrt(9' is previewed as far as it makes
+sense: missing ')' are closed and dangling operators are ignored.
+"""
+from . import guards
+from .engine import (Backend, backend_for, ExpressionError, LRUCache, _OP_TOKENS,
+                     _Parser, _TOKEN_RE, _name_token, _normalize_tokens, format_result)
+
+# Previews run on the GUI thread, so they get a much tighter budget than '='
+PREVIEW_BUDGET = guards.Budget(max_seconds=0.002)
+
+_DANGLING = {_OP_TOKENS[op] for op in ('+', '-', '*', '/', '%', '^', '(', ',')}
+_MISSING = object()
+
+
+def _preview_backend(angle_unit='rad'):
+    base = backend_for(angle_unit)
+    operators = dict(base.operators)
+    operators['fact'] = lambda n: guards.factorial(n, PREVIEW_BUDGET)
+    operators['^'] = lambda a, b: guards.power(a, b, PREVIEW_BUDGET)
+    return Backend('preview', base.number, base.constants, base.functions, operators)
+
+
+class IncrementalEvaluator:
+    """Evaluates successive versions of an expression, reusing earlier work."""
+
+    def __init__(self, backend=None, memo_size=2048, angle_unit='rad'):
+        self.backend = backend or _preview_backend(angle_unit)
+        self._text = ''
+        self._spans = []     # (start, end) of each token in self._text
+        self._tokens = []
+        self._values = LRUCache(memo_size)
+
+    def set_angle_unit(self, angle_unit):
+        """Switch trig functions between radians and degrees (drops memoized values)."""
+        self.backend = _preview_backend(angle_unit)
+        self._values.clear()
+
+    def _retokenize(self, text):
+        # Tokens entirely before the first changed character (and not touching
+        # it, since '12' + '3' merges into one number) are still valid, except
+        # for a number close enough to the change to absorb it (below).
+        common = 0
+        limit = min(len(text), len(self._text))
+        while common < limit and text[common] == self._text[common]:
+            common += 1
+        keep = 0
+        while keep < len(self._spans) and self._spans[keep][1] < common:
+            keep += 1
+        # A number can also grow across the tokens after it: '1' 'e' becomes '1e5'
+        # once '5' is typed, and '0' 'x' becomes '0xf'. Re-scan from such a number.
+        for back in (1, 2):
+            if keep >= back and self._tokens[keep - back][0] == 'num':
+                keep -= back
+                break
+        spans, tokens = self._spans[:keep], self._tokens[:keep]
+        start = spans[-1][1] if spans else 0
+        for match in _TOKEN_RE.finditer(text, start):
+            kind = match.lastgroup
+            if kind == 'space':
+                continue
+            if kind == 'bad':
+                raise ExpressionError(f"Unexpected character {match.group()!r}")
+            value = match.group()
+            if kind == 'op':
+                token = _OP_TOKENS[value]
+            elif kind == 'name':
+                token = _name_token(value)
+            elif kind == 'based':
+                token = ('num', str(int(value, 0)))
+            else:
+                token = ('num', value)
+            spans.append(match.span())
+            tokens.append(token)
+        self._text, self._spans, self._tokens = text, spans, tokens
+
+    def _evaluate(self, node):
+        value = self._values.get(node, _MISSING)
+        if value is not _MISSING:
+            return value
+        kind = node[0]
+        backend = self.backend
+        if kind == 'num':
+            value = backend.number(node[1])
+        elif kind == 'name':
+            if node[1] not in backend.constants:
+                raise ExpressionError(f"Unknown variable {node[1]!r}")
+            value = backend.constants[node[1]]
+        elif kind in ('neg', 'fact'):
+            value = backend.operators[kind](self._evaluate(node[1]))
+        elif kind == 'bin':
+            value = backend.operators[node[1]](self._evaluate(node[2]), self._evaluate(node[3]))
+        else:
+            try:
+                fn = backend.functions[node[1]]
+            except KeyError:
+                raise ExpressionError(f"Unknown function {node[1]!r}") from None
+            value = fn(*[self._evaluate(arg) for arg in node[2]])
+        self._values[node] = value
+        return value
+
+    def update(self, text):
+        """Preview text for the given expression, or None if there is nothing to show."""
+        try:
+            self._retokenize(text)
+        except ExpressionError:
+            self._text, self._spans, self._tokens = '', [], []
+            return None
+        tokens = list(self._tokens)
+        while tokens and tokens[-1] in _DANGLING:
+            tokens.pop()
+        if not tokens:
+            return None
+        try:
+            tree = _Parser(_normalize_tokens(tokens)[1]).parse()
+            return format_result(self._evaluate(tree))
+        except Exception:
+            return None
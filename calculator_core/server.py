@@ -0,0 +1,445 @@
+"""Local HTTP/JSON evaluation service.
+
+    python -m calculator_core.server --port 8765 [--workers N]
+
+    POST /evaluate  {"expression": "2^10"}                  -> {"expression": ..., "value": "1024", "error": null}
+    POST /evaluate  {"expressions": ["1+2", "1/0"], "angle_unit": "deg"}
+                                                            -> {"results": [{...}, {...}]}
+    GET  /metrics   Prometheus text: latency histogram and counters (plus the
+                    calculator_core.metrics instrumentation with --instrument)
+    GET  /health    {"status": "ok"}
+
+The server is a single asyncio protocol speaking HTTP/1.1 with keep-alive and
+pipelining. Expressions from all connections are queued and evaluated in
+micro-batches: the first request queued schedules a flush with call_soon, so
+every request parsed in the same event-loop iteration shares one pass. At low
+load a batch is a single request and adds no delay; under load batches grow
+by themselves, up to max_batch.
+
+Evaluation in the loop runs under a tight cost budget with approximation off.
+Items that would exceed it (big factorials and powers) raise CostLimitError
+and are sent, one chunk per batch, to a process pool that evaluates them with
+the normal budget, so the event loop never waits on big-int work. As in the
+batch path, an item the engine rejects is retried with units and conversions
+('3 km + 200 m', '255 to hex'), under the same inline budget.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import guards, metrics, units
+from .batch import evaluate_one
+from .engine import (Backend, ExpressionError, LRUCache, backend_for, compile_ast,
+                     compile_expression, format_result)
+from .metrics import Histogram
+
+# Anything the loop evaluates itself must finish in about this long
+INLINE_BUDGET = guards.Budget(max_seconds=0.0005, approximate=False)
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            411: 'Length Required', 413: 'Payload Too Large',
+            431: 'Request Header Fields Too Large'}
+
+
+class Stats:
+    """Everything /metrics reports."""
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.batch_size = Histogram((1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024))
+        self.requests = 0
+        self.expressions = 0
+        self.offloaded = 0
+        self.connections = 0
+
+    def exposition(self):
+        lines = []
+        for name, histogram in (('calculator_request_seconds', self.latency),
+                                ('calculator_batch_expressions', self.batch_size)):
+            lines.append(f"# TYPE {name} histogram")
+            lines += histogram.exposition(name)
+        for name, value in (('requests_total', self.requests),
+                            ('expressions_total', self.expressions),
+                            ('offloaded_total', self.offloaded)):
+            lines += [f"# TYPE calculator_{name} counter", f"calculator_{name} {value}"]
+        lines += ["# TYPE calculator_open_connections gauge",
+                  f"calculator_open_connections {self.connections}"]
+        text = '\n'.join(lines) + '\n'
+        if metrics.enabled:
+            text += metrics.exposition()
+        return text
+
+
+def _item(expression, value=None, error=None):
+    return {'expression': expression, 'value': value, 'error': error}
+
+
+def _evaluate_chunk(expressions, angle_unit):
+    """Worker-side evaluation of the items that were too expensive for the loop."""
+    items = []
+    for expression in expressions:
+        result = evaluate_one(expression, angle_unit)
+        if result.error is not None:
+            items.append(_item(expression, error=result.error))
+        else:
+            items.append(_item(expression, format_result(result.value)))
+    return items
+
+
+def _inline_backend(angle_unit):
+    base = backend_for(angle_unit)
+    operators = dict(base.operators)
+    operators['fact'] = lambda n: guards.factorial(n, INLINE_BUDGET)
+    operators['^'] = lambda a, b: guards.power(a, b, INLINE_BUDGET)
+    return Backend('server', base.number, base.constants, base.functions, operators)
+
+
+class _Pending:
+    __slots__ = ('expressions', 'angle_unit', 'future', 'items', 'waiting')
+
+    def __init__(self, expressions, angle_unit, future):
+        self.expressions = expressions
+        self.angle_unit = angle_unit
+        self.future = future
+        self.items = [None] * len(expressions)
+        self.waiting = 0  # items still out on the process pool
+
+
+class MicroBatcher:
+    """Collects expressions from concurrent requests and evaluates them together."""
+
+    def __init__(self, loop, pool, stats, max_batch=1024, cache_size=4096):
+        self.loop = loop
+        self.pool = pool
+        self.stats = stats
+        self.max_batch = max_batch
+        self._backends = {}
+        self._unit_backends = {}
+        self._compiled = LRUCache(cache_size)  # (text, angle unit) -> closure
+        self._queue = []
+        self._queued = 0
+        self._scheduled = False
+
+    def submit(self, expressions, angle_unit='rad'):
+        """Queue expressions; the returned future resolves to their result items."""
+        future = self.loop.create_future()
+        self._queue.append(_Pending(expressions, angle_unit, future))
+        self._queued += len(expressions)
+        if self._queued >= self.max_batch:
+            self.flush()
+        elif not self._scheduled:
+            self._scheduled = True
+            self.loop.call_soon(self.flush)
+        return future
+
+    def _compile(self, text, angle_unit):
+        key = (text, angle_unit)
+        fn = self._compiled.get(key)
+        if fn is None:
+            backend = self._backends.get(angle_unit)
+            if backend is None:
+                backend = self._backends[angle_unit] = _inline_backend(angle_unit)
+            fn = self._compiled[key] = compile_ast(compile_expression(text).tree, backend)
+        return fn
+
+    def _evaluate_units(self, text, angle_unit):
+        backend = self._unit_backends.get(angle_unit)
+        if backend is None:
+            backend = self._unit_backends[angle_unit] = units.with_units(_inline_backend(angle_unit))
+        return units.evaluate(text, None, angle_unit, backend)
+
+    def _evaluate(self, text, angle_unit):
+        # units.evaluate_with_units, but both attempts under the inline budget
+        try:
+            return self._compile(text, angle_unit)(None)
+        except ExpressionError as error:
+            try:
+                return self._evaluate_units(text, angle_unit)
+            except ExpressionError:
+                raise error from None
+
+    def flush(self):
+        self._scheduled = False
+        queue, self._queue = self._queue, []
+        if not queue:
+            return
+        self.stats.batch_size.observe(self._queued)
+        self._queued = 0
+        started = time.perf_counter() if metrics.enabled else None
+        heavy = {}  # angle unit -> [(pending, index)]
+        for pending in queue:
+            items = pending.items
+            for index, text in enumerate(pending.expressions):
+                try:
+                    value = self._evaluate(text, pending.angle_unit)
+                    items[index] = _item(text, format_result(value))
+                except guards.CostLimitError:
+                    if self.pool is None:
+                        items[index] = _evaluate_chunk([text], pending.angle_unit)[0]
+                        continue
+                    heavy.setdefault(pending.angle_unit, []).append((pending, index))
+                    pending.waiting += 1
+                except Exception as exc:  # same rule as the batch path: failures are results
+                    items[index] = _item(text, error=str(exc) or type(exc).__name__)
+            if not pending.waiting:
+                pending.future.set_result(items)
+        if started is not None:
+            metrics.observe('batch', time.perf_counter() - started)
+        for angle_unit, slots in heavy.items():
+            self.stats.offloaded += len(slots)
+            texts = [pending.expressions[index] for pending, index in slots]
+            try:
+                chunk = self.loop.run_in_executor(self.pool, _evaluate_chunk, texts, angle_unit)
+            except RuntimeError as exc:  # the pool has been shut down
+                chunk = self.loop.create_future()
+                chunk.set_exception(exc)
+            chunk.add_done_callback(lambda done, slots=slots: self._offloaded(done, slots))
+
+    def _offloaded(self, done, slots):
+        try:
+            items = done.result()
+        except (Exception, asyncio.CancelledError) as exc:
+            # The worker died, or the pool shut down under the chunk: report it
+            # per item rather than leave the requests hanging
+            error = str(exc) or type(exc).__name__
+            items = [_item(p.expressions[i], error=error) for p, i in slots]
+        for (pending, index), item in zip(slots, items):
+            pending.items[index] = item
+            pending.waiting -= 1
+            if not pending.waiting and not pending.future.done():
+                pending.future.set_result(pending.items)
+
+
+def _response(status, body, content_type='application/json', close=False):
+    head = (f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n")
+    if close:
+        head += "Connection: close\r\n"
+    return head.encode('latin-1') + b"\r\n" + body
+
+
+def _json(status, payload, close=False):
+    return _response(status, json.dumps(payload).encode(), close=close)
+
+
+class HTTPProtocol(asyncio.Protocol):
+    """One client connection. Pipelined requests are answered in arrival order."""
+
+    def __init__(self, service):
+        self.service = service
+        self.transport = None
+        self._buffer = bytearray()
+        self._responses = []  # [started, bytes or future, close], oldest first
+        self._closing = False
+        self._idle = None
+        self._in_flight = 0  # requests still being evaluated; the idle timer waits for them
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.service.stats.connections += 1
+        self._touch()
+
+    def connection_lost(self, exc):
+        self.service.stats.connections -= 1
+        if self._idle is not None:
+            self._idle.cancel()
+
+    def _touch(self):
+        # Restart the idle timer, or leave it off while a request is in flight
+        if self._idle is not None:
+            self._idle.cancel()
+            self._idle = None
+        if not self._in_flight and not self.transport.is_closing():
+            self._idle = self.service.loop.call_later(self.service.idle_timeout, self.transport.close)
+
+    def data_received(self, data):
+        self._buffer += data
+        while not self._closing:
+            end = self._buffer.find(b"\r\n\r\n")
+            if end < 0:
+                if len(self._buffer) > MAX_HEADER_BYTES:
+                    self._queue(time.perf_counter(), _json(431, {'error': "headers too large"}, True), True)
+                break
+            try:
+                request_line, *header_lines = self._buffer[:end].decode('latin-1').split("\r\n")
+                method, path, version = request_line.split(' ')
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = headers.get('content-length')
+                if length is not None:
+                    length = int(length)
+                    if length < 0:
+                        raise ValueError(length)
+            except ValueError:
+                self._queue(time.perf_counter(), _json(400, {'error': "malformed request"}, True), True)
+                break
+            if length is None:
+                if method == 'POST':  # bodies must be sized; chunked encoding is not supported
+                    self._queue(time.perf_counter(), _json(411, {'error': "Content-Length required"}, True), True)
+                    break
+                length = 0
+            if length > MAX_BODY_BYTES:
+                self._queue(time.perf_counter(), _json(413, {'error': "body too large"}, True), True)
+                break
+            if len(self._buffer) < end + 4 + length:
+                break  # wait for the rest of the body
+            body = bytes(self._buffer[end + 4:end + 4 + length])
+            del self._buffer[:end + 4 + length]
+            connection = headers.get('connection', '').lower()
+            close = connection == 'close' or (version == 'HTTP/1.0' and connection != 'keep-alive')
+            started = time.perf_counter()
+            self._queue(started, self.service.handle(method, path, body, close), close)
+        self._touch()  # after queueing, so requests still being evaluated hold it off
+
+    def _queue(self, started, response, close):
+        self.service.stats.requests += 1
+        self._closing = self._closing or close
+        entry = [started, response, close]
+        self._responses.append(entry)
+        if isinstance(response, asyncio.Future):
+            self._in_flight += 1
+            response.add_done_callback(self._finished)
+        else:
+            self._drain()
+
+    def _finished(self, response):
+        self._in_flight -= 1
+        self._drain()
+        if not self._in_flight:
+            self._touch()
+
+    def _drain(self):
+        responses = self._responses
+        sent = 0
+        for started, response, close in responses:
+            if isinstance(response, asyncio.Future):
+                if not response.done():
+                    break
+                response = response.result()
+            if self.transport.is_closing():
+                break
+            self.transport.write(response)
+            self.service.stats.latency.observe(time.perf_counter() - started)
+            sent += 1
+            if close:
+                self.transport.close()
+                break
+        del responses[:sent]
+
+
+class CalculatorService:
+    """Request routing shared by all connections."""
+
+    def __init__(self, loop, workers=None, max_batch=1024, idle_timeout=30.0):
+        self.loop = loop
+        self.stats = Stats()
+        self.idle_timeout = idle_timeout
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(workers) if workers > 0 else None
+        self.batcher = MicroBatcher(loop, self.pool, self.stats, max_batch)
+
+    def handle(self, method, path, body, close):
+        """Return the response bytes, or a future that resolves to them."""
+        if path == '/evaluate':
+            if method != 'POST':
+                return _json(405, {'error': "use POST"}, close)
+            return self._evaluate(body, close)
+        if path == '/metrics' and method == 'GET':
+            return _response(200, self.stats.exposition().encode(),
+                             'text/plain; version=0.0.4', close)
+        if path == '/health' and method == 'GET':
+            return _json(200, {'status': 'ok'}, close)
+        return _json(404, {'error': f"no route for {method} {path}"}, close)
+
+    def _evaluate(self, body, close):
+        try:
+            request = json.loads(body)
+            angle_unit = request.get('angle_unit', 'rad')
+            backend_for(angle_unit)
+            if 'expressions' in request:
+                expressions, single = request['expressions'], False
+            else:
+                expressions, single = [request['expression']], True
+            if not isinstance(expressions, list) or not all(isinstance(e, str) for e in expressions):
+                raise ValueError("expressions must be strings")
+        except (ValueError, KeyError, TypeError, AttributeError) as exc:
+            return _json(400, {'error': f"bad request: {exc}"}, close)
+        self.stats.expressions += len(expressions)
+        if not expressions:
+            return _json(200, {'results': []}, close)
+        items = self.batcher.submit(expressions, angle_unit)
+        response = self.loop.create_future()
+
+        def respond(done):
+            payload = done.result()
+            response.set_result(_json(200, payload[0] if single else {'results': payload}, close))
+
+        items.add_done_callback(respond)
+        return response
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def serve(host='127.0.0.1', port=8765, workers=None, max_batch=1024, ready=None):
+    """Run the service until cancelled. ready, if given, is set once listening."""
+    loop = asyncio.get_running_loop()
+    service = CalculatorService(loop, workers, max_batch)
+    server = await loop.create_server(lambda: HTTPProtocol(service), host, port,
+                                      reuse_address=True, backlog=1024)
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='calculator_core.server',
+                                     description="Serve expression evaluation over HTTP/JSON.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="processes for expensive items (0 = evaluate everything in the loop,"
+                             " default: one per core)")
+    parser.add_argument('--max-batch', type=int, default=1024,
+                        help="flush a micro-batch once it holds this many expressions")
+    parser.add_argument('--instrument', action='store_true',
+                        help="add per-stage timings, usage counters and cache hit rates to /metrics")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.instrument:
+        metrics.enable()
+    try:
+        import uvloop  # optional, roughly doubles throughput
+    except ImportError:
+        pass
+    else:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    print(f"Serving on http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_batch))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Streaming input and output for large expression files.
+
+Input is read in binary chunks (read1, so pipes and terminals hand over
+whatever is available without waiting for a full chunk) and split into lines
+lazily; only the current chunk and one partial line are held at a time, so
+memory stays flat however large the file is. Results are written as they are
+produced in one of three formats:
+
+    text   the value, or 'Error: <message>' (blank lines preserved)
+    csv    line,expression,value,error
+    jsonl  {"line": 3, "expression": "1/0", "value": null, "error": "division by zero"}
+
+In csv and jsonl every record carries its 1-based input line number, so
+blank input lines are skipped rather than echoed.
+"""
+import csv
+import json
+
+from .batch import render
+from .engine import format_result
+
+CHUNK_SIZE = 1 << 20
+FORMATS = ('text', 'csv', 'jsonl')
+
+
+def read_lines(source, chunk_size=CHUNK_SIZE):
+    """Yield decoded lines (without line endings) from a binary file object."""
+    read = getattr(source, 'read1', source.read)
+    tail = b''
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        lines = chunk.split(b'\n')
+        lines[0] = tail + lines[0]
+        tail = lines.pop()
+        for line in lines:
+            yield line.decode('utf-8', 'replace').rstrip('\r')
+    if tail:
+        yield tail.decode('utf-8', 'replace').rstrip('\r')
+
+
+class TextWriter:
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, line_number, result):
+        self.out.write((render(result) if result.expression else '') + '\n')
+
+
+class CSVWriter:
+    def __init__(self, out):
+        self.out = out
+        self._writer = csv.writer(out, lineterminator='\n')
+        self._writer.writerow(('line', 'expression', 'value', 'error'))
+
+    def write(self, line_number, result):
+        if result.expression:
+            value = '' if result.error is not None else format_result(result.value)
+            self._writer.writerow((line_number, result.expression, value, result.error or ''))
+
+
+class JSONLWriter:
+    def __init__(self, out):
+        self.out = out
+        self._encode = json.JSONEncoder(ensure_ascii=False).encode
+
+    def write(self, line_number, result):
+        if result.expression:
+            value = None if result.error is not None else format_result(result.value)
+            self.out.write(self._encode({'line': line_number, 'expression': result.expression,
+                                         'value': value, 'error': result.error}) + '\n')
+
+
+WRITERS = {'text': TextWriter, 'csv': CSVWriter, 'jsonl': JSONLWriter}
+
+
+def writer_for(fmt, out):
+    try:
+        return WRITERS[fmt](out)
+    except KeyError:
+        raise ValueError(f"Unknown output format {fmt!r}; expected one of {', '.join(FORMATS)}") from None
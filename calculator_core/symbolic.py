@@ -0,0 +1,215 @@
+"""Symbolic differentiation of engine ASTs.
+
+    derivative('x^2*sin(x)')             # '2*x*sin(x)+x^2*cos(x)'
+    differentiate(parse('ln(x)'), 'x')   # ('bin', '/', ('num', '1'), ('name', 'x'))
+
+The result is another AST in the engine's tuple form, so it compiles (and
+vectorizes) like any typed expression. Rules are the textbook ones; the node
+constructors below drop multiplications by 0 and 1, additions of 0 and fold
+integer arithmetic, which keeps derivatives readable without a general
+simplifier. In degree mode trig functions take degrees and the inverse
+functions return them, so their derivatives carry a factor of pi/180 or
+180/pi.
+
+'%' and '!' have no derivative here (they are not differentiable as
+functions of a real x) and raise ExpressionError.
+"""
+from .engine import ExpressionError, compile_expression, free_variables, unparse
+
+ZERO = ('num', '0')
+ONE = ('num', '1')
+TWO = ('num', '2')
+PI = ('name', 'pi')
+
+
+def _int_value(node):
+    """The value of an integer literal (possibly negated), else None."""
+    if node[0] == 'num' and node[1].isdigit():
+        return int(node[1])
+    if node[0] == 'neg':
+        value = _int_value(node[1])
+        return None if value is None else -value
+    return None
+
+
+def _const(value):
+    return ('neg', ('num', str(-value))) if value < 0 else ('num', str(value))
+
+
+def _add(a, b):
+    if a == ZERO:
+        return b
+    if b == ZERO:
+        return a
+    x, y = _int_value(a), _int_value(b)
+    if x is not None and y is not None:
+        return _const(x + y)
+    if b[0] == 'neg':
+        return ('bin', '-', a, b[1])
+    return ('bin', '+', a, b)
+
+
+def _sub(a, b):
+    if b == ZERO:
+        return a
+    if a == ZERO:
+        return _neg(b)
+    x, y = _int_value(a), _int_value(b)
+    if x is not None and y is not None:
+        return _const(x - y)
+    if b[0] == 'neg':
+        return ('bin', '+', a, b[1])
+    return ('bin', '-', a, b)
+
+
+def _neg(a):
+    if a == ZERO:
+        return a
+    if a[0] == 'neg':
+        return a[1]
+    return ('neg', a)
+
+
+def _mul(a, b):
+    if a == ZERO or b == ZERO:
+        return ZERO
+    if a == ONE:
+        return b
+    if b == ONE:
+        return a
+    x, y = _int_value(a), _int_value(b)
+    if x is not None and y is not None:
+        return _const(x * y)
+    # Signs move outwards and constants to the front: -(2*x), not x*-2
+    if a[0] == 'neg':
+        return _neg(_mul(a[1], b))
+    if b[0] == 'neg':
+        return _neg(_mul(a, b[1]))
+    # u * (1/w) reads better as u/w
+    if a[0] == 'bin' and a[1] == '/' and a[2] == ONE:
+        return _div(b, a[3])
+    if b[0] == 'bin' and b[1] == '/' and b[2] == ONE:
+        return _div(a, b[3])
+    if b[0] == 'num' and a[0] != 'num':
+        a, b = b, a
+    return ('bin', '*', a, b)
+
+
+def _div(a, b):
+    if a == ZERO:
+        return ZERO
+    if b == ONE:
+        return a
+    if a[0] == 'neg':
+        return _neg(_div(a[1], b))
+    return ('bin', '/', a, b)
+
+
+def _pow(a, b):
+    if b == ZERO:
+        return ONE
+    if b == ONE:
+        return a
+    return ('bin', '^', a, b)
+
+
+def _call(name, arg):
+    return ('call', name, (arg,))
+
+
+# f'(u) for a built-in function f, as an AST in u (radian semantics)
+_CHAIN_RULES = {
+    'sin': lambda u: _call('cos', u),
+    'cos': lambda u: _neg(_call('sin', u)),
+    'tan': lambda u: _div(ONE, _pow(_call('cos', u), TWO)),
+    'asin': lambda u: _div(ONE, _call('sqrt', _sub(ONE, _pow(u, TWO)))),
+    'acos': lambda u: _neg(_div(ONE, _call('sqrt', _sub(ONE, _pow(u, TWO))))),
+    'atan': lambda u: _div(ONE, _add(ONE, _pow(u, TWO))),
+    'log': lambda u: _div(ONE, _mul(u, _call('ln', ('num', '10')))),
+    'ln': lambda u: _div(ONE, u),
+    'sqrt': lambda u: _div(ONE, _mul(TWO, _call('sqrt', u))),
+    'exp': lambda u: _call('exp', u),
+}
+
+_FORWARD_TRIG = frozenset(('sin', 'cos', 'tan'))
+_INVERSE_TRIG = frozenset(('asin', 'acos', 'atan'))
+
+
+class _Differentiator:
+    def __init__(self, var, angle_unit):
+        if angle_unit not in ('rad', 'deg'):
+            raise ValueError(f"Unknown angle unit {angle_unit!r}; expected 'rad' or 'deg'")
+        self.var = var
+        self.degrees = angle_unit == 'deg'
+
+    def __call__(self, node):
+        kind = node[0]
+        if kind == 'name':
+            return ONE if node[1] == self.var else ZERO
+        if self.var not in free_variables(node):
+            return ZERO
+        if kind == 'neg':
+            return _neg(self(node[1]))
+        if kind == 'bin':
+            return self._binary(*node[1:])
+        if kind == 'call':
+            return self._call(node[1], node[2])
+        raise ExpressionError(f"Cannot differentiate {unparse(node)!r}: '!' has no derivative")
+
+    def _binary(self, op, u, v):
+        du, dv = self(u), self(v)
+        if op == '+':
+            return _add(du, dv)
+        if op == '-':
+            return _sub(du, dv)
+        if op == '*':
+            return _add(_mul(du, v), _mul(u, dv))
+        if op == '/':
+            if dv == ZERO:
+                return _div(du, v)
+            return _div(_sub(_mul(du, v), _mul(u, dv)), _pow(v, TWO))
+        if op == '^':
+            return self._power(u, v, du, dv)
+        raise ExpressionError(f"Cannot differentiate {unparse(('bin', op, u, v))!r}: '%' has no derivative")
+
+    def _power(self, u, v, du, dv):
+        if dv == ZERO:
+            # d(u^n) = n*u^(n-1)*u'
+            exponent = _int_value(v)
+            if exponent is not None:
+                lowered = _const(exponent - 1)
+            elif v[0] == 'num':
+                lowered = ('num', repr(float(v[1]) - 1))
+            else:
+                lowered = _sub(v, ONE)
+            return _mul(_mul(v, _pow(u, lowered)), du)
+        log_u = ONE if u == ('name', 'e') else _call('ln', u)
+        if du == ZERO:
+            # d(a^v) = a^v*ln(a)*v'
+            return _mul(_mul(('bin', '^', u, v), log_u), dv)
+        # d(u^v) = u^v*(v'*ln(u) + v*u'/u)
+        return _mul(('bin', '^', u, v), _add(_mul(dv, log_u), _div(_mul(v, du), u)))
+
+    def _call(self, name, args):
+        rule = _CHAIN_RULES.get(name)
+        if rule is None or len(args) != 1:
+            raise ExpressionError(f"Cannot differentiate the function {name!r}")
+        u = args[0]
+        outer = rule(u)
+        if self.degrees and name in _FORWARD_TRIG:
+            # The argument is in degrees: sin(u deg) = sin(u*pi/180)
+            outer = _mul(_div(PI, ('num', '180')), outer)
+        elif self.degrees and name in _INVERSE_TRIG:
+            # The result is converted to degrees
+            outer = _mul(_div(('num', '180'), PI), outer)
+        return _mul(outer, self(u))
+
+
+def differentiate(tree, var='x', angle_unit='rad'):
+    """The derivative of an AST with respect to var, as an AST."""
+    return _Differentiator(var, angle_unit)(tree)
+
+
+def derivative(text, var='x', angle_unit='rad'):
+    """The derivative of an expression with respect to var, as expression text."""
+    return unparse(differentiate(compile_expression(text).tree, var, angle_unit))
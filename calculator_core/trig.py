@@ -0,0 +1,122 @@
+"""Angle-unit aware trigonometric kernels.
+
+Radian-mode trig binds math.sin and friends directly: a C call is already
+cheaper than any cache lookup. Degree-mode kernels reduce the argument
+exactly in degrees (x mod 360 is exact for ints and, via fmod, for floats)
+before converting to radians, so table angles come out exact: sin(30) is 0.5,
+cos(90) is 0 and tan(45) is 1, where sin(radians(30)) would be
+0.49999999999999994. Degree results are memoized in bounded per-function
+LRU caches, since users evaluate the same table angles over and over.
+"""
+import math
+from functools import lru_cache
+
+CACHE_SIZE = 4096
+
+_HALF_SQRT2 = math.sqrt(2) / 2
+_HALF_SQRT3 = math.sqrt(3) / 2
+
+# sin and cos at the multiples of 30 and 45 degrees inside one turn
+_SIN_EXACT = {
+    0: 0.0, 30: 0.5, 45: _HALF_SQRT2, 60: _HALF_SQRT3, 90: 1.0,
+    120: _HALF_SQRT3, 135: _HALF_SQRT2, 150: 0.5, 180: 0.0,
+    210: -0.5, 225: -_HALF_SQRT2, 240: -_HALF_SQRT3, 270: -1.0,
+    300: -_HALF_SQRT3, 315: -_HALF_SQRT2, 330: -0.5,
+}
+_TAN_EXACT = {0: 0.0, 45: 1.0, 135: -1.0, 180: 0.0, 225: 1.0, 315: -1.0}
+_TAN_UNDEFINED = {90, 270}
+
+_ASIN_EXACT = {0.0: 0.0, 0.5: 30.0, _HALF_SQRT2: 45.0, _HALF_SQRT3: 60.0, 1.0: 90.0}
+_ACOS_EXACT = {1.0: 0.0, _HALF_SQRT3: 30.0, _HALF_SQRT2: 45.0, 0.5: 60.0, 0.0: 90.0,
+               -0.5: 120.0, -_HALF_SQRT2: 135.0, -_HALF_SQRT3: 150.0, -1.0: 180.0}
+_ATAN_EXACT = {0.0: 0.0, 1 / math.sqrt(3): 30.0, 1.0: 45.0, math.sqrt(3): 60.0}
+
+
+def reduce_degrees(x):
+    """x mod 360 in [0, 360), computed without rounding error."""
+    if isinstance(x, int):
+        return x % 360
+    r = math.fmod(x, 360.0)
+    return r + 360.0 if r < 0 else r
+
+
+def _quadrant(r):
+    # r = 90 * q + t with |t| <= 45; both steps are exact for r in [0, 360)
+    q = int(round(r / 90.0))
+    return q % 4, math.radians(r - 90 * q)
+
+
+def _sin_reduced(r):
+    exact = _SIN_EXACT.get(r)
+    if exact is not None:
+        return exact
+    q, t = _quadrant(r)
+    return (math.sin(t), math.cos(t), -math.sin(t), -math.cos(t))[q]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def sin_deg(x):
+    return _sin_reduced(reduce_degrees(x))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def cos_deg(x):
+    r = reduce_degrees(x)
+    exact = _SIN_EXACT.get((r + 90) % 360)
+    if exact is not None:
+        return exact
+    q, t = _quadrant(r)
+    return (math.cos(t), -math.sin(t), -math.cos(t), math.sin(t))[q]
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def tan_deg(x):
+    r = reduce_degrees(x)
+    if r in _TAN_UNDEFINED:
+        raise ValueError("math domain error")
+    exact = _TAN_EXACT.get(r)
+    if exact is not None:
+        return exact
+    return sin_deg(r) / cos_deg(r)
+
+
+def _odd(table, fn):
+    def kernel(x):
+        exact = table.get(abs(x))
+        if exact is not None:
+            return exact if x >= 0 else -exact
+        return math.degrees(fn(x))
+    return kernel
+
+
+asin_deg = lru_cache(maxsize=CACHE_SIZE)(_odd(_ASIN_EXACT, math.asin))
+atan_deg = lru_cache(maxsize=CACHE_SIZE)(_odd(_ATAN_EXACT, math.atan))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def acos_deg(x):
+    exact = _ACOS_EXACT.get(x)
+    if exact is not None:
+        return exact
+    return math.degrees(math.acos(x))
+
+
+RADIAN_FUNCTIONS = {
+    'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
+    'asin': math.asin, 'acos': math.acos, 'atan': math.atan,
+}
+DEGREE_FUNCTIONS = {
+    'sin': sin_deg, 'cos': cos_deg, 'tan': tan_deg,
+    'asin': asin_deg, 'acos': acos_deg, 'atan': atan_deg,
+}
+FUNCTIONS = {'rad': RADIAN_FUNCTIONS, 'deg': DEGREE_FUNCTIONS}
+
+
+def cache_info():
+    """Hit/miss statistics of the degree-mode caches, by function name."""
+    return {name: fn.cache_info() for name, fn in DEGREE_FUNCTIONS.items()}
+
+
+def cache_clear():
+    for fn in DEGREE_FUNCTIONS.values():
+        fn.cache_clear()
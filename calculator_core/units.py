@@ -0,0 +1,374 @@
+"""Unit-aware evaluation and base conversion.
+
+    evaluate("3 km + 200 m")              # Quantity: 3200 m
+    evaluate("5 kg * 9.8 m/s^2")          # Quantity: 49.0 N
+    evaluate("60 mph to km/h")            # Quantity: 96.56064 km/h
+    evaluate("255 to hex")                # BasedInt: 0xff
+    evaluate("0b1010 + 0o17")             # 25 (base literals are tokenized as ints)
+
+Units are names bound as constants of a units backend, so '3 km' is the
+product 3*km to the parser and folds to a single Quantity at compile time.
+A Quantity is a magnitude in SI base units plus a dimension vector: the
+exponents of (m, kg, s, A, K, mol, cd). Multiplying adds vectors, dividing
+subtracts them, powers scale them; + - % and comparisons need equal vectors
+and raise DimensionError otherwise, as do functions other than sqrt applied
+to a dimensioned argument. Dimensionless results come back as plain numbers.
+
+UNITS is the resolution table: every unit, and every SI prefix applied to the
+units that take one ('km', 'ms', 'kWh', 'uF'; 'u' stands for micro), is
+expanded into it once at import, so a name costs one dict lookup. DISPLAY
+maps a dimension vector to the name results are shown in when no target is
+given (N rather than kg*m/s^2).
+
+'<expression> to <unit>' converts into any unit expression of the same
+dimension; 'to hex', 'to bin', 'to oct' and 'to dec' convert an integral
+result (of any size) to that base. Only multiplicative units are supported:
+temperatures are kelvin (K), not degrees Celsius or Fahrenheit. Angles are
+left to the angle unit setting, so 'rad' and 'deg' are not units.
+
+evaluate_with_units is what the batch path and the GUI use: plain
+expressions go through engine.evaluate unchanged, and only an expression the
+engine rejects (an unknown name such as 'km', or 'to') is retried here.
+"""
+import re
+from functools import lru_cache
+
+from .engine import (Backend, ExpressionError, backend_for, compile_ast, compile_expression,
+                     evaluate as evaluate_plain, format_result, normalize)
+
+BASE_UNITS = ('m', 'kg', 's', 'A', 'K', 'mol', 'cd')
+DIMENSIONLESS = (0,) * len(BASE_UNITS)
+
+
+class DimensionError(ValueError):
+    """Raised when an operation combines incompatible dimensions."""
+
+
+def _dims(**exponents):
+    return tuple(exponents.get(name, 0) for name in BASE_UNITS)
+
+
+def describe(dims):
+    """A unit expression for a dimension vector in base units, e.g. 'kg*m^2/s^3'."""
+    def power(name, exponent):
+        return name if exponent == 1 else f"{name}^{exponent}"
+    # Conventional order: kg before m, as in kg*m/s^2
+    order = sorted(range(len(BASE_UNITS)), key=lambda i: (i != 1, i))
+    up = [power(BASE_UNITS[i], dims[i]) for i in order if dims[i] > 0]
+    down = [power(BASE_UNITS[i], -dims[i]) for i in order if dims[i] < 0]
+    if not up:
+        # s^-1 rather than 1/s, so the text can be chained after a number
+        return '*'.join(power(BASE_UNITS[i], dims[i]) for i in order if dims[i] < 0)
+    return '*'.join(up) + ''.join('/' + part for part in down)
+
+
+class Quantity:
+    """A magnitude in SI base units with its dimension vector.
+
+    unit is the (label, scale) a conversion asked for; it only affects how
+    the quantity is shown.
+    """
+
+    __slots__ = ('magnitude', 'dims', 'unit')
+
+    def __init__(self, magnitude, dims, unit=None):
+        self.magnitude = magnitude
+        self.dims = dims
+        self.unit = unit
+
+    def __eq__(self, other):
+        return isinstance(other, Quantity) and self.magnitude == other.magnitude and self.dims == other.dims
+
+    def __hash__(self):
+        return hash((Quantity, self.magnitude, self.dims))
+
+    def __repr__(self):
+        return f"Quantity({self.magnitude!r}, {self.dims!r})"
+
+    def __str__(self):
+        if self.unit is not None:
+            label, scale = self.unit
+            magnitude = self.magnitude
+            if type(magnitude) is int and type(scale) is int and magnitude % scale == 0:
+                return f"{format_result(magnitude // scale)} {label}"  # 60 km to m: 60000, not 60000.0
+            return f"{format_result(magnitude / scale)} {label}"
+        return f"{format_result(self.magnitude)} {DISPLAY.get(self.dims) or describe(self.dims)}"
+
+
+class BasedInt(int):
+    """An int shown in base 2, 8 or 16, with Python's 0b/0o/0x prefix."""
+
+    _FORMATS = {2: bin, 8: oct, 16: hex}
+
+    def __new__(cls, value, base):
+        self = super().__new__(cls, value)
+        self.base = base
+        return self
+
+    def __reduce__(self):  # results cross process boundaries in parallel batches
+        return BasedInt, (int(self), self.base)
+
+    def __str__(self):
+        return self._FORMATS[self.base](int(self))
+
+    __repr__ = __str__
+
+
+# --- Tables ---
+
+PREFIXES = {
+    'Y': 10 ** 24, 'Z': 10 ** 21, 'E': 10 ** 18, 'P': 10 ** 15, 'T': 10 ** 12,
+    'G': 10 ** 9, 'M': 10 ** 6, 'k': 1000, 'h': 100, 'da': 10,
+    'd': 1e-1, 'c': 1e-2, 'm': 1e-3, 'u': 1e-6, 'n': 1e-9, 'p': 1e-12, 'f': 1e-15, 'a': 1e-18,
+}
+
+_LENGTH, _MASS, _TIME = _dims(m=1), _dims(kg=1), _dims(s=1)
+_FORCE = _dims(kg=1, m=1, s=-2)
+_ENERGY = _dims(kg=1, m=2, s=-2)
+_POWER = _dims(kg=1, m=2, s=-3)
+_PRESSURE = _dims(kg=1, m=-1, s=-2)
+_CHARGE = _dims(A=1, s=1)
+_VOLTAGE = _dims(kg=1, m=2, s=-3, A=-1)
+
+# name: (factor to SI, dimensions, takes SI prefixes)
+_DEFINITIONS = {
+    # length
+    'm': (1, _LENGTH, True), 'in': (0.0254, _LENGTH, False), 'ft': (0.3048, _LENGTH, False),
+    'yd': (0.9144, _LENGTH, False), 'mi': (1609.344, _LENGTH, False), 'nmi': (1852, _LENGTH, False),
+    'au': (149597870700, _LENGTH, False), 'ly': (9460730472580800, _LENGTH, False),
+    # mass (the gram takes the prefixes; kg is the base unit)
+    'g': (1e-3, _MASS, True), 't': (1000, _MASS, False),
+    'lb': (0.45359237, _MASS, False), 'oz': (0.028349523125, _MASS, False),
+    # time
+    's': (1, _TIME, True), 'min': (60, _TIME, False), 'h': (3600, _TIME, False),
+    'day': (86400, _TIME, False), 'week': (604800, _TIME, False), 'yr': (31557600, _TIME, False),
+    # other base units
+    'A': (1, _dims(A=1), True), 'K': (1, _dims(K=1), True),
+    'mol': (1, _dims(mol=1), True), 'cd': (1, _dims(cd=1), True),
+    # area, volume, speed
+    'ha': (10000, _dims(m=2), False),
+    'L': (1e-3, _dims(m=3), True), 'l': (1e-3, _dims(m=3), True), 'gal': (0.003785411784, _dims(m=3), False),
+    'mph': (0.44704, _dims(m=1, s=-1), False), 'kn': (1852 / 3600, _dims(m=1, s=-1), False),
+    # mechanics
+    'N': (1, _FORCE, True), 'lbf': (4.4482216152605, _FORCE, False),
+    'J': (1, _ENERGY, True), 'cal': (4.184, _ENERGY, True), 'Wh': (3600, _ENERGY, True),
+    'eV': (1.602176634e-19, _ENERGY, True),
+    'W': (1, _POWER, True), 'hp': (745.69987158227022, _POWER, False),
+    'Pa': (1, _PRESSURE, True), 'bar': (100000, _PRESSURE, True), 'atm': (101325, _PRESSURE, False),
+    'psi': (6894.757293168361, _PRESSURE, False),
+    'Hz': (1, _dims(s=-1), True),
+    # electromagnetism
+    'C': (1, _CHARGE, True), 'V': (1, _VOLTAGE, True),
+    'ohm': (1, _dims(kg=1, m=2, s=-3, A=-2), True), 'F': (1, _dims(kg=-1, m=-2, s=4, A=2), True),
+}
+
+
+def _build_units(definitions):
+    units = {}
+    for name, (factor, dims, prefixed) in definitions.items():
+        if prefixed:
+            for prefix, scale in PREFIXES.items():
+                units[prefix + name] = Quantity(scale * factor, dims)
+    # Plain names win should a prefixed spelling ever coincide with one
+    for name, (factor, dims, _) in definitions.items():
+        units[name] = Quantity(factor, dims)
+    # kg is exact; the prefix loop made it 1000 * 1e-3
+    units['kg'] = Quantity(1, _MASS)
+    return units
+
+
+UNITS = _build_units(_DEFINITIONS)
+
+DISPLAY = {
+    _LENGTH: 'm', _MASS: 'kg', _TIME: 's', _FORCE: 'N', _ENERGY: 'J', _POWER: 'W',
+    _PRESSURE: 'Pa', _CHARGE: 'C', _VOLTAGE: 'V', _dims(s=-1): 'Hz',
+    _dims(A=1): 'A', _dims(K=1): 'K', _dims(mol=1): 'mol', _dims(cd=1): 'cd',
+    _dims(kg=1, m=2, s=-3, A=-2): 'ohm', _dims(kg=-1, m=-2, s=4, A=2): 'F',
+    _dims(m=2): 'm^2', _dims(m=3): 'm^3', _dims(m=1, s=-1): 'm/s', _dims(m=1, s=-2): 'm/s^2',
+}
+
+BASES = {'hex': 16, 'bin': 2, 'oct': 8, 'dec': 10}
+
+
+# --- Arithmetic on quantities ---
+
+def _split(x):
+    if isinstance(x, Quantity):
+        return x.magnitude, x.dims
+    return x, DIMENSIONLESS
+
+
+def _make(magnitude, dims):
+    return magnitude if dims == DIMENSIONLESS else Quantity(magnitude, dims)
+
+
+def _same_dims(symbol, fn):
+    def apply(x, y):
+        a, da = _split(x)
+        b, db = _split(y)
+        if da != db:
+            raise DimensionError(f"Cannot {symbol} {describe(da) or '1'} and {describe(db) or '1'}")
+        return _make(fn(a, b), da)
+    return apply
+
+
+def _multiply(x, y):
+    a, da = _split(x)
+    b, db = _split(y)
+    return _make(a * b, tuple(p + q for p, q in zip(da, db)))
+
+
+def _divide(x, y):
+    a, da = _split(x)
+    b, db = _split(y)
+    return _make(a / b, tuple(p - q for p, q in zip(da, db)))
+
+
+def _scaled_dims(dims, exponent):
+    scaled = tuple(d * exponent for d in dims)
+    if any(d != int(d) for d in scaled):
+        raise DimensionError(f"({describe(dims)})^{exponent} has fractional dimensions")
+    return tuple(int(d) for d in scaled)
+
+
+def _power(power):
+    def apply(x, y):
+        b, db = _split(y)
+        if db != DIMENSIONLESS:
+            raise DimensionError(f"An exponent must be dimensionless, not {describe(db)}")
+        a, da = _split(x)
+        if da == DIMENSIONLESS:
+            return power(a, b)
+        return _make(power(a, b), _scaled_dims(da, b))
+    return apply
+
+
+def _negate(x):
+    a, da = _split(x)
+    return _make(-a, da)
+
+
+def _number_only(name, fn):
+    def apply(*args):
+        values = []
+        for arg in args:
+            value, dims = _split(arg)
+            if dims != DIMENSIONLESS:
+                raise DimensionError(f"{name}() needs a dimensionless argument, not {describe(dims)}")
+            values.append(value)
+        return fn(*values)
+    return apply
+
+
+def _sqrt(sqrt):
+    def apply(x):
+        a, da = _split(x)
+        return _make(sqrt(a), _scaled_dims(da, 0.5))
+    return apply
+
+
+def with_units(base):
+    """base (a float backend) extended with every unit in UNITS, keeping its budget."""
+    functions = {name: _number_only(name, fn) for name, fn in base.functions.items()}
+    functions['sqrt'] = _sqrt(base.functions['sqrt'])
+    return Backend(
+        f'units-{base.name}',
+        number=base.number,
+        constants=dict(UNITS, **base.constants),
+        functions=functions,
+        operators={
+            '+': _same_dims('add', base.operators['+']),
+            '-': _same_dims('subtract', base.operators['-']),
+            '%': _same_dims('take the modulus of', base.operators['%']),
+            '*': _multiply, '/': _divide, '^': _power(base.operators['^']),
+            'neg': _negate, 'fact': _number_only('factorial', base.operators['fact']),
+        },
+    )
+
+
+@lru_cache(maxsize=2)
+def units_backend(angle_unit='rad'):
+    """Backend whose constants include every unit in UNITS."""
+    return with_units(backend_for(angle_unit))
+
+
+@lru_cache(maxsize=1024)
+def _compile_units(compiled, backend):
+    return compile_ast(compiled.tree, backend)
+
+
+# --- Evaluation ---
+
+_TO_RE = re.compile(r'\bto\b')
+
+
+def split_target(text):
+    """'expression to target' as (expression, target); target is None without 'to'."""
+    parts = _TO_RE.split(text)
+    if len(parts) == 1:
+        return text, None
+    if len(parts) != 2 or not parts[0].strip() or not parts[1].strip():
+        raise ExpressionError(f"Expected one 'to' between an expression and a unit in {text!r}")
+    return parts[0], parts[1].strip()
+
+
+def _to_base(value, base):
+    magnitude, dims = _split(value)
+    if dims != DIMENSIONLESS:
+        raise DimensionError(f"Cannot write a quantity in {describe(dims)} in another base")
+    if isinstance(magnitude, float):
+        if not magnitude.is_integer():
+            raise ValueError("Base conversion needs an integer")
+        magnitude = int(magnitude)
+    if not isinstance(magnitude, int):
+        raise ValueError("Base conversion needs an integer")
+    return int(magnitude) if base == 10 else BasedInt(magnitude, base)
+
+
+def convert(value, target, env=None, angle_unit='rad', backend=None):
+    """value expressed in the target unit expression (or base: 'hex', 'bin', 'oct', 'dec')."""
+    base = BASES.get(target.lower())
+    if base is not None:
+        return _to_base(value, base)
+    unit = _compile_units(compile_expression(target), backend or units_backend(angle_unit))(env)
+    magnitude, dims = _split(value)
+    scale, unit_dims = _split(unit)
+    if dims != unit_dims:
+        raise DimensionError(f"Cannot convert {describe(dims) or 'a number'} to {target}")
+    if dims == DIMENSIONLESS:
+        return magnitude / scale
+    return Quantity(magnitude, dims, (normalize(target), scale))
+
+
+def evaluate(text, env=None, angle_unit='rad', backend=None, **variables):
+    """Evaluate an expression with units, optionally followed by 'to <unit or base>'.
+
+    backend, if given, is a with_units() backend to compile against instead
+    of units_backend(angle_unit); the HTTP server passes one built on its
+    tighter inline budget.
+    """
+    if variables:
+        env = dict(env or {}, **variables)
+    backend = backend or units_backend(angle_unit)
+    expression, target = split_target(text)
+    value = _compile_units(compile_expression(expression), backend)(env)
+    if target is None:
+        return value
+    return convert(value, target, env, angle_unit, backend)
+
+
+def evaluate_with_units(text, env=None, angle_unit='rad'):
+    """engine.evaluate, retried with units and conversions when the engine rejects the text.
+
+    If the units evaluation cannot make sense of the text either, the
+    engine's error is raised; any other failure (a DimensionError, a
+    conversion of 2.5 to hex) is the more specific one and propagates.
+    """
+    try:
+        return evaluate_plain(text, env, angle_unit)
+    except ExpressionError as error:
+        try:
+            return evaluate(text, env, angle_unit)
+        except ExpressionError:
+            raise error from None
+
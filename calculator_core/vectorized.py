@@ -0,0 +1,168 @@
+"""NumPy evaluation mode: compile once, evaluate over whole arrays.
+
+    sweep = compile_vectorized("sin(x)^2 + log(y)")
+    sweep(x=np.linspace(0, 1, 10**6), y=2.0)
+
+The expression is parsed by the regular engine (and shares its cache); only
+the backend differs, so every operator and function maps onto a ufunc and the
+per-element work happens inside NumPy rather than in a Python loop. Domain
+errors produce nan/inf entries instead of raising, as usual for ufuncs.
+
+NumPy is optional; it is only imported when this module is used.
+"""
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+from . import guards, trig
+from .engine import Backend, compile_ast, compile_expression
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("the vectorized mode requires NumPy (pip install numpy)")
+
+
+def _factorial_element(value):
+    try:
+        return float(guards.factorial(value))
+    except ValueError:  # negative or non-integral
+        return np.nan
+    except OverflowError:
+        return np.inf
+
+
+def _factorial(x):
+    # No factorial ufunc in NumPy; gamma(n + 1) would lose exactness, so map
+    # the guarded factorial over the (usually small) array of integral inputs.
+    # Like the ufuncs, domain errors give nan rather than raising.
+    values = np.asarray(x)
+    if values.ndim == 0:
+        return _factorial_element(float(values))
+    return np.array([_factorial_element(float(v)) for v in values.ravel()]).reshape(values.shape)
+
+
+def _exact(table, x, values):
+    # values, with the entries of x that are keys of table replaced by the exact table value
+    keys = np.array(sorted(table), dtype=float)
+    exact = np.array([table[key] for key in sorted(table)])
+    index = np.clip(np.searchsorted(keys, x), 0, keys.size - 1)
+    return np.where(keys[index] == x, exact[index], values)[()]
+
+
+def _reduce_degrees(x):
+    # x mod 360 in [0, 360), exact as in trig.reduce_degrees
+    r = np.fmod(np.asarray(x, dtype=float), 360.0)
+    return np.where(r < 0, r + 360.0, r)
+
+
+def _quadrant(r):
+    # r = 90 * q + t with |t| <= 45, as in trig._quadrant
+    q = np.rint(r / 90.0)
+    return q.astype(int) % 4, np.deg2rad(r - 90.0 * q)
+
+
+def _sin_deg(x):
+    q, t = _quadrant(r := _reduce_degrees(x))
+    return _exact(trig._SIN_EXACT, r, np.choose(q, (np.sin(t), np.cos(t), -np.sin(t), -np.cos(t))))
+
+
+def _cos_deg(x):
+    q, t = _quadrant(r := _reduce_degrees(x))
+    values = np.choose(q, (np.cos(t), -np.sin(t), -np.cos(t), np.sin(t)))
+    return _exact(trig._SIN_EXACT, np.fmod(r + 90.0, 360.0), values)
+
+
+def _tan_deg(x):
+    r = _reduce_degrees(x)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = np.where(np.isin(r, list(trig._TAN_UNDEFINED)), np.nan, _sin_deg(r) / _cos_deg(r))
+    return _exact(trig._TAN_EXACT, r, values)
+
+
+def _odd(table, fn):
+    def kernel(x):
+        magnitude = _exact(table, np.abs(x), np.rad2deg(fn(np.abs(x))))
+        return np.copysign(magnitude, x)
+    return kernel
+
+
+def _degree_functions():
+    # The same exact reduction and table angles as the scalar kernels in trig, so
+    # sin(180) is 0 here too rather than sin(deg2rad(180)) = 1.2e-16; poles of tan are nan
+    return {
+        'sin': _sin_deg, 'cos': _cos_deg, 'tan': _tan_deg,
+        'asin': _odd(trig._ASIN_EXACT, np.arcsin),
+        'acos': lambda x: _exact(trig._ACOS_EXACT, x, np.rad2deg(np.arccos(x))),
+        'atan': _odd(trig._ATAN_EXACT, np.arctan),
+    }
+
+
+@lru_cache(maxsize=2)
+def numpy_backend(angle_unit='rad'):
+    _require_numpy()
+    functions = {
+        'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+        'asin': np.arcsin, 'acos': np.arccos, 'atan': np.arctan,
+        'log': np.log10, 'ln': np.log, 'sqrt': np.sqrt, 'exp': np.exp,
+    }
+    if angle_unit == 'deg':
+        functions.update(_degree_functions())
+    elif angle_unit != 'rad':
+        raise ValueError(f"Unknown angle unit {angle_unit!r}; expected 'rad' or 'deg'")
+    return Backend(
+        f'numpy-{angle_unit}',
+        number=float,
+        constants={'pi': np.pi, 'e': np.e},
+        functions=functions,
+        operators={
+            '+': np.add, '-': np.subtract, '*': np.multiply,
+            '/': np.true_divide, '%': np.mod, '^': np.power,
+            'neg': np.negative, 'fact': _factorial,
+        },
+    )
+
+
+class VectorizedExpression:
+    """An expression compiled against the NumPy backend."""
+
+    __slots__ = ('text', 'variables', '_fn')
+
+    def __init__(self, compiled, angle_unit='rad'):
+        self.text = compiled.text
+        self.variables = compiled.variables
+        # Constant subtrees are folded while compiling, under the same rules
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            self._fn = compile_ast(compiled.tree, numpy_backend(angle_unit))
+
+    def evaluate(self, env=None, **arrays):
+        if arrays:
+            env = dict(env or {}, **arrays)
+        # Float arrays keep np.power well defined for negative exponents
+        env = {name: np.asarray(value, dtype=float) for name, value in (env or {}).items()}
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            return self._fn(env)
+
+    __call__ = evaluate
+
+    def __repr__(self):
+        return f"VectorizedExpression({self.text!r})"
+
+
+@lru_cache(maxsize=1024)
+def _vectorize_normalized(compiled, angle_unit):
+    return VectorizedExpression(compiled, angle_unit)
+
+
+def compile_vectorized(text, angle_unit='rad'):
+    """Compile an expression for evaluation over NumPy arrays."""
+    _require_numpy()
+    return _vectorize_normalized(compile_expression(text), angle_unit)
+
+
+def evaluate_vectorized(text, env=None, angle_unit='rad', **arrays):
+    """Evaluate an expression over arrays of variable values in one pass."""
+    return compile_vectorized(text, angle_unit).evaluate(env, **arrays)
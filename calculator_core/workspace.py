@@ -0,0 +1,228 @@
+"""Named variables, user-defined functions and spreadsheet-style recomputation.
+
+    ws = Workspace()
+    ws.define("a = 3")
+    ws.define("f(x) = x^2 + sin(x)")
+    ws.define("b = f(a) + 1")
+    ws.define("a = 4")        # recomputes a and b only -> {'a': 4, 'b': ...}
+
+Each definition is compiled once. The workspace keeps a dependency graph
+(which cells and functions each definition reads), so changing a definition
+re-evaluates exactly the cells downstream of it, in topological order, and
+leaves everything else alone. Cells may refer to names defined later; they
+stay in error until the name exists. Circular definitions are rejected.
+"""
+import re
+from collections import ChainMap, deque
+
+from .engine import (Backend, ExpressionError, backend_for, compile_ast, free_variables,
+                     parse)
+
+_DEFINITION_RE = re.compile(r"^\s*([A-Za-z_]\w*)\s*(?:\(\s*([^)]*)\))?\s*=(.*)$", re.S)
+_NAME_RE = re.compile(r"^[A-Za-z_]\w*$")
+
+
+class _UserFunction:
+    """Callable stand-in for a user function; compiled callers bind this object,
+    so redefining the function never requires recompiling them."""
+
+    __slots__ = ('name', 'params', 'body', 'values')
+
+    def __init__(self, name, values):
+        self.name = name
+        self.params = None
+        self.body = None
+        self.values = values
+
+    def __call__(self, *args):
+        if self.body is None:
+            raise ExpressionError(f"Unknown function {self.name!r}")
+        if len(args) != len(self.params):
+            raise ExpressionError(f"{self.name}() takes {len(self.params)} argument(s), got {len(args)}")
+        return self.body(ChainMap(dict(zip(self.params, args)), self.values))
+
+
+class _FunctionTable(dict):
+    # Unknown names become undefined user functions, so callers can be
+    # compiled before the function they call is defined.
+    def __init__(self, builtins, values):
+        super().__init__(builtins)
+        self.builtins = frozenset(builtins)
+        self.values = values
+
+    def __missing__(self, name):
+        function = self[name] = _UserFunction(name, self.values)
+        return function
+
+
+def _calls(node, found=None):
+    """Names of all functions called in an AST."""
+    if found is None:
+        found = set()
+    kind = node[0]
+    if kind == 'call':
+        found.add(node[1])
+        children = node[2]
+    elif kind == 'bin':
+        children = node[2:]
+    elif kind in ('neg', 'fact'):
+        children = node[1:]
+    else:
+        children = ()
+    for child in children:
+        _calls(child, found)
+    return found
+
+
+class Workspace:
+    """A set of named cells and functions with dependency-tracked recomputation."""
+
+    def __init__(self, angle_unit='rad'):
+        base = backend_for(angle_unit)
+        self.values = {}        # cell name -> current value
+        self.errors = {}        # cell name -> exception from its last evaluation
+        self.sources = {}       # name -> definition text (cells and functions)
+        self._cells = {}        # cell name -> compiled closure
+        self._depends_on = {}   # name -> names it reads
+        self._dependents = {}   # name -> names that read it
+        self._functions = _FunctionTable(base.functions, self.values)
+        self.backend = Backend(f'workspace-{angle_unit}', base.number, base.constants,
+                               self._functions, base.operators)
+        self.evaluations = 0    # cells evaluated so far, handy for checking incrementality
+
+    # --- Definitions ---
+
+    def define(self, source):
+        """Define 'name = expr' or 'f(x, y) = expr'; returns {name: value} of recomputed cells."""
+        match = _DEFINITION_RE.match(source)
+        if match is None:
+            raise ExpressionError("Expected a definition such as 'a = 3' or 'f(x) = x^2'")
+        name, params, body = match.groups()
+        self._check_name(name)
+        if params is None:
+            return self._define_cell(name, body, source)
+        params = [p.strip() for p in params.split(',')] if params.strip() else []
+        for param in params:
+            if not _NAME_RE.match(param):
+                raise ExpressionError(f"Invalid parameter name {param!r}")
+        return self._define_function(name, params, body, source)
+
+    def _check_name(self, name):
+        if name in self.backend.constants or name in self._functions.builtins:
+            raise ExpressionError(f"{name!r} is built in and cannot be redefined")
+
+    def _define_cell(self, name, body, source):
+        if name in self._functions and self._functions[name].body is not None:
+            raise ExpressionError(f"{name!r} is already a function")
+        tree = parse(body)
+        reads = free_variables(tree) | (_calls(tree) - self._functions.builtins)
+        self._set_edges(name, reads)
+        self._cells[name] = compile_ast(tree, self.backend)
+        self.sources[name] = source.strip()
+        return self._recompute(name)
+
+    def _define_function(self, name, params, body, source):
+        if name in self._cells:
+            raise ExpressionError(f"{name!r} is already a variable")
+        tree = parse(body)
+        reads = (free_variables(tree) - set(params)) | (_calls(tree) - self._functions.builtins)
+        self._set_edges(name, reads)
+        function = self._functions[name]
+        function.params = params
+        function.body = compile_ast(tree, self.backend)
+        self.sources[name] = source.strip()
+        return self._recompute(name)
+
+    def remove(self, name):
+        """Forget a cell or function; cells that used it recompute (into errors)."""
+        if name not in self.sources:
+            raise KeyError(name)
+        del self.sources[name]
+        self._cells.pop(name, None)
+        self.values.pop(name, None)
+        self.errors.pop(name, None)
+        if name in self._functions and name not in self._functions.builtins:
+            self._functions[name].body = None
+        self._set_edges(name, set())
+        return self._recompute(name)
+
+    # --- Dependency graph ---
+
+    def _set_edges(self, name, reads):
+        old = self._depends_on.get(name, set())
+        if name in reads or any(name in self._upstream(r) for r in reads):
+            raise ExpressionError(f"Circular definition involving {name!r}")
+        for dep in old - reads:
+            self._dependents[dep].discard(name)
+        for dep in reads - old:
+            self._dependents.setdefault(dep, set()).add(name)
+        self._depends_on[name] = set(reads)
+
+    def _upstream(self, name):
+        seen = set()
+        stack = [name]
+        while stack:
+            for dep in self._depends_on.get(stack.pop(), ()):
+                if dep not in seen:
+                    seen.add(dep)
+                    stack.append(dep)
+        return seen
+
+    def _affected(self, name):
+        """name and everything downstream of it, in topological order."""
+        affected = {name}
+        queue = deque([name])
+        while queue:
+            for dependent in self._dependents.get(queue.popleft(), ()):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    queue.append(dependent)
+        # Kahn's algorithm restricted to the affected subgraph
+        pending = {n: len(self._depends_on.get(n, set()) & affected) for n in affected}
+        ready = deque(n for n, count in pending.items() if count == 0)
+        order = []
+        while ready:
+            current = ready.popleft()
+            order.append(current)
+            for dependent in self._dependents.get(current, ()):
+                if dependent in pending:
+                    pending[dependent] -= 1
+                    if pending[dependent] == 0:
+                        ready.append(dependent)
+        return order
+
+    def _recompute(self, name):
+        changed = {}
+        for cell in self._affected(name):
+            fn = self._cells.get(cell)
+            if fn is None:
+                continue  # a function or an undefined name, nothing to evaluate
+            self.evaluations += 1
+            try:
+                value = fn(self.values)
+            except Exception as exc:
+                self.values.pop(cell, None)
+                self.errors[cell] = exc
+                changed[cell] = None
+                continue
+            self.errors.pop(cell, None)
+            self.values[cell] = changed[cell] = value
+        return changed
+
+    def dependents(self, name):
+        """Names that directly read name."""
+        return set(self._dependents.get(name, ()))
+
+    # --- Evaluation ---
+
+    def __getitem__(self, name):
+        if name in self.errors:
+            raise self.errors[name]
+        return self.values[name]
+
+    def __contains__(self, name):
+        return name in self.sources
+
+    def evaluate(self, text):
+        """Evaluate an expression against the workspace without storing it."""
+        return compile_ast(parse(text), self.backend)(self.values)
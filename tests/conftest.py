@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The package is used from a checkout (there is no installed distribution)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,33 @@
+from calculator_core import cli, evaluate_many
+from calculator_core.batch import Result, evaluate_one, render
+
+
+def test_evaluate_many_is_lazy_and_ordered():
+    results = evaluate_many(iter(['1+2', '1/0', 'sin(']))
+    assert next(results) == Result('1+2', 3, None)
+    assert next(results).error == 'division by zero'
+    assert next(results).error
+
+
+def test_render():
+    assert render(evaluate_one('2^10')) == '1024'
+    assert render(evaluate_one('1/0')) == 'Error: division by zero'
+    assert render(evaluate_one('sin(90)', 'deg')) == '1.0'
+
+
+def test_cli_keeps_lines_aligned(tmp_path):
+    source = tmp_path / 'in.txt'
+    source.write_text('1+1\n\n2*3\n1/0\n')
+    output = tmp_path / 'out.txt'
+    assert cli.main([str(source), '-o', str(output)]) == 0
+    assert output.read_text().splitlines() == ['2', '', '6', 'Error: division by zero']
+
+
+def test_cli_degrees_and_jobs(tmp_path):
+    source = tmp_path / 'in.txt'
+    source.write_text(''.join(f'{i}*{i}\n' for i in range(200)) + 'cos(180)\n')
+    output = tmp_path / 'out.txt'
+    assert cli.main([str(source), '-o', str(output), '-j', '2', '--degrees']) == 0
+    lines = output.read_text().splitlines()
+    assert lines[:200] == [str(i * i) for i in range(200)]
+    assert lines[200] == '-1.0'
@@ -0,0 +1,66 @@
+import sqlite3
+
+import pytest
+
+from calculator_core import codecache, engine
+from calculator_core.engine import Program, assemble, compile_expression
+
+
+@pytest.fixture
+def cache(tmp_path):
+    path = str(tmp_path / 'code.db')
+    engine.cache_clear()
+    yield path
+    codecache.disable()
+    engine.cache_clear()
+
+
+def test_program_round_trip():
+    program = assemble(compile_expression('sin(x)^2 + x*y').tree)
+    copy = Program.from_tuple(program.to_tuple())
+    assert (copy.code, copy.args, copy.constants, copy.names) == (
+        program.code, program.args, program.constants, program.names)
+    env = {'x': 0.5, 'y': 3}
+    assert engine.link(copy)(env) == engine.link(program)(env)
+
+
+def test_a_new_session_reuses_stored_programs(cache):
+    first = codecache.enable(cache)
+    assert engine.evaluate('x^2 + 1', x=3) == 10
+    assert engine.evaluate('sin(30)', angle_unit='deg') == pytest.approx(0.5)
+    codecache.disable()  # flushes, as at exit
+    assert first.misses == 2
+
+    engine.cache_clear()
+    second = codecache.enable(cache)
+    compiled = compile_expression('x^2+1')
+    assert second.hits == 1
+    assert compiled._programs  # linked from the stored Program, not re-optimized
+    assert compiled.evaluate(x=4) == 17
+    assert engine.evaluate('sin(30)', angle_unit='deg') == pytest.approx(0.5)
+
+
+def test_rows_of_another_version_are_dropped(cache):
+    codecache.enable(cache)
+    engine.evaluate('2*x', x=1)
+    codecache.disable()
+    db = sqlite3.connect(cache)
+    with db:
+        db.execute("UPDATE code SET version = 'stale'")
+    db.close()
+
+    engine.cache_clear()
+    reopened = codecache.enable(cache)
+    assert engine.evaluate('2*x', x=2) == 4
+    assert reopened.hits == 0
+    codecache.disable()
+    db = sqlite3.connect(cache)
+    assert db.execute("SELECT COUNT(*) FROM code WHERE version = 'stale'").fetchone()[0] == 0
+    db.close()
+
+
+def test_unreadable_cache_is_a_miss(cache, tmp_path):
+    broken = tmp_path / 'broken.db'
+    broken.write_bytes(b'not a database')
+    codecache.enable(str(broken))
+    assert engine.evaluate('6*7') == 42
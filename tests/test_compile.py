@@ -0,0 +1,72 @@
+import math
+from collections import Counter
+
+import pytest
+
+from calculator_core.engine import (FLOAT_BACKEND, OP_CONST, OP_FETCH, OP_STORE, Backend,
+                                    assemble, compile_ast, compile_expression)
+
+
+def _counting_backend():
+    calls = Counter()
+
+    def counted(name, fn):
+        def apply(*args):
+            calls[name] += 1
+            return fn(*args)
+        return apply
+
+    backend = Backend('counting', FLOAT_BACKEND.number, FLOAT_BACKEND.constants,
+                      {name: counted(name, fn) for name, fn in FLOAT_BACKEND.functions.items()},
+                      {op: counted(op, fn) for op, fn in FLOAT_BACKEND.operators.items()})
+    return backend, calls
+
+
+def _tree(text):
+    return compile_expression(text).tree
+
+
+def test_constants_fold_at_compile_time():
+    program = assemble(_tree('2^10 + sin(0) * 3!'))
+    assert list(program.code) == [OP_CONST] and program.constants == (1024.0,)
+    backend, calls = _counting_backend()
+    fn = compile_ast(_tree('x + 2*3 + sqrt(16)'), backend)
+    calls.clear()
+    assert fn({'x': 1}) == 11.0
+    assert calls == {'+': 2}
+
+
+def test_shared_subexpressions_are_computed_once():
+    backend, calls = _counting_backend()
+    fn = compile_ast(_tree('sin(x+1)^2 + cos(x+1)*sin(x+1)'), backend)
+    program = assemble(_tree('sin(x+1)^2 + cos(x+1)*sin(x+1)'))
+    assert OP_STORE in program.code and OP_FETCH in program.code
+    calls.clear()
+    x = 0.4
+    assert fn({'x': x}) == pytest.approx(math.sin(x + 1) ** 2 + math.cos(x + 1) * math.sin(x + 1))
+    assert calls['sin'] == 1 and calls['+'] == 2  # x+1 once, the outer sum once
+
+
+def test_identities():
+    backend, calls = _counting_backend()
+    fn = compile_ast(_tree('x*1 + 1*x + x^1 + --x'), backend)
+    calls.clear()
+    assert fn({'x': 2.5}) == 10.0
+    assert set(calls) == {'+'}
+
+
+def test_errors_are_left_for_run_time():
+    fn = compile_ast(_tree('x + 1/0'))
+    with pytest.raises(ZeroDivisionError):
+        fn({'x': 1})
+
+
+def test_user_functions_are_not_folded():
+    calls = Counter()
+    functions = dict(FLOAT_BACKEND.functions, f=lambda v: calls.update(['f']) or v * 2)
+    custom = Backend('custom', FLOAT_BACKEND.number, FLOAT_BACKEND.constants, functions,
+                     FLOAT_BACKEND.operators)
+    fn = compile_ast(_tree('f(3)'), custom)
+    assert calls['f'] == 0
+    assert fn({}) == 6.0 and fn({}) == 6.0
+    assert calls['f'] == 2
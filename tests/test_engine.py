@@ -0,0 +1,112 @@
+import math
+
+import pytest
+
+from calculator_core import ExpressionError, compile_expression, evaluate, parse
+from calculator_core.engine import cache_clear, normalize, unparse
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('2+3*4', 14),
+    ('2*3+4', 10),
+    ('(2+3)*4', 20),
+    ('2-3-4', -5),
+    ('8/2/2', 2.0),
+    ('2^3^2', 512),        # ^ is right associative
+    ('-2^2', -4),          # ^ binds tighter than unary minus
+    ('2^-1', 0.5),         # the exponent may carry its own sign
+    ('3!^2', 36),          # ! binds tighter than ^
+    ('10%3', 1),
+    ('2 mod 3', 2),
+])
+def test_precedence_and_associativity(text, expected):
+    assert evaluate(text) == expected
+
+
+def test_right_associative_power_tree():
+    assert parse('2^3^2') == ('bin', '^', ('num', '2'), ('bin', '^', ('num', '3'), ('num', '2')))
+    assert parse('2-3-4') == ('bin', '-', ('bin', '-', ('num', '2'), ('num', '3')), ('num', '4'))
+
+
+def test_implicit_multiplication():
+    assert evaluate('2pi') == pytest.approx(2 * math.pi)
+    assert evaluate('3(4+1)') == 15
+    assert evaluate('2x', x=5) == 10
+    assert evaluate('(1+2)(3+4)') == 21
+    assert evaluate('(1+2)3') == 9
+
+
+def test_adjacent_operands_need_an_operator():
+    for text in ('1 2', '(1 2)', 'x y', 'pi 2', '2!3', '(2)x'):
+        with pytest.raises(ExpressionError, match='Missing operator'):
+            evaluate(text, x=1, y=2)
+
+
+def test_unclosed_parentheses_are_reported():
+    with pytest.raises(ExpressionError, match=r"Unclosed '\(' after 'foo'"):
+        evaluate('foo(')
+    with pytest.raises(ExpressionError, match=r"Unclosed '\('"):
+        evaluate('(2+')
+    with pytest.raises(ExpressionError, match="Missing argument to 'sin'"):
+        evaluate('sin()')
+    with pytest.raises(ExpressionError, match="Unexpected"):
+        evaluate('(2+)')
+
+
+def test_unparse_round_trips():
+    for text in ('2^3^2', '(2^3)^2', '2-(3-4)', '-(2+x)', '(x+1)!', 'sin(x)^2'):
+        tree = parse(text)
+        assert parse(unparse(tree)) == tree
+
+
+def test_integers_stay_exact():
+    assert evaluate('2^100') == 2 ** 100
+    assert isinstance(evaluate('6*7'), int)
+
+
+def test_long_chains_fold_without_recursing():
+    # Deeper than the recursion limit: the simplifier walks a left-deep chain in a loop
+    assert evaluate('+'.join(['1'] * 5000)) == 5000
+    assert evaluate('1' + '-2*3+4' * 2000) == 1 - 2000 * 2
+
+
+def test_tokenizer_kinds():
+    assert normalize('0x1f + 0b11*.5e1 mod x_1') == '31+3*.5e1%x_1'
+    for text in ('.', '2 $ 3', '3 é'):
+        with pytest.raises(ExpressionError, match='Unexpected character'):
+            normalize(text)
+    with pytest.raises(ExpressionError, match='Empty expression'):
+        parse('  ')
+
+
+def test_gui_spellings_and_open_parentheses():
+    assert evaluate('math.sqrt(16') == 4.0
+    assert evaluate('math.log10(1000)') == pytest.approx(3)
+    assert normalize('sqrt(9') == normalize('sqrt( 9 )')
+
+
+def test_angle_units():
+    assert evaluate('sin(30)', angle_unit='deg') == pytest.approx(0.5)
+    assert evaluate('sin(pi/6)') == pytest.approx(0.5)
+    with pytest.raises(ValueError):
+        evaluate('1', angle_unit='grad')
+
+
+@pytest.mark.parametrize('text, error', [
+    ('1/0', ZeroDivisionError),
+    ('y+1', ExpressionError),
+    ('foo(2)', ExpressionError),
+    ('2+', ExpressionError),
+    ('2 $ 3', ExpressionError),
+    ('', ExpressionError),
+])
+def test_errors(text, error):
+    with pytest.raises(error):
+        evaluate(text)
+
+
+def test_compiled_expressions_are_cached():
+    cache_clear()
+    assert compile_expression('1 + x') is compile_expression('1+x')
+    assert compile_expression('1+x').evaluate(x=2) == 3
+    assert compile_expression('1+x').evaluate({'x': 4}) == 5
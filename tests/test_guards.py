@@ -0,0 +1,80 @@
+import math
+
+import pytest
+
+from calculator_core import evaluate, guards
+from calculator_core.guards import Budget, CostLimitError, LargeNumber
+
+
+def test_small_results_are_exact():
+    assert guards.factorial(20) == math.factorial(20)
+    assert guards.power(3, 40) == 3 ** 40
+    assert evaluate('100!') == math.factorial(100)
+
+
+def test_factorial_rejects_bad_arguments():
+    with pytest.raises(ValueError):
+        guards.factorial(2.5)
+    with pytest.raises(ValueError):
+        guards.factorial(-1)
+
+
+def test_over_budget_results_are_approximated():
+    value = guards.factorial(100_000)
+    assert isinstance(value, LargeNumber)
+    assert value.sign == 1
+    assert value.log10 == pytest.approx(math.lgamma(100_001) / math.log(10))
+    assert str(value).endswith('e+456573')
+
+
+def test_over_budget_results_are_refused_without_approximation():
+    strict = Budget(max_digits=50, approximate=False)
+    assert guards.factorial(40, strict) == math.factorial(40)
+    with pytest.raises(CostLimitError):
+        guards.factorial(100, strict)
+    with pytest.raises(CostLimitError):
+        guards.power(7, 1000, strict)
+
+
+def test_power_sign_of_approximation():
+    assert guards.power(-10, 10 ** 6 + 1).sign == -1
+    assert guards.power(-10, 10 ** 6).sign == 1
+
+
+def test_float_overflow_becomes_large_number():
+    value = guards.power(10.0, 400.5)
+    assert isinstance(value, LargeNumber)
+    assert value.log10 == pytest.approx(400.5)
+
+
+def test_large_number_arithmetic():
+    big = LargeNumber(1, 500)
+    assert big * 10 == LargeNumber(1, 501)
+    assert big / big == pytest.approx(1.0)
+    assert big > 1e308
+    assert -big < 0
+    assert (big + 1) == big
+    assert 2 ** LargeNumber(-1, 500) == 0.0
+    with pytest.raises(OverflowError):
+        2 ** big
+
+
+def test_large_results_chain_through_the_display():
+    shown = guards.format_number(guards.factorial(100_000))
+    result = evaluate(f"{shown} * 10")
+    assert isinstance(result, LargeNumber)
+    assert result.log10 == pytest.approx(guards.parse_large(shown).log10 + 1)
+
+
+def test_compiled_expressions_follow_budget_changes(monkeypatch):
+    assert evaluate('30!') == math.factorial(30)
+    assert evaluate('7^100') == 7 ** 100
+    assert isinstance(evaluate('5000!'), LargeNumber)
+    monkeypatch.setattr(guards.BUDGET, 'max_digits', 20)
+    monkeypatch.setattr(guards.BUDGET, 'approximate', False)
+    for text in ('30!', '7^100', '5000!'):
+        with pytest.raises(CostLimitError):
+            evaluate(text)
+    monkeypatch.setattr(guards.BUDGET, 'max_digits', 10 ** 6)
+    assert evaluate('5000!') == math.factorial(5000)
+    assert evaluate('2^10') == 1024
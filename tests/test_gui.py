@@ -0,0 +1,106 @@
+import importlib.util
+import os
+
+import pytest
+
+pytest.importorskip('PyQt5.QtWidgets')
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+os.environ['CALCULATOR_HISTORY'] = ':memory:'
+os.environ['CALCULATOR_CODE_CACHE'] = ':memory:'
+
+from PyQt5.QtWidgets import QApplication, QPushButton  # noqa: E402
+
+GUI_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'Project 1 - Dynamic Calculator in Python.py')
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def calc(app):
+    spec = importlib.util.spec_from_file_location('calculator_gui', GUI_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    calc = module.Calculator()
+    yield calc
+    calc.thread_pool.waitForDone(5000)
+    calc.close()
+
+
+def press(calc, *keys):
+    """Click keys on the visible keypad (the mode buttons sit above it)."""
+    app = QApplication.instance()
+    for key in keys:
+        page = calc.stacked_widget.currentWidget()
+        buttons = [b for b in calc.findChildren(QPushButton) if b.text() == key]
+        button = next((b for b in buttons if page.isAncestorOf(b)), buttons[0])
+        button.click()
+        while calc.pending_job is not None:
+            calc.thread_pool.waitForDone(5)
+            app.processEvents()
+    return calc.display.text()
+
+
+def test_normal_mode_is_exact_and_chains(calc):
+    assert press(calc, '0', '.', '1', '+', '0', '.', '2', '=') == '0.3'
+    assert press(calc, '*', '3', '=') == '0.9'
+    assert press(calc, 'C', '1', '/', '0', '=') == 'Error'
+
+
+def test_scientific_mode_evaluates_on_a_worker(calc):
+    calc.set_mode('scientific')
+    assert press(calc, '5', '!', '+', '2', '^', '1', '0', '=') == '1144'
+    # Chaining from the result, then a repeat answered from the history
+    assert press(calc, '-', '4', '4', '=') == '1100'
+    assert press(calc, 'C', '1', '2', '0', '+', '2', '^', '1', '0', '=') == '1144'
+    assert calc.history.lookup('120+2^10') == '1144'
+
+
+def test_mode_switch_clears_the_expression(calc):
+    press(calc, '1', '2')
+    calc.set_mode('scientific')
+    assert calc.display.text() == '' and calc.current_expression == ''
+    calc.set_mode('normal')
+    assert press(calc, '7', '*', '6', '=') == '42'
+
+
+def test_clear_cancels_a_running_evaluation(calc):
+    calc.set_mode('scientific')
+    calc.current_expression = '3+4'
+    page = calc.stacked_widget.currentWidget()
+    equals = next(b for b in page.findChildren(QPushButton) if b.text() == '=')
+    equals.click()
+    assert calc.display.text() == 'Computing...'
+    next(b for b in calc.findChildren(QPushButton) if b.text() == 'C').click()
+    calc.thread_pool.waitForDone(5000)
+    QApplication.instance().processEvents()
+    assert calc.display.text() == ''
+
+
+def test_keys_repaint_while_pressed_and_rest_in_the_page_snapshot(calc, app):
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtTest import QTest
+    calc.show()
+    app.processEvents()
+    page = calc.stacked_widget.currentWidget()
+    key = next(b for b in page.findChildren(QPushButton) if b.text() == '7')
+    resting = page.grab().toImage()
+    QTest.mousePress(key, Qt.LeftButton)
+    app.processEvents()
+    assert page.grab().toImage() != resting
+    QTest.mouseRelease(key, Qt.LeftButton)
+    key.clearFocus()
+    app.processEvents()
+    assert page.grab().toImage() == resting
+    assert calc.display.text() == '7'
+
+
+def test_history_does_not_cross_modes(calc):
+    assert press(calc, '0', '.', '1', '+', '0', '.', '2', '=') == '0.3'
+    calc.set_mode('scientific')
+    assert press(calc, '0', '.', '1', '+', '0', '.', '2', '=') == '0.30000000000000004'
+    calc.set_mode('normal')
+    assert press(calc, '0', '.', '1', '+', '0', '.', '2', '=') == '0.3'
@@ -0,0 +1,103 @@
+import sqlite3
+
+import pytest
+
+from calculator_core import history
+from calculator_core.history import History
+
+
+@pytest.fixture
+def log(tmp_path):
+    with History(str(tmp_path / 'history.db')) as h:
+        yield h
+
+
+def test_lookup_by_normalized_expression(log):
+    log.record('2 + 2', '4')
+    assert log.lookup('2+2') == '4'
+    assert log.lookup('2+3') is None
+
+
+def test_failures_and_other_angle_units_are_not_served(log):
+    log.record('1/0', 'Error: division by zero', ok=False)
+    log.record('sin(90)', '1', angle_unit='deg')
+    assert log.lookup('1/0') is None
+    assert log.lookup('sin(90)') is None
+    assert log.lookup('sin(90)', 'deg') == '1'
+
+
+def test_search_and_recent(log):
+    for expression in ('sin(1)', 'sin(2)', 'cos(1)'):
+        log.record(expression, '0')
+    assert [e.expression for e in log.search('sin(')] == ['sin(2)', 'sin(1)']
+    assert [e.expression for e in log.recent(2)] == ['cos(1)', 'sin(2)']
+    assert len(log) == 3
+
+
+def test_persists_across_sessions(tmp_path):
+    path = str(tmp_path / 'history.db')
+    with History(path) as first:
+        first.record('6*7', '42')
+    with History(path) as second:
+        assert second.lookup('6*7') == '42'
+
+
+def test_rows_of_another_version_are_not_served(tmp_path, monkeypatch):
+    path = str(tmp_path / 'history.db')
+    monkeypatch.setattr(history, 'VERSION', 'older')
+    with History(path) as old:
+        old.record('0.1+0.2', '0.30000000000000004')
+    monkeypatch.undo()
+    with History(path) as new:
+        assert new.lookup('0.1+0.2') is None
+        assert [e.result for e in new.search('0.1')] == ['0.30000000000000004']
+        new.record('0.1+0.2', '0.3')
+        assert new.lookup('0.1+0.2') == '0.3'
+
+
+def test_untagged_logs_are_migrated(tmp_path):
+    path = str(tmp_path / 'history.db')
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE history (id INTEGER PRIMARY KEY, expression TEXT NOT NULL,
+            key TEXT NOT NULL, angle_unit TEXT NOT NULL, result TEXT NOT NULL,
+            ok INTEGER NOT NULL, timestamp REAL NOT NULL);
+        INSERT INTO history (expression, key, angle_unit, result, ok, timestamp)
+            VALUES ('2+2', '2+2', 'rad', '5', 1, 0);
+    """)
+    db.close()
+    with History(path) as log:
+        assert log.lookup('2+2') is None
+        assert len(log) == 1
+        log.record('2+2', '4')
+        assert log.lookup('2+2') == '4'
+
+
+def test_modes_do_not_answer_for_each_other(log):
+    log.record('0.1+0.2', '0.3', mode='normal')
+    assert log.lookup('0.1+0.2') is None
+    assert log.lookup('0.1+0.2', mode='normal') == '0.3'
+    log.record('0.1+0.2', '0.30000000000000004')
+    assert log.lookup('0.1+0.2') == '0.30000000000000004'
+    assert log.lookup('0.1+0.2', mode='normal') == '0.3'
+    assert [e.mode for e in log.search('0.1')] == ['scientific', 'normal']
+
+
+def test_logs_without_modes_are_migrated(tmp_path):
+    path = str(tmp_path / 'history.db')
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE history (id INTEGER PRIMARY KEY, expression TEXT NOT NULL,
+            key TEXT NOT NULL, angle_unit TEXT NOT NULL, result TEXT NOT NULL,
+            ok INTEGER NOT NULL, timestamp REAL NOT NULL, version TEXT NOT NULL DEFAULT '');
+        CREATE INDEX history_key ON history (key, angle_unit);
+    """)
+    db.execute("INSERT INTO history (expression, key, angle_unit, result, ok, timestamp, version) "
+               "VALUES ('0.1+0.2', '0.1+0.2', 'rad', '0.3', 1, 0, ?)", (history.VERSION,))
+    db.commit()
+    db.close()
+    with History(path) as log:
+        assert log.lookup('0.1+0.2') is None
+        assert log.lookup('0.1+0.2', mode='normal') is None
+        columns = [row[2] for row in log._db.execute('PRAGMA index_info(history_key)')]
+        assert columns == ['key', 'angle_unit', 'mode']
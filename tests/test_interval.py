@@ -0,0 +1,98 @@
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+from calculator_core.guards import LargeNumber
+from calculator_core.interval import Interval, evaluate_bounded, evaluate_interval
+from calculator_core.precision import evaluate_exact
+
+
+@pytest.mark.parametrize('text', [
+    '0.1+0.2', '1/3', '0.1*3', 'sqrt(2)', 'exp(1)', 'ln(10)', 'log(7)',
+    'sin(1)^2+cos(1)^2', 'sin(100)', 'cos(3)', 'tan(1.5)', 'atan(0.3)', 'asin(0.5)', 'acos(0.1)',
+    'e^pi', '2^0.5', '1.1^10', '(-1.5)^3', '10!/3', '7.5%2', '-7%3'
+])
+def test_enclosure_contains_the_exact_value(text):
+    enclosure = evaluate_interval(text)
+    exact = evaluate_exact(text, digits=60)
+    assert Fraction(enclosure.lo) <= exact <= Fraction(enclosure.hi)
+    assert enclosure.relative_width() < 1e-9
+
+
+def test_cancellation_widens_the_enclosure_honestly():
+    enclosure = evaluate_interval('pi*1e10 - 31415926535')
+    assert Fraction(enclosure.lo) <= evaluate_exact('pi*1e10 - 31415926535', digits=60) <= Fraction(enclosure.hi)
+    assert enclosure.relative_width() > 1e-12
+
+
+@pytest.mark.parametrize('text, value', [
+    ('2^10', 1024.0), ('sqrt(4)', 2.0), ('5!', 120.0), ('0.5+0.25', 0.75), ('10%3', 1.0),
+])
+def test_exact_steps_stay_points(text, value):
+    assert evaluate_interval(text) == Interval(value)
+
+
+def test_variables_and_even_powers():
+    assert evaluate_interval('x^2', x=Interval(-1.0, 2.0)) == Interval(0.0, 4.0)
+    assert evaluate_interval('x*x', x=Interval(-1.0, 2.0)) == Interval(-2.0, 4.0)
+    assert evaluate_interval('sin(x)', x=Interval(0.0, 3.0)).hi == 1.0
+
+
+def test_poles_and_divisors_containing_zero_are_unbounded():
+    whole = Interval(float('-inf'), float('inf'))
+    assert evaluate_interval('tan(pi/2)') == whole
+    assert evaluate_interval('1/x', x=Interval(-1.0, 1.0)) == whole
+
+
+@pytest.mark.parametrize('text, error', [
+    ('1/0', ZeroDivisionError), ('ln(0)', ValueError), ('sqrt(-1)', ValueError),
+    ('asin(2)', ValueError), ('(-2)^0.5', ValueError), ('2.5!', ValueError),
+])
+def test_domain_errors(text, error):
+    with pytest.raises(error):
+        evaluate_interval(text)
+
+
+def test_tight_results_are_not_escalated():
+    result = evaluate_bounded('1/3')
+    assert result.digits is None
+    assert result.value == 1 / 3
+    assert result.lower <= result.value <= result.upper
+    assert evaluate_bounded('2+2').value == 4
+
+
+def test_wide_results_escalate_to_precision():
+    result = evaluate_bounded('(1e16 + 1) - 1e16')
+    assert result.digits == 50
+    assert result.value == result.lower == result.upper == 1
+
+
+def test_escalated_bounds_cover_cancellation():
+    # sin of a 50-digit pi is not 0 to 50 significant digits; the bounds must still contain 0
+    result = evaluate_bounded('sin(pi)')
+    assert result.digits == 50
+    assert result.lower <= 0 <= result.upper
+    assert abs(result.value) < Decimal('1e-50')
+
+
+def test_degree_mode_does_not_escalate():
+    result = evaluate_bounded('sin(30)', angle_unit='deg')
+    assert result.digits is None
+    assert result.lower <= 0.5 <= result.upper
+
+
+def test_large_numbers_keep_their_value():
+    # Past the float range the enclosure is [MAX, inf]; the value stays the engine's LargeNumber
+    result = evaluate_bounded('100000!')
+    assert isinstance(result.value, LargeNumber)
+    assert str(result.value).startswith('2.824229408')
+    assert result.upper == float('inf')
+
+
+def test_poles_are_not_escalated():
+    # The precise path would give a finite value near the pole with a meaningless bound
+    for text in ['tan(pi/2)', 'tan(pi/2)^2']:
+        result = evaluate_bounded(text)
+        assert result.digits is None
+        assert result.upper == float('inf')
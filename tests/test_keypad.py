@@ -0,0 +1,58 @@
+from fractions import Fraction
+
+import pytest
+
+from calculator_core import ExpressionError, evaluate as evaluate_engine
+from calculator_core.keypad import UnsupportedInput, evaluate, format_exact
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('12+7', 19),
+    ('0.1+0.2', Fraction(3, 10)),
+    ('1/3*3', 1),
+    ('2+3*4', 14),
+    ('-5+2', -3),
+    ('--5', 5),
+    ('7%3', 1),
+    ('-7%3', 2),             # takes the sign of the divisor, like Python
+    ('10/4', Fraction(5, 2)),
+])
+def test_exact_results(text, expected):
+    value = evaluate(text)
+    assert value == expected
+    assert type(value) is type(expected)
+
+
+def test_chaining_keeps_full_precision():
+    third = evaluate('1/3')
+    # Continuing from the exact previous value, not from its 16-digit display
+    assert evaluate('*3', first=third) == 1
+    assert format_exact(third) == '0.3333333333333333'
+    assert evaluate('+1/6', first=third) == Fraction(1, 2)
+    assert evaluate('*3', first=evaluate('0.1+0.2')) == Fraction(9, 10)
+
+
+def test_display_form():
+    assert format_exact(Fraction(3, 10)) == '0.3'
+    assert format_exact(Fraction(1, 10 ** 20)) == '1e-20'
+    assert format_exact(2 ** 70) == str(2 ** 70)
+    # The display form reads back through the general engine
+    assert evaluate_engine(format_exact(Fraction(1, 10 ** 20))) == pytest.approx(1e-20)
+
+
+@pytest.mark.parametrize('text', ['sin(1)', '2^3', 'pi'])
+def test_other_keys_fall_back_to_the_engine(text):
+    with pytest.raises(UnsupportedInput):
+        evaluate(text)
+
+
+@pytest.mark.parametrize('text, error', [
+    ('1/0', ZeroDivisionError),
+    ('5%0', ZeroDivisionError),
+    ('2+', ExpressionError),
+    ('1.2.3', ExpressionError),
+    ('*2', ExpressionError),
+])
+def test_malformed_input(text, error):
+    with pytest.raises(error):
+        evaluate(text)
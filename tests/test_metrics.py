@@ -0,0 +1,58 @@
+import re
+
+import pytest
+
+from calculator_core import evaluate, metrics
+from calculator_core.metrics import Histogram
+from calculator_core.server import Stats
+
+
+def _families(text):
+    """Metric name of every sample line, and the set of names with a TYPE line."""
+    typed = set(re.findall(r'^# TYPE (\S+) \S+$', text, re.M))
+    names = {re.match(r'[a-z_]+', line).group() for line in text.splitlines()
+             if line and not line.startswith('#')}
+    return names, typed
+
+
+def _typed(text):
+    names, typed = _families(text)
+    return all(name in typed or re.sub(r'_(bucket|sum|count)$', '', name) in typed
+               for name in names)
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((1, 2, 4))
+    for value in (0.5, 1.5, 3, 10):
+        histogram.observe(value)
+    assert histogram.exposition('h') == [
+        'h_bucket{le="1"} 1', 'h_bucket{le="2"} 2', 'h_bucket{le="4"} 3',
+        'h_bucket{le="+Inf"} 4', 'h_sum 15.0', 'h_count 4']
+
+
+def test_server_exposition_declares_every_type():
+    stats = Stats()
+    stats.latency.observe(0.001)
+    stats.batch_size.observe(3)
+    text = stats.exposition()
+    assert "# TYPE calculator_request_seconds histogram" in text
+    assert "# TYPE calculator_batch_expressions histogram" in text
+    assert _typed(text)
+
+
+@pytest.fixture
+def recording():
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+
+def test_instrumentation_exposition(recording):
+    evaluate('sqrt(16) + 2*3 + 0*111')
+    text = metrics.exposition()
+    assert text.count("# TYPE calculator_stage_seconds histogram") == 1
+    assert re.search(r'^calculator_evaluations_total [1-9]', text, re.M)
+    assert 'calculator_usage_total{name="sqrt"} 1' in text
+    assert _typed(text)
@@ -0,0 +1,32 @@
+from calculator_core.parallel import ProcessPoolEvaluator, evaluate_parallel
+
+
+def test_results_come_back_in_order():
+    expressions = [f"{i}*2" for i in range(500)] + ['1/0', 'foo']
+    results = list(evaluate_parallel(expressions, workers=2))
+    assert [r.value for r in results[:500]] == [i * 2 for i in range(500)]
+    assert results[500].error == 'division by zero'
+    assert results[501].error == "Unknown variable 'foo'"
+
+
+def test_units_in_workers():
+    results = list(evaluate_parallel(['3 km + 200 m', '255 to hex'], workers=2, chunk_size=1))
+    assert [str(r.value) for r in results] == ['3200 m', '0xff']
+
+
+def test_read_ahead_is_bounded_behind_a_slow_item():
+    consumed = 0
+
+    def source():
+        nonlocal consumed
+        # The long sum keeps one worker busy for a while; the other must not
+        # race through the whole input meanwhile
+        for expression in ['+'.join(['1.5'] * 100_000)] + ['1+1'] * 5000:
+            consumed += 1
+            yield expression
+
+    with ProcessPoolEvaluator(workers=2, chunk_size=1, max_inflight_chunks=2) as pool:
+        results = pool.imap(source())
+        next(results)
+        assert consumed <= 8
+        assert sum(1 for _ in results) == 5000
@@ -0,0 +1,51 @@
+import math
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from calculator_core.plot import POINTS, auto_range, sample, segments  # noqa: E402
+from calculator_core.vectorized import compile_vectorized  # noqa: E402
+
+
+def test_straight_lines_are_not_refined():
+    xs, ys = sample(compile_vectorized('2x+1'), -5, 5)
+    assert xs.size == POINTS
+    np.testing.assert_allclose(ys, 2 * xs + 1)
+
+
+def test_refines_where_the_curve_bends():
+    xs, ys = sample(compile_vectorized('sin(8x)/x'), -10, 10)
+    assert xs.size > POINTS
+    assert np.all(np.diff(xs) > 0)
+    # Points crowd into the oscillating middle rather than the flat tails
+    assert np.count_nonzero(np.abs(xs) < 1) > np.count_nonzero(np.abs(xs) > 9)
+
+
+def test_domain_edges_are_pinned_down():
+    xs, ys = sample(compile_vectorized('sqrt(x)'), -1, 1)
+    first = xs[np.isfinite(ys)][0]
+    assert 0 <= first < 2 / POINTS / 2 ** 7
+
+
+def test_constant_expressions():
+    xs, ys = sample(compile_vectorized('3'), 0, 1)
+    assert np.all(ys == 3)
+
+
+def test_poles_split_the_curve():
+    xs, ys = sample(compile_vectorized('tan(x)'), -3, 3)
+    low, high = auto_range(xs, ys)
+    runs = segments(xs, ys, view_height=high - low)
+    assert len(runs) == 3  # split at -pi/2 and pi/2
+    assert all(np.all(np.isfinite(run_y)) for _, run_y in runs)
+    ends = [run_x[-1] for run_x, _ in runs[:2]]
+    np.testing.assert_allclose(ends, [-math.pi / 2, math.pi / 2], atol=0.01)
+
+
+def test_auto_range_ignores_poles():
+    xs, ys = sample(compile_vectorized('1/x'), -1, 1)
+    low, high = auto_range(xs, ys)
+    assert math.isfinite(low) and math.isfinite(high)
+    assert high - low < 1e3
+    assert auto_range(np.array([0.0, 1.0]), np.array([np.nan, np.nan])) == (-1.0, 1.0)
@@ -0,0 +1,54 @@
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+from calculator_core import guards
+from calculator_core.precision import evaluate_exact, evaluate_precise, format_precise, pi
+
+SQRT2_40 = '1.414213562373095048801688724209698078570'
+PI_60 = '3.14159265358979323846264338327950288419716939937510582097494'
+
+
+def test_arithmetic_is_exact():
+    assert evaluate_exact('0.1+0.2') == Fraction(3, 10)
+    assert evaluate_exact('1/3*3') == 1
+    assert evaluate_exact('2^-2 + 5!/3') == Fraction(161, 4)
+    assert evaluate_exact('x/7', x=3) == Fraction(3, 7)
+
+
+def test_transcendentals_at_the_requested_digits():
+    assert str(pi(60)) == PI_60
+    assert str(evaluate_precise('pi', digits=60)) == PI_60
+    assert str(evaluate_precise('sqrt(2)', digits=40)) == SQRT2_40
+    assert evaluate_precise('sin(pi/6)', digits=30) == Decimal('0.5')
+    assert str(evaluate_precise('e', digits=20)) == '2.7182818284590452354'
+
+
+@pytest.mark.parametrize('text', ['sin(10^30)', 'cos(10^50)', 'tan(10^22)'])
+def test_large_arguments_are_reduced_exactly(text):
+    # Reducing by 2 pi cancels the digits before the point; compare with twice the precision
+    reference = evaluate_precise(text, digits=60)
+    assert abs(evaluate_precise(text, digits=30) - reference) <= abs(reference) * Decimal('1e-29')
+
+
+def test_sin_of_a_large_power_of_ten():
+    assert str(evaluate_precise('sin(10^30)', digits=30)).startswith('-0.090116901912138058030386428')
+
+
+def test_format_precise():
+    assert format_precise(evaluate_exact('1/4')) == '0.25'
+    assert format_precise(evaluate_exact('2^100')) == str(2 ** 100)
+    # More digits than Decimal's default context (28) must survive formatting
+    assert format_precise(evaluate_exact('sqrt(2)', 30), 30) == '1.41421356237309504880168872421'
+
+
+def test_errors():
+    with pytest.raises(ZeroDivisionError):
+        evaluate_exact('1/0')
+    with pytest.raises(ValueError):
+        evaluate_exact('(-8)^(1/3)')
+    with pytest.raises(ValueError):
+        evaluate_exact('2.5!')
+    with pytest.raises(guards.CostLimitError):
+        evaluate_exact('3^100000')
@@ -0,0 +1,47 @@
+import pytest
+
+from calculator_core import evaluate, format_result
+from calculator_core.preview import IncrementalEvaluator
+
+
+def typed(text):
+    """Every prefix of text, as the display shows it one keystroke at a time."""
+    return [text[:end] for end in range(1, len(text) + 1)]
+
+
+@pytest.mark.parametrize('text', [
+    '1e5', '1e+5', '2.5e-3*4', '0xf', '0xff+1', '0b101', '0o17*2',
+    '12+34*2', 'sqrt(16)+2^10', '2pi', '3!+sin(1)', '(1+2)*(3+4)', '1.5+.5',
+])
+def test_each_keystroke_matches_evaluate(text):
+    preview = IncrementalEvaluator()
+    for prefix in typed(text):
+        shown = preview.update(prefix)
+        try:
+            expected = format_result(evaluate(prefix))
+        except Exception:
+            continue  # incomplete input: the preview may show a partial result
+        assert shown == expected, prefix
+
+
+def test_incomplete_input_is_previewed_as_far_as_it_goes():
+    preview = IncrementalEvaluator()
+    assert preview.update('2+') == '2'
+    assert preview.update('sqrt(9') == '3.0'
+    assert preview.update('') is None
+
+
+def test_editing_in_the_middle_and_deleting():
+    preview = IncrementalEvaluator()
+    assert preview.update('12+3') == '15'
+    assert preview.update('19+3') == '22'
+    assert preview.update('19+') == '19'
+    assert preview.update('1e') == format_result(evaluate('1e'))
+    assert preview.update('1e5') == '100000.0'
+
+
+def test_angle_unit_switch_drops_memoized_values():
+    preview = IncrementalEvaluator()
+    assert preview.update('sin(90)') == format_result(evaluate('sin(90)'))
+    preview.set_angle_unit('deg')
+    assert preview.update('sin(90)') == '1.0'
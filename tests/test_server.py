@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+from calculator_core.server import CalculatorService, HTTPProtocol, MicroBatcher, Stats, _Pending, _json
+
+
+async def _exchange(request, workers=0):
+    """Send raw request bytes to a fresh service; returns (status, body) of the reply."""
+    loop = asyncio.get_running_loop()
+    service = CalculatorService(loop, workers)
+    server = await loop.create_server(lambda: HTTPProtocol(service), '127.0.0.1', 0)
+    try:
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        writer.write(request)
+        head = await reader.readuntil(b"\r\n\r\n")
+        status = int(head.split(b' ')[1])
+        length = int(head.lower().split(b'content-length:')[1].split(b'\r\n')[0])
+        body = await reader.readexactly(length)
+        writer.close()
+        return status, body
+    finally:
+        server.close()
+        service.close()
+
+
+def _post(payload, **kwargs):
+    body = json.dumps(payload).encode()
+    request = (b"POST /evaluate HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(body)) + body
+    status, body = asyncio.run(_exchange(request, **kwargs))
+    return status, json.loads(body)
+
+
+def test_evaluate_one_expression():
+    assert _post({'expression': '2^10 + 5!'}) == (
+        200, {'expression': '2^10 + 5!', 'value': '1144', 'error': None})
+
+
+def test_evaluate_batch_with_errors():
+    status, payload = _post({'expressions': ['sin(90)', '1/0'], 'angle_unit': 'deg'})
+    assert status == 200
+    assert [item['value'] for item in payload['results']] == ['1.0', None]
+    assert payload['results'][1]['error']
+
+
+def test_units_and_conversions():
+    status, payload = _post({'expressions': ['3 km + 200 m', '255 to hex', '3 m + 2 s', 'foo']})
+    assert status == 200
+    assert [item['value'] for item in payload['results']] == ['3200 m', '0xff', None, None]
+    assert payload['results'][2]['error'] == 'Cannot add m and s'
+    assert payload['results'][3]['error'] == "Unknown variable 'foo'"
+
+
+def test_expensive_items_leave_the_loop():
+    # Too big for the inline budget, so evaluated with the normal one (by a worker)
+    status, payload = _post({'expressions': ['2000!', '1+1'], 'angle_unit': 'deg'}, workers=1)
+    assert status == 200
+    assert [item['value'] for item in payload['results']] == ['3.316275092e+5735', '2']
+
+
+def test_content_length_is_validated():
+    status, body = asyncio.run(_exchange(b"POST /evaluate HTTP/1.1\r\nContent-Length: -5\r\n\r\n"))
+    assert status == 400
+    status, body = asyncio.run(_exchange(b"POST /evaluate HTTP/1.1\r\n\r\n"))
+    assert status == 411
+    status, body = asyncio.run(_exchange(b"GET /health HTTP/1.1\r\n\r\n"))
+    assert (status, json.loads(body)) == (200, {'status': 'ok'})
+
+
+def test_pool_shutdown_fails_items_instead_of_hanging():
+    async def submit_after_shutdown():
+        loop = asyncio.get_running_loop()
+        service = CalculatorService(loop, workers=1)
+        service.close()
+        return await asyncio.wait_for(service.batcher.submit(['2000!', '1+1']), 5)
+
+    items = asyncio.run(submit_after_shutdown())
+    assert items[0]['value'] is None and items[0]['error']
+    assert items[1]['value'] == '2'
+
+
+def test_cancelled_chunk_fails_its_items():
+    async def cancel_chunk():
+        loop = asyncio.get_running_loop()
+        batcher = MicroBatcher(loop, None, Stats())
+        pending = _Pending(['2000!'], 'rad', loop.create_future())
+        pending.waiting = 1
+        chunk = loop.create_future()
+        chunk.cancel()
+        batcher._offloaded(chunk, [(pending, 0)])
+        return await asyncio.wait_for(pending.future, 5)
+
+    assert asyncio.run(cancel_chunk()) == [
+        {'expression': '2000!', 'value': None, 'error': 'CancelledError'}]
+
+
+def test_idle_timeout_waits_for_requests_in_flight():
+    async def slow_request():
+        loop = asyncio.get_running_loop()
+        service = CalculatorService(loop, 0, idle_timeout=0.05)
+
+        def handle(method, path, body, close):
+            # A pool result that takes longer than the idle timeout
+            response = loop.create_future()
+            loop.call_later(0.3, response.set_result, _json(200, {'status': 'ok'}))
+            return response
+
+        service.handle = handle
+        server = await loop.create_server(lambda: HTTPProtocol(service), '127.0.0.1', 0)
+        try:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write(b"GET /health HTTP/1.1\r\n\r\n")
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+            length = int(head.lower().split(b'content-length:')[1].split(b'\r\n')[0])
+            body = await reader.readexactly(length)
+            # Idle again once answered: the connection is closed after the timeout
+            assert await asyncio.wait_for(reader.read(), 5) == b''
+            writer.close()
+            return json.loads(body)
+        finally:
+            server.close()
+            service.close()
+
+    assert asyncio.run(slow_request()) == {'status': 'ok'}
@@ -0,0 +1,68 @@
+import math
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from calculator_core.engine import ExpressionError  # noqa: E402
+from calculator_core.solve import find_roots, residual, solve  # noqa: E402
+
+
+def test_residual():
+    assert residual('x^2 = 2') == '(x^2 )-( 2)'
+    assert residual('sin(x)') == 'sin(x)'
+    with pytest.raises(ExpressionError):
+        residual('x = 1 = 2')
+
+
+def test_find_roots_of_an_equation():
+    roots = find_roots('x^3 - 2x = 5', -10, 10).roots
+    np.testing.assert_allclose(roots, [2.0945514815423265], rtol=1e-12)
+
+
+def test_find_all_roots_in_range():
+    roots = find_roots('sin(x)', 0.5, 10).roots
+    np.testing.assert_allclose(roots, [math.pi, 2 * math.pi, 3 * math.pi], rtol=1e-12)
+
+
+def test_degrees():
+    np.testing.assert_allclose(find_roots('cos(x)', 0, 360, angle_unit='deg').roots, [90, 270])
+
+
+def test_root_on_a_grid_point():
+    # Degree kernels are exact at table angles, so sin(180) and sin(360) are grid zeros
+    np.testing.assert_allclose(find_roots('sin(x)', 10, 350, angle_unit='deg').roots, [180])
+    np.testing.assert_allclose(find_roots('sin(x)', 0, 360, angle_unit='deg').roots, [0, 180, 360])
+
+
+def test_double_roots_are_found():
+    np.testing.assert_allclose(find_roots('(x-1)^2', -5, 5).roots, [1.0], atol=1e-6)
+
+
+def test_poles_are_not_roots():
+    roots = find_roots('tan(x)', -3, 3).roots
+    np.testing.assert_allclose(roots, [0.0], atol=1e-12)
+    assert find_roots('1/x', -1, 2).roots.size == 0
+
+
+def test_without_a_derivative():
+    # '%' has no derivative, so the secant step is used
+    roots = find_roots('x%3 - 1', 0.5, 5).roots
+    np.testing.assert_allclose(roots, [1.0, 4.0], rtol=1e-9)
+
+
+def test_solve_over_parameter_values():
+    solution = solve('x^2 = a', 0, 10, a=np.arange(1, 6))
+    np.testing.assert_allclose(solution.roots, np.sqrt(np.arange(1, 6)), rtol=1e-12)
+    assert solution.roots.shape == (5,)
+
+
+def test_solve_without_a_sign_change_gives_nan():
+    roots = solve('x^2 = a', 0, 1, a=np.array([0.25, 4.0])).roots
+    assert roots[0] == pytest.approx(0.5)
+    assert math.isnan(roots[1])
+
+
+def test_must_depend_on_the_variable():
+    with pytest.raises(ExpressionError, match='does not depend'):
+        find_roots('y + 1')
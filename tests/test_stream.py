@@ -0,0 +1,45 @@
+import io
+import json
+
+import pytest
+
+from calculator_core import cli
+from calculator_core.batch import evaluate_one
+from calculator_core.stream import read_lines, writer_for
+
+
+def test_read_lines_across_chunk_boundaries():
+    data = b'1+1\r\n22*3\n\nsqrt(16)'
+    for chunk_size in (1, 3, 7, 1 << 20):
+        assert list(read_lines(io.BytesIO(data), chunk_size)) == ['1+1', '22*3', '', 'sqrt(16)']
+
+
+def test_read_lines_replaces_invalid_utf8():
+    assert list(read_lines(io.BytesIO(b'1+\xff\n'))) == ['1+�']
+
+
+def test_csv_and_jsonl_records_carry_line_numbers():
+    results = [evaluate_one('2*3'), evaluate_one(''), evaluate_one('1/0')]
+    csv_out, jsonl_out = io.StringIO(), io.StringIO()
+    for fmt, out in (('csv', csv_out), ('jsonl', jsonl_out)):
+        writer = writer_for(fmt, out)
+        for line_number, result in enumerate(results, 1):
+            writer.write(line_number, result)
+    assert csv_out.getvalue().splitlines() == [
+        'line,expression,value,error', '1,2*3,6,', '3,1/0,,division by zero']
+    assert [json.loads(line) for line in jsonl_out.getvalue().splitlines()] == [
+        {'line': 1, 'expression': '2*3', 'value': '6', 'error': None},
+        {'line': 3, 'expression': '1/0', 'value': None, 'error': 'division by zero'}]
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError, match='Unknown output format'):
+        writer_for('xml', io.StringIO())
+
+
+def test_cli_jsonl(tmp_path):
+    source = tmp_path / 'in.txt'
+    source.write_bytes(b'3 km + 200 m\r\n255 to hex\n')
+    output = tmp_path / 'out.jsonl'
+    assert cli.main([str(source), '-o', str(output), '-f', 'jsonl']) == 0
+    assert [json.loads(line)['value'] for line in output.read_text().splitlines()] == ['3200 m', '0xff']
@@ -0,0 +1,41 @@
+import pytest
+
+from calculator_core import evaluate
+from calculator_core.engine import ExpressionError
+from calculator_core.symbolic import derivative
+
+CASES = ['x^2*sin(x)', '3x+2', 'ln(x)', 'sqrt(x)', 'exp(2x)', 'x^x', 'tan(x)', 'atan(x)',
+         'asin(x/2)', 'acos(x/2)', '2^x', 'log(x)', '1/x', '-x^3', 'sin(x)^2/(1+x)']
+
+
+def _central_difference(text, x, h=1e-6, angle_unit='rad'):
+    return (evaluate(text, angle_unit=angle_unit, x=x + h)
+            - evaluate(text, angle_unit=angle_unit, x=x - h)) / (2 * h)
+
+
+@pytest.mark.parametrize('text', CASES)
+def test_matches_numeric_derivative(text):
+    slope = derivative(text)
+    for x in (0.3, 0.9, 1.7):
+        assert evaluate(slope, x=x) == pytest.approx(_central_difference(text, x), rel=1e-5)
+
+
+def test_results_are_kept_simple():
+    assert derivative('x^2*sin(x)') == '2*x*sin(x)+x^2*cos(x)'
+    assert derivative('3x+2') == '3'
+    assert derivative('5') == '0'
+    assert derivative('y*x') == 'y'
+    assert derivative('y*x', var='y') == 'x'
+
+
+def test_degree_mode_carries_the_conversion_factor():
+    slope = derivative('sin(x)', angle_unit='deg')
+    assert evaluate(slope, angle_unit='deg', x=30) == pytest.approx(
+        _central_difference('sin(x)', 30, angle_unit='deg'))
+    assert evaluate(derivative('atan(x)', angle_unit='deg'), x=1) == pytest.approx(90 / 3.141592653589793)
+
+
+@pytest.mark.parametrize('text', ['x%2', 'x!'])
+def test_not_differentiable(text):
+    with pytest.raises(ExpressionError, match='has no derivative'):
+        derivative(text)
@@ -0,0 +1,51 @@
+import math
+
+import pytest
+
+from calculator_core import trig
+from calculator_core.trig import (acos_deg, asin_deg, atan_deg, cos_deg, reduce_degrees,
+                                  sin_deg, tan_deg)
+
+
+def test_table_angles_are_exact():
+    assert sin_deg(30) == 0.5
+    assert cos_deg(90) == 0.0
+    assert cos_deg(60) == 0.5
+    assert tan_deg(45) == 1.0
+    assert sin_deg(-30) == -0.5
+    assert sin_deg(720 + 150) == 0.5
+    assert sin_deg(180.0) == 0.0
+
+
+def test_inverse_functions_return_degrees():
+    assert asin_deg(0.5) == 30.0
+    assert asin_deg(-1.0) == -90.0
+    assert acos_deg(-0.5) == 120.0
+    assert atan_deg(1.0) == 45.0
+    assert atan_deg(-math.sqrt(3)) == -60.0
+
+
+def test_other_angles_match_radians():
+    for x in (1, 17.5, 89.999, 123.456, -271.3, 1e6 + 0.25):
+        assert sin_deg(x) == pytest.approx(math.sin(math.radians(x)), abs=1e-12)
+        assert cos_deg(x) == pytest.approx(math.cos(math.radians(x)), abs=1e-12)
+
+
+def test_reduce_degrees_is_exact():
+    assert reduce_degrees(-30) == 330
+    assert reduce_degrees(-30.5) == 329.5
+    assert reduce_degrees(10 ** 20 + 30) == (10 ** 20 + 30) % 360
+
+
+def test_tan_undefined():
+    with pytest.raises(ValueError):
+        tan_deg(90)
+    with pytest.raises(ValueError):
+        tan_deg(-90)
+
+
+def test_degree_results_are_cached():
+    trig.cache_clear()
+    sin_deg(12.5)
+    sin_deg(12.5)
+    assert trig.cache_info()['sin'].hits == 1
@@ -0,0 +1,78 @@
+import pickle
+
+import pytest
+
+from calculator_core import evaluate_many
+from calculator_core.engine import ExpressionError
+from calculator_core.units import (BasedInt, DimensionError, Quantity, UNITS, evaluate,
+                                   evaluate_with_units, split_target)
+
+
+def test_quantities_combine_in_base_units():
+    assert str(evaluate('3 km + 200 m')) == '3200 m'
+    assert str(evaluate('5 kg * 9.8 m/s^2')) == '49.0 N'
+    assert evaluate('2 m / (4 m)') == 0.5  # dimensionless results are plain numbers
+
+
+def test_prefixes_are_expanded():
+    assert UNITS['km'] == Quantity(1000, UNITS['m'].dims)
+    assert evaluate('1 ms') == evaluate('0.001 s')
+
+
+def test_conversion_to_a_unit():
+    assert str(evaluate('100 km / (2 h) to km/h')) == '50.0 km/h'
+    assert str(evaluate('60 km to m')) == '60000 m'
+
+
+def test_conversion_to_a_base():
+    assert str(evaluate('255 to hex')) == '0xff'
+    assert str(evaluate('5 to bin')) == '0b101'
+    assert str(evaluate('8 to oct')) == '0o10'
+    assert evaluate('0xff to dec') == 255
+    assert str(evaluate('2^100 to hex')) == hex(2 ** 100)
+
+
+def test_base_literals():
+    assert evaluate('0b1010 + 0o17') == 25
+    assert evaluate('0xff') == 255
+
+
+def test_dimension_errors():
+    with pytest.raises(DimensionError, match='Cannot add m and s'):
+        evaluate('3 m + 2 s')
+    with pytest.raises(DimensionError):
+        evaluate('1 km to s')
+    with pytest.raises(DimensionError):
+        evaluate('sin(1 m)')
+    with pytest.raises(ValueError, match='integer'):
+        evaluate('2.5 to hex')
+
+
+def test_split_target():
+    assert split_target('1 km to m') == ('1 km ', 'm')
+    assert split_target('total') == ('total', None)  # 'to' only as a whole word
+    with pytest.raises(ExpressionError):
+        split_target('1 to 2 to 3')
+
+
+def test_evaluate_with_units_prefers_the_engine():
+    assert evaluate_with_units('1+2') == 3
+    assert str(evaluate_with_units('3 km')) == '3000 m'
+    with pytest.raises(ExpressionError, match="Unknown variable 'foo'"):
+        evaluate_with_units('foo + 1')
+    with pytest.raises(DimensionError):
+        evaluate_with_units('3 m + 2 s')
+
+
+def test_batch_path_understands_units():
+    results = list(evaluate_many(['3 km + 200 m', '255 to hex', '3 m + 2 s']))
+    assert [str(r.value) for r in results[:2]] == ['3200 m', '0xff']
+    assert results[2].error == 'Cannot add m and s'
+
+
+def test_results_survive_pickling():
+    # Parallel batches send results back from worker processes
+    for value in (evaluate('255 to hex'), evaluate('3 km')):
+        copy = pickle.loads(pickle.dumps(value))
+        assert copy == value and str(copy) == str(value)
+    assert isinstance(pickle.loads(pickle.dumps(BasedInt(255, 16))), BasedInt)
@@ -0,0 +1,55 @@
+import math
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from calculator_core import evaluate, trig  # noqa: E402
+from calculator_core.vectorized import compile_vectorized, evaluate_vectorized  # noqa: E402
+
+
+def test_matches_scalar_evaluation():
+    x = np.linspace(-3, 3, 61)
+    sweep = compile_vectorized('sin(x)^2 + 2x - x%2')
+    expected = [evaluate('sin(x)^2 + 2x - x%2', x=float(v)) for v in x]
+    np.testing.assert_allclose(sweep(x=x), expected)
+
+
+def test_broadcasts_scalars_and_arrays():
+    result = evaluate_vectorized('x*y + 1', x=np.arange(3), y=2)
+    np.testing.assert_array_equal(result, [1.0, 3.0, 5.0])
+
+
+def test_degrees():
+    result = evaluate_vectorized('sin(x)', angle_unit='deg', x=np.array([0.0, 90.0, 270.0]))
+    np.testing.assert_allclose(result, [0.0, 1.0, -1.0], atol=1e-15)
+
+
+@pytest.mark.parametrize('name', ['sin', 'cos', 'tan'])
+def test_degrees_match_the_scalar_kernels(name):
+    # Exact reduction mod 360 and table angles, like trig: sin(180) is 0, tan(90) a pole (nan)
+    angles = np.arange(-720.0, 721.0, 15.0)
+    expected = []
+    for angle in angles:
+        try:
+            expected.append(trig.DEGREE_FUNCTIONS[name](angle))
+        except ValueError:
+            expected.append(math.nan)
+    result = evaluate_vectorized(f'{name}(x)', angle_unit='deg', x=angles)
+    np.testing.assert_array_equal(result, expected)
+
+
+def test_domain_errors_become_nan_and_inf():
+    result = evaluate_vectorized('sqrt(x) + 1/(x-1)', x=np.array([-1.0, 1.0, 4.0]))
+    assert math.isnan(result[0]) and math.isinf(result[1])
+    assert result[2] == pytest.approx(2 + 1 / 3)
+
+
+def test_factorial():
+    np.testing.assert_array_equal(evaluate_vectorized('x!', x=np.array([0, 5, 10])),
+                                  [1.0, 120.0, 3628800.0])
+    assert math.isnan(evaluate_vectorized('x!', x=np.array([2.5]))[0])
+
+
+def test_compiled_once():
+    assert compile_vectorized('x + 1') is compile_vectorized('x+1')
@@ -0,0 +1,83 @@
+import math
+
+import pytest
+
+from calculator_core import ExpressionError, Workspace
+
+
+def test_recomputes_only_downstream_cells():
+    ws = Workspace()
+    ws.define("a = 3")
+    ws.define("f(x) = x^2 + 1")
+    ws.define("b = f(a) + 1")
+    ws.define("c = 100")
+    assert ws['b'] == 11
+    before = ws.evaluations
+    assert ws.define("a = 4") == {'a': 4, 'b': 18}
+    assert ws.evaluations - before == 2  # c is left alone
+    assert ws['c'] == 100
+
+
+def test_redefining_a_function_recomputes_its_callers():
+    ws = Workspace()
+    ws.define("f(x) = 2x")
+    ws.define("y = f(5)")
+    assert ws.define("f(x) = 3x") == {'y': 15}
+
+
+def test_forward_references_resolve_when_defined():
+    ws = Workspace()
+    ws.define("b = a + 1")
+    with pytest.raises(ExpressionError):
+        ws['b']
+    assert ws.define("a = 1") == {'a': 1, 'b': 2}
+
+
+@pytest.mark.parametrize('definitions', [
+    ["a = a + 1"],
+    ["a = b", "b = a"],
+    ["a = b", "b = c", "c = a + 1"],
+    ["f(x) = g(x)", "g(x) = f(x)"],
+])
+def test_cycles_are_rejected(definitions):
+    ws = Workspace()
+    for source in definitions[:-1]:
+        ws.define(source)
+    with pytest.raises(ExpressionError, match="Circular"):
+        ws.define(definitions[-1])
+
+
+def test_rejected_cycle_keeps_the_previous_definition():
+    ws = Workspace()
+    ws.define("a = 1")
+    ws.define("b = a + 1")
+    with pytest.raises(ExpressionError):
+        ws.define("a = b")
+    assert ws['a'] == 1 and ws['b'] == 2
+
+
+def test_builtins_and_kind_changes_are_rejected():
+    ws = Workspace()
+    with pytest.raises(ExpressionError):
+        ws.define("pi = 3")
+    with pytest.raises(ExpressionError):
+        ws.define("sin(x) = x")
+    ws.define("a = 1")
+    with pytest.raises(ExpressionError):
+        ws.define("a(x) = x")
+
+
+def test_remove_puts_dependents_in_error():
+    ws = Workspace()
+    ws.define("a = 2")
+    ws.define("b = a * 10")
+    ws.remove("a")
+    with pytest.raises(ExpressionError):
+        ws['b']
+
+
+def test_degree_workspace_and_evaluate():
+    ws = Workspace(angle_unit='deg')
+    ws.define("angle = 30")
+    assert ws.evaluate("sin(angle)") == pytest.approx(0.5)
+    assert Workspace().evaluate("sin(pi/2)") == pytest.approx(math.sin(math.pi / 2))